@@ -29,6 +29,27 @@ class Camera(Object3D):
     def getViewMatrix(self):
         return self.viewMatrix
 
+    def getFrustumPlanes(self):
+        """
+        Return the six planes bounding the visible region (left, right, bottom, top, near, far)
+        as rows (a, b, c, d) of a 6x4 array; points with a*x + b*y + c*z + d >= 0 are inside,
+        and each (a, b, c) has length 1, so the value is a signed distance.
+        Uses the current projection and view matrices.
+        """
+        # rows of the combined matrix give the clip space planes -w <= x, y, z <= w
+        matrix = np.asarray(self.projectionMatrix) @ np.asarray(self.viewMatrix)
+        planes = np.array(
+            [
+                matrix[3] + matrix[0],
+                matrix[3] - matrix[0],
+                matrix[3] + matrix[1],
+                matrix[3] - matrix[1],
+                matrix[3] + matrix[2],
+                matrix[3] - matrix[2],
+            ]
+        )
+        return planes / np.linalg.norm(planes[:, 0:3], axis=1, keepdims=True)
+
     def setPerspective(self, fov, aspect, near, far):
         self.fov = fov
         self.aspect = aspect
@@ -0,0 +1,170 @@
+import queue
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import moderngl
+from PIL import Image
+
+from ..geometry.BoxGeometry import BoxGeometry
+from ..geometry.OBJGeometry import OBJGeometry
+from ..geometry.OBJLoader import OBJLoader
+from .OpenGLUtils import OpenGLUtils
+
+
+def _decodeImage(imageFileName):
+    """Decode and flip an image file; runs on a worker thread or process"""
+    image = OpenGLUtils.readImage(imageFileName)
+    image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    return image.size, image.tobytes()
+
+
+# loads textures and models without blocking the render loop.
+#   files are read, decoded and parsed on a pool of threads (or processes); the finished
+#   results wait in a completion queue until processCompleted creates their textures and
+#   buffers, on the thread of the OpenGL context (Base.run calls it once per frame).
+#   loading all assets at once takes about as long as the slowest one.
+# meanwhile, materials use a placeholder texture and meshes a placeholder geometry:
+#   material = SurfaceLightMaterial(texture=assetLoader.getPlaceholderTexture())
+#   assetLoader.loadTexture("images/crate.jpg", owner=material, material=material)
+#   geometry = assetLoader.loadGeometry("models/star.obj").geometry
+# each load returns a Future, whose result (the texture or geometry) is set by
+#   processCompleted; callbacks added with add_done_callback run on the same thread.
+class AssetLoader:
+    # color of the placeholder texture (RGBA, 0-255)
+    placeholderColor = (128, 128, 128, 255)
+
+    def __init__(self, workerCount=4, useProcesses=False):
+        if useProcesses:
+            self.executor = ProcessPoolExecutor(max_workers=workerCount)
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=workerCount, thread_name_prefix="AssetLoader"
+            )
+
+        # (worker future, function creating the GPU objects, result future) of finished work;
+        #   filled by the workers, emptied by processCompleted
+        self.completed = queue.SimpleQueue()
+        # number of assets requested and not completed yet
+        self.pendingCount = 0
+
+        self.placeholderTexture = None
+
+    def getPlaceholderTexture(self):
+        """Return the 1x1 texture shown until loaded textures replace it (see loadTexture)"""
+        if self.placeholderTexture is None:
+            self.placeholderTexture = OpenGLUtils.createTexture(
+                (1, 1), 4, bytes(AssetLoader.placeholderColor), owner=self
+            )
+        return self.placeholderTexture
+
+    @staticmethod
+    def createPlaceholderGeometry(size=1):
+        """Return a box shown until the loaded data replaces it (see loadGeometry)"""
+        return BoxGeometry(size, size, size)
+
+    def _submit(self, function, argumentList, finish):
+        result = Future()
+        result.set_running_or_notify_cancel()
+        self.pendingCount += 1
+        work = self.executor.submit(function, *argumentList)
+        # runs on the worker (or a thread collecting process results), so it only queues
+        work.add_done_callback(lambda work: self.completed.put((work, finish, result)))
+        return result
+
+    def loadImage(self, imageFileName):
+        """
+        Decode an image file in the pool; the result is a pair (size, data) of its RGBA pixels,
+        bottom row first (as textures expect)
+        """
+        return self._submit(_decodeImage, [imageFileName], lambda data: data)
+
+    def loadTexture(self, imageFileName, owner=None, material=None, uniformName="image"):
+        """
+        Load a texture, released with owner (see OpenGLUtils.initializeTexture); if material
+        is given, its sampler2D uniform uniformName shows the placeholder texture until the
+        loaded texture replaces it
+        """
+        if material is not None:
+            material.setUniform("sampler2D", uniformName, self.getPlaceholderTexture())
+
+        def finish(data):
+            size, pixels = data
+            texture = OpenGLUtils.createTexture(size, 4, pixels, owner=owner)
+            texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+            if material is not None:
+                material.setUniform("sampler2D", uniformName, texture)
+            return texture
+
+        return self._submit(_decodeImage, [imageFileName], finish)
+
+    def loadGeometry(self, objFileName, smoothNormals=False, useCache=True, geometry=None):
+        """
+        Load a model (see OBJGeometry) into geometry, by default a new placeholder geometry;
+        the geometry is available at once, as the geometry attribute of the returned future,
+        and its data is replaced in place when loading completes, so meshes may use it
+        """
+        if geometry is None:
+            geometry = AssetLoader.createPlaceholderGeometry()
+
+        def finish(data):
+            AssetLoader._replaceGeometryData(geometry, data)
+            return geometry
+
+        result = self._submit(OBJLoader.load, [objFileName, smoothNormals, useCache], finish)
+        result.geometry = geometry
+        return result
+
+    @staticmethod
+    def _replaceGeometryData(geometry, data):
+        # the buffers of the placeholder data are released; attributes missing from the
+        #   model (such as vertexUV) must not be drawn with it
+        geometry.release()
+        geometry.attributeData = {}
+        geometry.dirtyAttributes = set()
+        geometry.setIndices(None)
+        OBJGeometry.setOBJData(geometry, data)
+
+    def _complete(self, work, finish, result):
+        self.pendingCount -= 1
+        try:
+            result.set_result(finish(work.result()))
+        except Exception as error:
+            result.set_exception(error)
+
+    def processCompleted(self, timeLimit=None):
+        """
+        Create the textures and buffers of finished assets, and complete their futures;
+        must be called on the thread of the OpenGL context. With timeLimit (in seconds),
+        the remaining assets wait for the next call once the time is used up.
+        Returns the number of assets completed.
+        """
+        startTime = time.perf_counter()
+        count = 0
+        while timeLimit is None or time.perf_counter() - startTime < timeLimit:
+            try:
+                work, finish, result = self.completed.get_nowait()
+            except queue.Empty:
+                break
+            self._complete(work, finish, result)
+            count += 1
+        return count
+
+    def wait(self, timeout=None):
+        """
+        Complete all requested assets, waiting for the workers if necessary (for example,
+        before rendering a single headless frame); returns False if timeout (in seconds)
+        expired first
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.pendingCount > 0:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            try:
+                work, finish, result = self.completed.get(timeout=remaining)
+            except queue.Empty:
+                return False
+            self._complete(work, finish, result)
+        return True
+
+    def shutdown(self):
+        """Stop the workers; assets not started yet are cancelled"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
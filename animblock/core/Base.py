@@ -2,8 +2,9 @@ import time
 
 import glfw
 import moderngl
-from PIL import Image
 
+from .AssetLoader import AssetLoader
+from .FrameCapture import FrameCapture
 from .Input import Input
 from .OpenGLUtils import OpenGLUtils
 
@@ -33,7 +34,7 @@ class Base:
         self.ctx = moderngl.create_context()
 
         # Set the global context in OpenGLUtils
-        OpenGLUtils.ctx = self.ctx
+        OpenGLUtils.setContext(self.ctx)
 
         # Enable depth testing and blending (equivalent to PyOpenGL setup)
         self.ctx.enable(moderngl.DEPTH_TEST)
@@ -60,6 +61,12 @@ class Base:
         self.camera = None
         self.scene = None
 
+        # set by startRecording
+        self.frameCapture = None
+
+        # textures and models loaded in the background (see AssetLoader)
+        self.assetLoader = AssetLoader()
+
     def setWindowTitle(self, text):
         glfw.set_window_title(self.window, text)
 
@@ -110,12 +117,19 @@ class Base:
             glfw.poll_events()
             self.input.update()
 
+            # Create the GPU objects of assets loaded since the last frame
+            self.assetLoader.processCompleted()
+
             # Update the scene
             self.update()
 
             # Render the scene
             self.render()
 
+            # Queue the frame before the back buffer is swapped away
+            if self.frameCapture is not None:
+                self.frameCapture.capture(size=glfw.get_framebuffer_size(self.window))
+
             # Swap front and back buffers
             glfw.swap_buffers(self.window)
 
@@ -125,16 +139,25 @@ class Base:
 
         # Cleanup
         self.cleanup()
+        self.stopRecording()
+        self.assetLoader.shutdown()
         glfw.terminate()
 
     def cleanup(self):
         pass
 
+    # record every subsequent frame into directory (see FrameCapture for options)
+    def startRecording(self, directory="frames", fileFormat="png", **options):
+        self.stopRecording()
+        self.frameCapture = FrameCapture(directory, fileFormat, **options)
+
+    def stopRecording(self):
+        if self.frameCapture is not None:
+            self.frameCapture.finish()
+            self.frameCapture = None
+
     def saveScreenshot(self, fileName):
         width, height = glfw.get_framebuffer_size(self.window)
-        # Read from ModernGL default framebuffer
-        data = self.ctx.screen.read(components=3)
-        image = Image.frombytes("RGB", (width, height), data)
-        image = image.transpose(Image.FLIP_TOP_BOTTOM)
-        image.save(fileName)
-        print(f"Screenshot saved as {fileName}")
+        # Read from ModernGL default framebuffer; encoding happens in the background
+        data = self.ctx.screen.read(viewport=(0, 0, width, height), components=3, alignment=1)
+        FrameCapture.saveImageAsync(fileName, width, height, data)
@@ -0,0 +1,315 @@
+import moderngl
+import numpy as np
+
+from .LightClusters import LightClusters
+from .OpenGLUtils import OpenGLUtils
+from .RenderTarget import RenderTarget
+from .Uniform import Uniform, UniformList
+from .UniformBlock import UniformBlock
+
+
+# light types of the lighting pass
+_DIRECTIONAL = 1
+_POINT = 2
+
+
+# deferred shading: opaque meshes whose materials allow it (Material.allowDeferredShading)
+#   are first drawn into a G-buffer, a RenderTarget with several color attachments:
+#     albedo:   unlit color
+#     position: world position
+#     normal:   unit normal
+#     material: shadow factor, 1 if the surface is lit, alpha, and 1 where a surface was drawn
+#   lights are then added up per pixel by drawing one quad per light into a light buffer;
+#   point lights with a distance only cover the pixels their sphere of influence projects to,
+#   so lighting cost depends on screen area times lights, not on scene geometry.
+#   finally, the result is combined as in the forward shaders (lighting, fog, shadows)
+#   and written with the G-buffer depth into the render target, where transparent meshes
+#   and other materials are then drawn as usual. enabled by Renderer.deferredShading.
+class DeferredShading:
+    quadVertexCode = """
+    in vec2 vertexPosition;
+    void main()
+    {
+        gl_Position = vec4(vertexPosition, 0.0, 1.0);
+    }
+    """
+
+    lightingCode = (
+        UniformBlock.lightsCode
+        + """
+    uniform sampler2D gPosition;
+    uniform sampler2D gNormal;
+    uniform sampler2D gMaterial;
+
+    uniform int lightType;
+    // color multiplied by strength
+    uniform vec3 lightColor;
+    uniform vec3 lightPosition;
+    uniform vec3 lightDirection;
+    uniform float lightDistance;
+
+    void main()
+    {
+        ivec2 pixel = ivec2(gl_FragCoord.xy);
+        // unlit surfaces and background
+        if ( texelFetch(gMaterial, pixel, 0).g < 0.5 )
+            discard;
+
+        vec3 unitNormal = texelFetch(gNormal, pixel, 0).xyz;
+        if ( lightType == 1 )
+        {
+            float cosAngle = max( dot(unitNormal, -lightDirection), 0.0 );
+            fragColor = vec4( lightColor * cosAngle, 1.0 );
+        }
+        else
+        {
+            vec3 position = texelFetch(gPosition, pixel, 0).xyz;
+            vec3 lightVector = lightPosition - position;
+            float distanceToLight = length(lightVector);
+            float cosAngle = max( dot(unitNormal, normalize(lightVector)), 0.0 );
+            float attenuation = getAttenuation(distanceToLight, lightDistance);
+            fragColor = vec4( lightColor * cosAngle * attenuation, 1.0 );
+        }
+    }
+    """
+    )
+
+    compositeCode = (
+        UniformBlock.cameraCode
+        + UniformBlock.fogCode
+        + """
+    uniform sampler2D gAlbedo;
+    uniform sampler2D gPosition;
+    uniform sampler2D gNormal;
+    uniform sampler2D gMaterial;
+    uniform sampler2D gDepth;
+    uniform sampler2D lightBuffer;
+
+    uniform vec3 ambientLight;
+    // lower left corner of the viewport in the render target
+    uniform vec2 viewportOrigin;
+
+    void main()
+    {
+        ivec2 pixel = ivec2(gl_FragCoord.xy - viewportOrigin);
+        vec4 material = texelFetch(gMaterial, pixel, 0);
+        // nothing drawn here; keep the cleared color
+        if ( material.a < 0.5 )
+            discard;
+
+        vec4 baseColor = vec4( texelFetch(gAlbedo, pixel, 0).rgb, material.b );
+        vec3 position = texelFetch(gPosition, pixel, 0).xyz;
+
+        if ( material.g > 0.5 )
+        {
+            vec3 totalLight = texelFetch(lightBuffer, pixel, 0).rgb + ambientLight;
+            totalLight = min( totalLight, vec3(1,1,1) );
+            baseColor *= vec4( totalLight, 1 );
+        }
+
+        if ( useFog )
+        {
+            // as calculated by the vertex shaders
+            float cameraDistance = ( projectionMatrix * viewMatrix * vec4(position, 1) ).w;
+            float fogFactor = clamp( (fogEndDistance - cameraDistance)/(fogEndDistance - fogStartDistance), 0.0, 1.0 );
+            baseColor = mix( vec4(fogColor,1.0), baseColor, fogFactor );
+        }
+
+        float shadowFactor = material.r;
+        baseColor *= vec4( shadowFactor, shadowFactor, shadowFactor, 1.0 );
+
+        fragColor = baseColor;
+        gl_FragDepth = texelFetch(gDepth, pixel, 0).r;
+    }
+    """
+    )
+
+    def __init__(self):
+        # created when the viewport size is known, see resize
+        self.gBuffer = None
+        self.lightBuffer = None
+        self.lightTexture = None
+        self.width = 0
+        self.height = 0
+
+        self.lightingProgram = OpenGLUtils.getProgram(
+            DeferredShading.quadVertexCode, DeferredShading.lightingCode
+        )
+        self.compositeProgram = OpenGLUtils.getProgram(
+            DeferredShading.quadVertexCode, DeferredShading.compositeCode
+        )
+        UniformBlock.bindProgram(self.lightingProgram)
+        UniformBlock.bindProgram(self.compositeProgram)
+
+        # one quad covering the viewport, drawn as a triangle strip
+        self.quadBuffer = OpenGLUtils.createBuffer(
+            np.array([-1, -1, 1, -1, -1, 1, 1, 1], dtype=np.float32).tobytes(), owner=self
+        )
+        self.lightingQuad = OpenGLUtils.createVertexArray(
+            self.lightingProgram, [(self.quadBuffer, "2f", "vertexPosition")], owner=self
+        )
+        self.compositeQuad = OpenGLUtils.createVertexArray(
+            self.compositeProgram, [(self.quadBuffer, "2f", "vertexPosition")], owner=self
+        )
+
+        self.lightingUniforms = UniformList()
+        self.lightingUniforms.addUniform(Uniform("sampler2D", "gPosition", None))
+        self.lightingUniforms.addUniform(Uniform("sampler2D", "gNormal", None))
+        self.lightingUniforms.addUniform(Uniform("sampler2D", "gMaterial", None))
+        self.lightingUniforms.addUniform(Uniform("int", "lightType", 0))
+        self.lightingUniforms.addUniform(Uniform("vec3", "lightColor", [0, 0, 0]))
+        self.lightingUniforms.addUniform(Uniform("vec3", "lightPosition", [0, 0, 0]))
+        self.lightingUniforms.addUniform(Uniform("vec3", "lightDirection", [0, 0, 0]))
+        self.lightingUniforms.addUniform(Uniform("float", "lightDistance", 0))
+
+        self.compositeUniforms = UniformList()
+        for name in ("gAlbedo", "gPosition", "gNormal", "gMaterial", "gDepth", "lightBuffer"):
+            self.compositeUniforms.addUniform(Uniform("sampler2D", name, None))
+        self.compositeUniforms.addUniform(Uniform("vec3", "ambientLight", [0, 0, 0]))
+        self.compositeUniforms.addUniform(Uniform("vec2", "viewportOrigin", [0, 0]))
+
+        # lighting quads drawn by the latest render, and pixels they covered
+        self.lightPassCount = 0
+        self.lightPixelCount = 0
+
+    def resize(self, width, height):
+        """Create the G-buffer and light buffer, unless they already have the given size"""
+        if (width, height) == (self.width, self.height):
+            return
+        self.release()
+        self.width, self.height = width, height
+
+        # albedo, position, normal, material
+        self.gBuffer = RenderTarget(
+            width, height, attachments=[(4, "f2"), (4, "f4"), (4, "f2"), (4, "f2")]
+        )
+        self.lightTexture = OpenGLUtils.createTexture((width, height), 4, dtype="f2")
+        self.lightBuffer = OpenGLUtils.resourceManager.add(
+            OpenGLUtils.ctx.framebuffer(color_attachments=[self.lightTexture]), "framebuffer"
+        )
+
+        # depth is read with texelFetch, not compared
+        self.gBuffer.depthTexture.compare_func = ""
+
+        albedo, position, normal, material = self.gBuffer.textures
+        self.lightingUniforms.setUniformValue("gPosition", position)
+        self.lightingUniforms.setUniformValue("gNormal", normal)
+        self.lightingUniforms.setUniformValue("gMaterial", material)
+        self.compositeUniforms.setUniformValue("gAlbedo", albedo)
+        self.compositeUniforms.setUniformValue("gPosition", position)
+        self.compositeUniforms.setUniformValue("gNormal", normal)
+        self.compositeUniforms.setUniformValue("gMaterial", material)
+        self.compositeUniforms.setUniformValue("gDepth", self.gBuffer.depthTexture)
+        self.compositeUniforms.setUniformValue("lightBuffer", self.lightTexture)
+
+    def beginGeometryPass(self):
+        """Use and clear the G-buffer; meshes are then drawn with their G-buffer programs"""
+        self.gBuffer.framebuffer.use()
+        OpenGLUtils.ctx.clear(0.0, 0.0, 0.0, 0.0, depth=1.0)
+
+    def renderLights(self, lightList, viewMatrix, projectionMatrix, renderState):
+        """Add the contribution of each light to the light buffer"""
+        ctx = OpenGLUtils.ctx
+        self.lightBuffer.use()
+        ctx.clear(0.0, 0.0, 0.0, 0.0)
+
+        # lights are summed; depth is not used
+        renderState.setDepth(False, False)
+        renderState.setBlending("additive")
+        renderState.useProgram(self.lightingProgram)
+
+        ambient = np.zeros(3)
+        self.lightPassCount = 0
+        self.lightPixelCount = 0
+        uniforms = self.lightingUniforms
+        for light in lightList:
+            lightUniforms = light.uniformList
+            color = np.multiply(
+                lightUniforms.getUniformValue("color"), lightUniforms.getUniformValue("strength")
+            )
+            if lightUniforms.getUniformValue("isAmbient"):
+                ambient += color
+                continue
+            if lightUniforms.getUniformValue("isDirectional"):
+                lightType = _DIRECTIONAL
+            elif lightUniforms.getUniformValue("isPoint"):
+                lightType = _POINT
+            else:
+                continue
+
+            distance = lightUniforms.getUniformValue("distance")
+            scissor = None
+            if lightType == _POINT and distance > 0:
+                scissor = self._getScissor(
+                    lightUniforms.getUniformValue("position"),
+                    distance,
+                    viewMatrix,
+                    projectionMatrix,
+                )
+                if scissor is None:
+                    continue
+
+            uniforms.setUniformValue("lightType", lightType)
+            uniforms.setUniformValue("lightColor", list(color))
+            uniforms.setUniformValue("lightPosition", lightUniforms.getUniformValue("position"))
+            uniforms.setUniformValue("lightDirection", lightUniforms.getUniformValue("direction"))
+            uniforms.setUniformValue("lightDistance", distance)
+            uniforms.update(self.lightingProgram)
+
+            ctx.scissor = scissor
+            self.lightingQuad.render(moderngl.TRIANGLE_STRIP)
+            renderState.countDraw(4)
+            self.lightPassCount += 1
+            self.lightPixelCount += (
+                scissor[2] * scissor[3] if scissor is not None else self.width * self.height
+            )
+        ctx.scissor = None
+
+        self.compositeUniforms.setUniformValue("ambientLight", list(ambient))
+
+    def _getScissor(self, position, distance, viewMatrix, projectionMatrix):
+        """Pixel rectangle (x, y, width, height) covering a light's sphere, or None if offscreen"""
+        center = np.asarray(viewMatrix)[0:3, 0:3] @ position + np.asarray(viewMatrix)[0:3, 3]
+        depth = -center[2]
+        radius = np.array([distance], dtype=float)
+        near, far = LightClusters.getDepthRange(np.asarray(projectionMatrix))
+        if depth + distance < near or depth - distance > far:
+            return None
+
+        bounds = []
+        for axis, count in ((0, self.width), (1, self.height)):
+            first, last = LightClusters._getTiles(
+                center[np.newaxis, axis],
+                radius,
+                np.array([depth - distance]),
+                np.array([depth + distance]),
+                np.asarray(projectionMatrix),
+                axis,
+                count,
+            )
+            first, last = max(int(first[0]), 0), min(int(last[0]), count - 1)
+            if last < first:
+                return None
+            bounds.append((first, last - first + 1))
+        (x, width), (y, height) = bounds
+        return (x, y, width, height)
+
+    def composite(self, viewport, renderState):
+        """Write lit pixels and G-buffer depth to framebuffer (which must be in use)"""
+        renderState.setDepth(True, True)
+        renderState.setBlending("alpha")
+        renderState.useProgram(self.compositeProgram)
+        self.compositeUniforms.setUniformValue("viewportOrigin", [viewport[0], viewport[1]])
+        self.compositeUniforms.update(self.compositeProgram)
+        self.compositeQuad.render(moderngl.TRIANGLE_STRIP)
+        renderState.countDraw(4)
+
+    def release(self):
+        if self.gBuffer is not None:
+            self.gBuffer.release()
+            OpenGLUtils.resourceManager.release(self.lightBuffer)
+            OpenGLUtils.resourceManager.release(self.lightTexture)
+        self.gBuffer = None
+        self.lightBuffer = None
+        self.lightTexture = None
+        self.width = self.height = 0
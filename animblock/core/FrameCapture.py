@@ -0,0 +1,166 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+from .OpenGLUtils import OpenGLUtils
+
+
+def _writeFrame(fileName, fileFormat, width, height, data):
+    """Flip and write one frame; runs on a worker thread or process"""
+    image = Image.frombytes("RGB", (width, height), data)
+    image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    if fileFormat == "png":
+        # compression level 1: frame sequences favor encode speed over file size
+        image.save(fileName, compress_level=1)
+    else:
+        with open(fileName, "wb") as rawFile:
+            rawFile.write(image.tobytes())
+    return fileName
+
+
+# records frames from the screen or a RenderTarget without stalling the render loop.
+#   pixels are read into a ring of pixel buffer objects (PBOs); a buffer is only
+#   mapped once the ring wraps around, by which time its GPU transfer has completed.
+#   encoding happens on a pool of threads (or processes), fed by a bounded queue.
+# fileFormat = "png" -> one PNG image per frame
+# fileFormat = "raw" -> one file of packed top-to-bottom RGB bytes per frame
+#   (for example: ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -i frame_%06d.rgb)
+class FrameCapture:
+    def __init__(
+        self,
+        directory="frames",
+        fileFormat="png",
+        filePrefix="frame_",
+        bufferCount=3,
+        queueSize=16,
+        workerCount=2,
+        useProcesses=False,
+    ):
+        if fileFormat not in ("png", "raw"):
+            raise Exception(f"Unknown capture format: {fileFormat}")
+
+        self.directory = directory
+        self.fileFormat = fileFormat
+        self.filePrefix = filePrefix
+        os.makedirs(directory, exist_ok=True)
+
+        self.ctx = OpenGLUtils.ctx
+
+        # ring of pixel buffers; pending[i] = (frameIndex, size) while buffers[i] is in flight
+        self.bufferCount = max(1, bufferCount)
+        self.buffers = []
+        self.pending = []
+        self.bufferSize = None
+        self.nextBuffer = 0
+
+        # frames waiting for (or being) encoded; capture blocks when the queue is full
+        self.queueSlots = threading.BoundedSemaphore(queueSize)
+        if useProcesses:
+            self.executor = ProcessPoolExecutor(max_workers=workerCount)
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=workerCount, thread_name_prefix="FrameCapture"
+            )
+        self.futures = []
+
+        self.frameIndex = 0
+        self.finished = False
+
+    def _allocateBuffers(self, size):
+        # previously submitted transfers must be flushed before resizing
+        self._flushPending()
+        for buffer in self.buffers:
+            buffer.release()
+        width, height = size
+        self.buffers = [
+            self.ctx.buffer(reserve=width * height * 3) for _ in range(self.bufferCount)
+        ]
+        self.pending = [None] * self.bufferCount
+        self.bufferSize = size
+        self.nextBuffer = 0
+
+    def capture(self, source=None, size=None):
+        """Queue the current contents of source (screen, RenderTarget or Framebuffer)"""
+        if source is None:
+            framebuffer = OpenGLUtils.screen
+        elif hasattr(source, "framebuffer"):
+            framebuffer = source.framebuffer
+        else:
+            framebuffer = source
+
+        if size is None:
+            size = tuple(framebuffer.size)
+        if size != self.bufferSize:
+            self._allocateBuffers(size)
+
+        # the buffer about to be reused holds the oldest transfer: hand it off first
+        index = self.nextBuffer
+        if self.pending[index] is not None:
+            self._submit(index)
+
+        # asynchronous readback into the pixel buffer (returns before the transfer completes)
+        framebuffer.read_into(
+            self.buffers[index], viewport=(0, 0, size[0], size[1]), components=3, alignment=1
+        )
+        self.pending[index] = (self.frameIndex, size)
+        self.frameIndex += 1
+        self.nextBuffer = (index + 1) % self.bufferCount
+
+    def _submit(self, index):
+        frameIndex, (width, height) = self.pending[index]
+        self.pending[index] = None
+        # mapping the buffer waits for its transfer, which normally finished frames ago
+        data = self.buffers[index].read()
+
+        extension = "png" if self.fileFormat == "png" else "rgb"
+        fileName = os.path.join(self.directory, f"{self.filePrefix}{frameIndex:06d}.{extension}")
+
+        self.queueSlots.acquire()
+        future = self.executor.submit(_writeFrame, fileName, self.fileFormat, width, height, data)
+        future.add_done_callback(lambda _future: self.queueSlots.release())
+        self.futures.append(future)
+        # forget completed frames (errors are raised by finish)
+        if len(self.futures) > 64:
+            self._collectFutures(wait=False)
+
+    def _flushPending(self):
+        # submit remaining transfers, oldest first
+        for offset in range(len(self.pending)):
+            index = (self.nextBuffer + offset) % len(self.pending)
+            if self.pending[index] is not None:
+                self._submit(index)
+
+    def _collectFutures(self, wait):
+        remaining = []
+        for future in self.futures:
+            if wait or future.done():
+                future.result()
+            else:
+                remaining.append(future)
+        self.futures = remaining
+
+    def finish(self):
+        """Write all outstanding frames, wait for the workers, and release buffers"""
+        if self.finished:
+            return
+        self._flushPending()
+        self._collectFutures(wait=True)
+        self.executor.shutdown(wait=True)
+        for buffer in self.buffers:
+            buffer.release()
+        self.buffers = []
+        self.finished = True
+
+    @staticmethod
+    def saveImageAsync(fileName, width, height, data):
+        """Flip and save already-read RGB pixel data without blocking the caller"""
+
+        def save():
+            _writeFrame(fileName, "png", width, height, data)
+            print(f"Screenshot saved as {fileName}")
+
+        thread = threading.Thread(target=save, name="SaveScreenshot")
+        thread.start()
+        return thread
@@ -0,0 +1,168 @@
+import moderngl
+from PIL import Image
+
+from .AssetLoader import AssetLoader
+from .FrameCapture import FrameCapture
+from .Input import Input
+from .OpenGLUtils import OpenGLUtils
+
+
+# windowless counterpart of Base, for batch jobs and CI machines without a display.
+# the scene is rendered into an offscreen framebuffer at a fixed resolution,
+#   and initialize/update/render are run for a fixed number of frames
+#   with a simulated (constant) deltaTime instead of wall-clock time.
+class HeadlessBase:
+    def __init__(self, width=640, height=640, frameCount=1, deltaTime=1 / 60, backend=None):
+        # Create a standalone ModernGL context (no window required)
+        self.ctx = HeadlessBase.createContext(backend)
+
+        self.window_width = width
+        self.window_height = height
+        self.framebuffer = None
+        self._createFramebuffer(width, height)
+
+        # Set the global context in OpenGLUtils;
+        #   the offscreen framebuffer takes the place of the window
+        OpenGLUtils.setContext(self.ctx, self.framebuffer)
+
+        # Enable depth testing and blending (same setup as Base)
+        self.ctx.enable(moderngl.DEPTH_TEST)
+        self.ctx.enable(moderngl.BLEND)
+
+        # input is never triggered, but examples and controllers expect it to exist
+        self.input = Input()
+
+        self.frameCount = frameCount
+        self.frameNumber = 0
+        self.deltaTime = deltaTime
+        # simulated time, advanced by deltaTime each frame
+        self.clock = 0
+        self.running = True
+
+        # Renderer
+        self.renderer = None
+        self.camera = None
+        self.scene = None
+
+        # set by startRecording
+        self.frameCapture = None
+
+        # textures and models loaded in the background (see AssetLoader)
+        self.assetLoader = AssetLoader()
+
+    @staticmethod
+    def createContext(backend=None):
+        """Create a standalone OpenGL 3.3 context, falling back to EGL"""
+        if backend is not None:
+            return moderngl.create_standalone_context(require=330, backend=backend)
+        try:
+            return moderngl.create_standalone_context(require=330)
+        except Exception:
+            # default backend needs a display (X11/WGL/CGL); EGL does not
+            return moderngl.create_standalone_context(require=330, backend="egl")
+
+    def _createFramebuffer(self, width, height):
+        if self.framebuffer is not None:
+            self.framebuffer.release()
+            self.colorBuffer.release()
+            self.depthBuffer.release()
+
+        self.colorBuffer = self.ctx.renderbuffer((width, height), 4)
+        self.depthBuffer = self.ctx.depth_renderbuffer((width, height))
+        self.framebuffer = self.ctx.framebuffer(
+            color_attachments=[self.colorBuffer], depth_attachment=self.depthBuffer
+        )
+        self.framebuffer.use()
+
+    def setWindowTitle(self, text):
+        # no window to label
+        pass
+
+    def setWindowSize(self, width, height):
+        self.window_width = width
+        self.window_height = height
+        self._createFramebuffer(width, height)
+        OpenGLUtils.screen = self.framebuffer
+
+        if self.renderer:
+            self.renderer.screen = self.framebuffer
+            self.renderer.setViewportSize(width, height)
+
+        if self.camera:
+            aspect_ratio = width / float(height)
+            self.camera.setPerspective(
+                self.camera.fov, aspect_ratio, self.camera.near, self.camera.far
+            )
+
+    def initialize(self):
+        pass
+
+    def update(self):
+        pass
+
+    def render(self):
+        pass
+
+    def run(self, frameCount=None):
+        if frameCount is not None:
+            self.frameCount = frameCount
+
+        self.initialize()
+
+        while self.frameNumber < self.frameCount and self.running:
+            self.input.update()
+
+            # Create the GPU objects of assets loaded since the last frame
+            self.assetLoader.processCompleted()
+
+            # Update the scene
+            self.update()
+
+            # Render the scene
+            self.render()
+
+            if self.frameCapture is not None:
+                self.frameCapture.capture(self.framebuffer)
+
+            self.frameNumber += 1
+            self.clock += self.deltaTime
+
+        # Cleanup
+        self.cleanup()
+        self.stopRecording()
+        self.assetLoader.shutdown()
+        self.close()
+
+    def cleanup(self):
+        pass
+
+    def close(self):
+        """Release the offscreen framebuffer and the context"""
+        if self.ctx is None:
+            return
+        self.framebuffer.release()
+        self.colorBuffer.release()
+        self.depthBuffer.release()
+        self.ctx.release()
+        self.ctx = None
+
+    # record every subsequent frame into directory (see FrameCapture for options)
+    def startRecording(self, directory="frames", fileFormat="png", **options):
+        self.stopRecording()
+        self.frameCapture = FrameCapture(directory, fileFormat, **options)
+
+    def stopRecording(self):
+        if self.frameCapture is not None:
+            self.frameCapture.finish()
+            self.frameCapture = None
+
+    def readImage(self):
+        """Return the current contents of the offscreen framebuffer as a PIL image"""
+        data = self.framebuffer.read(components=3)
+        image = Image.frombytes("RGB", (self.window_width, self.window_height), data)
+        return image.transpose(Image.FLIP_TOP_BOTTOM)
+
+    def saveScreenshot(self, fileName):
+        width, height = self.window_width, self.window_height
+        data = self.framebuffer.read(components=3, alignment=1)
+        FrameCapture.saveImageAsync(fileName, width, height, data)
@@ -0,0 +1,151 @@
+import numpy as np
+
+from .Mesh import Mesh
+from .OpenGLUtils import OpenGLUtils
+from .Uniform import Uniform
+
+
+# draws many copies of a geometry with a single draw call.
+#   each instance has its own transformation matrix (applied before the
+#   transform of the InstancedMesh itself) and, optionally, its own color.
+#   instance data is kept in numpy arrays and copied to per-instance
+#   vertex buffers (attribute divisor 1) before the next draw after a change.
+# the material must be created with useInstancing=True.
+class InstancedMesh(Mesh):
+    isInstanced = True
+
+    def __init__(self, geometry, material, count, useColors=False):
+        if "USE_INSTANCING" not in material.defines:
+            raise Exception("InstancedMesh requires a material created with useInstancing=True")
+
+        super().__init__(geometry, material)
+
+        # number of instances with storage, and number of instances drawn
+        self.count = count
+        self.instanceCount = count
+
+        # row-major like all other matrices; shape (count, 4, 4)
+        self.instanceMatrices = np.tile(np.identity(4, dtype=np.float32), (count, 1, 1))
+        self.matrixBuffer = OpenGLUtils.createBuffer(reserve=count * 64, owner=self)
+        # incremented when instance matrices or the instance count change
+        self.instanceVersion = 0
+        self.matricesChanged = True
+
+        # RGB color per instance, multiplied with the material color; shape (count, 3)
+        self.useColors = useColors
+        self.instanceColors = None
+        self.colorBuffer = None
+        self.colorsChanged = False
+        if useColors:
+            self.instanceColors = np.ones((count, 3), dtype=np.float32)
+            self.colorBuffer = OpenGLUtils.createBuffer(reserve=count * 12, owner=self)
+            self.colorsChanged = True
+        self.uniformList.addUniform(Uniform("bool", "useInstanceColors", int(useColors)))
+
+        # vertex arrays combining geometry and instance buffers; index by program object
+        self.vaoData = {}
+        # geometry and buffer layout version the vertex arrays were created for
+        self.vaoLayout = (geometry, geometry.layoutVersion)
+
+    @property
+    def matricesChanged(self):
+        return self._matricesChanged
+
+    # code editing instanceMatrices directly sets matricesChanged to True,
+    #   so every change of the matrices is also counted here
+    @matricesChanged.setter
+    def matricesChanged(self, changed):
+        if changed:
+            self.instanceVersion += 1
+        self._matricesChanged = changed
+
+    def setInstanceCount(self, instanceCount):
+        """Draw only the first instanceCount instances"""
+        instanceCount = min(max(instanceCount, 0), self.count)
+        if instanceCount != self.instanceCount:
+            self.instanceCount = instanceCount
+            self.instanceVersion += 1
+
+    def setInstanceMatrices(self, matrices, start=0):
+        """Set the matrices of instances start, start+1, ... from an array of shape (n, 4, 4)"""
+        matrices = np.asarray(matrices, dtype=np.float32).reshape(-1, 4, 4)
+        self.instanceMatrices[start : start + len(matrices)] = matrices
+        self.matricesChanged = True
+
+    def setInstanceMatrix(self, index, matrix):
+        self.instanceMatrices[index] = matrix
+        self.matricesChanged = True
+
+    def setInstancePositions(self, positions, start=0):
+        """Set only the translation of instances start, start+1, ... from an array of shape (n, 3)"""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        self.instanceMatrices[start : start + len(positions), 0:3, 3] = positions
+        self.matricesChanged = True
+
+    def getInstanceMatrix(self, index):
+        return self.instanceMatrices[index]
+
+    def setInstanceColors(self, colors, start=0):
+        """Set the colors of instances start, start+1, ... from an array of shape (n, 3)"""
+        if not self.useColors:
+            raise Exception("InstancedMesh was created without instance colors (useColors=False)")
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        self.instanceColors[start : start + len(colors)] = colors
+        self.colorsChanged = True
+
+    def setInstanceColor(self, index, color):
+        self.setInstanceColors([color], start=index)
+
+    def getWorldBoundingSphere(self):
+        # instances may be anywhere; the geometry bounds only cover one of them
+        return None
+
+    def getVAO(self, program):
+        """Return the vertex array combining geometry attributes and instance data"""
+        resourceManager = OpenGLUtils.resourceManager
+        layout = (self.geometry, self.geometry.layoutVersion)
+        if layout[0] is not self.vaoLayout[0] or layout[1] != self.vaoLayout[1]:
+            for vao in self.vaoData.values():
+                resourceManager.release(vao)
+            self.vaoData = {}
+            self.vaoLayout = layout
+
+        vao = self.vaoData.get(program)
+        if vao is None:
+            resourceManager.releaseVertexArrays(self.vaoData)
+            content = self.geometry.getVAOContent(program)
+            if "instanceMatrix" in program:
+                content.append((self.matrixBuffer, "16f/i", "instanceMatrix"))
+            if self.colorBuffer is not None and "instanceColor" in program:
+                content.append((self.colorBuffer, "3f/i", "instanceColor"))
+            vao = OpenGLUtils.createVertexArray(
+                program, content, owner=self, indexBuffer=self.geometry.getIndexBuffer()
+            )
+            self.vaoData[program] = vao
+        return vao
+
+    def release(self):
+        """Release the instance buffers and vertex arrays (the geometry is not released)"""
+        OpenGLUtils.resourceManager.releaseOwner(self)
+        self.vaoData = {}
+        self.matrixBuffer = None
+        self.colorBuffer = None
+
+    def renderVAO(self, vao):
+        # copy changed instance data to the GPU (once, even if drawn in several passes)
+        if self.matricesChanged:
+            # OpenGL reads each matrix column by column
+            OpenGLUtils.writeBuffer(
+                self.matrixBuffer, self.instanceMatrices.transpose(0, 2, 1).tobytes()
+            )
+            self.matricesChanged = False
+        if self.colorsChanged:
+            OpenGLUtils.writeBuffer(self.colorBuffer, self.instanceColors.tobytes())
+            self.colorsChanged = False
+
+        if self.instanceCount > 0:
+            drawCount = self.geometry.getDrawCount()
+            vao.render(
+                mode=self.material.drawStyle, vertices=drawCount, instances=self.instanceCount
+            )
+            OpenGLUtils.renderState.countDraw(drawCount * self.instanceCount)
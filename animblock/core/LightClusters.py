@@ -0,0 +1,393 @@
+import moderngl
+import numpy as np
+
+from .OpenGLUtils import OpenGLUtils
+from .Uniform import Uniform, UniformList
+
+
+# number of light indices stored per row of the index texture
+_INDEX_ROW_LENGTH = 1024
+
+# light types stored in the light data texture
+_DIRECTIONAL = 1
+_POINT = 2
+
+
+# light data for clustered (Forward+) shading, which supports any number of lights.
+#   the view frustum is split into tileCountX * tileCountY screen tiles
+#   and sliceCount depth slices (exponentially spaced for perspective cameras);
+#   each frame, point lights with a distance are assigned (with numpy) to the clusters
+#   their sphere of influence overlaps, and fragments only evaluate the lights
+#   of their own cluster. lights without a bounded influence (directional lights,
+#   point lights without a distance) are evaluated by every fragment,
+#   and ambient lights are summed into a single color.
+# data is stored in textures read by shaderCode:
+#   lightData:    3 texels per light: (position, distance), (color * strength, type), direction
+#   clusterData:  (offset, count) of the lights of each cluster within lightIndices
+#   lightIndices: rows of lightData, listed by cluster
+# enabled by Renderer.clusteredLighting; see SurfaceBasicMaterial (USE_CLUSTERED_LIGHTS).
+class LightClusters:
+    shaderCode = """
+    uniform sampler2D lightData;
+    uniform usampler2D clusterData;
+    uniform usampler2D lightIndices;
+    uniform int globalLightCount;
+    uniform vec3 ambientLight;
+
+    uniform ivec3 clusterCount;
+    // viewport position and size in pixels
+    uniform vec4 clusterViewport;
+    // slice = depthScale * f(depth) + depthBias, where f is log for perspective cameras
+    uniform vec2 clusterDepthParams;
+    uniform bool clusterLogDepth;
+
+    vec3 clusterLightCalculation(int index, vec3 fragPosition, vec3 unitNormal)
+    {
+        vec4 colorType = texelFetch(lightData, ivec2(1, index), 0);
+        if ( colorType.w < 1.5 )
+        {
+            vec3 direction = texelFetch(lightData, ivec2(2, index), 0).xyz;
+            return colorType.rgb * max( dot(unitNormal, -direction), 0.0 );
+        }
+        vec4 positionDistance = texelFetch(lightData, ivec2(0, index), 0);
+        vec3 offset = positionDistance.xyz - fragPosition;
+        float lightDistance = length(offset);
+        float cosAngle = max( dot(unitNormal, offset / max(lightDistance, 1e-6)), 0.0 );
+        return colorType.rgb * cosAngle * getAttenuation(lightDistance, positionDistance.w);
+    }
+
+    vec3 clusteredLightCalculation(vec3 fragPosition, vec3 fragNormal)
+    {
+        vec3 unitNormal = normalize(fragNormal);
+        vec3 totalLight = ambientLight;
+
+        for (int n = 0; n < globalLightCount; n++)
+            totalLight += clusterLightCalculation( n, fragPosition, unitNormal );
+
+        // cluster containing this fragment
+        vec2 tile = (gl_FragCoord.xy - clusterViewport.xy) / clusterViewport.zw
+            * vec2(clusterCount.xy);
+        float depth = -(viewMatrix * vec4(fragPosition, 1)).z;
+        float slice = clusterDepthParams.x * (clusterLogDepth ? log(max(depth, 1e-6)) : depth)
+            + clusterDepthParams.y;
+        ivec3 cluster = clamp( ivec3(ivec2(tile), int(slice)), ivec3(0), clusterCount - 1 );
+
+        uvec2 range = texelFetch(
+            clusterData, ivec2(cluster.x + cluster.y * clusterCount.x, cluster.z), 0 ).xy;
+        for (uint i = range.x; i < range.x + range.y; i++)
+        {
+            int index = int( texelFetch(lightIndices, ivec2(i % 1024u, i / 1024u), 0).r );
+            totalLight += clusterLightCalculation( index, fragPosition, unitNormal );
+        }
+        return totalLight;
+    }
+    """
+
+    def __init__(self, tileCountX=16, tileCountY=9, sliceCount=24):
+        self.tileCountX = tileCountX
+        self.tileCountY = tileCountY
+        self.sliceCount = sliceCount
+
+        # textures are replaced by larger ones when the light count grows
+        self.lightTexture = None
+        self.indexTexture = None
+        self.clusterTexture = LightClusters._createTexture(
+            (tileCountX * tileCountY, sliceCount), 2, "u4"
+        )
+
+        # view space bounding boxes of the clusters; key is the projection they were built for
+        self.clusterBoundsKey = None
+        self.clusterMin = None
+        self.clusterMax = None
+        # depth range and slicing of the projection
+        self.near = None
+        self.far = None
+        self.perspective = True
+        self.sliceDepths = None
+
+        # results of the latest update
+        self.clusteredLightCount = 0
+        self.globalLightCount = 0
+        # number of (light, cluster) pairs stored
+        self.assignmentCount = 0
+
+        self.uniformList = UniformList()
+        self.uniformList.addUniform(Uniform("sampler2D", "lightData", None))
+        self.uniformList.addUniform(Uniform("sampler2D", "clusterData", self.clusterTexture))
+        self.uniformList.addUniform(Uniform("sampler2D", "lightIndices", None))
+        self.uniformList.addUniform(Uniform("int", "globalLightCount", 0))
+        self.uniformList.addUniform(Uniform("vec3", "ambientLight", [0, 0, 0]))
+        self.uniformList.addUniform(
+            Uniform("ivec3", "clusterCount", [tileCountX, tileCountY, sliceCount])
+        )
+        self.uniformList.addUniform(Uniform("vec4", "clusterViewport", [0, 0, 1, 1]))
+        self.uniformList.addUniform(Uniform("vec2", "clusterDepthParams", [1, 0]))
+        self.uniformList.addUniform(Uniform("bool", "clusterLogDepth", 0))
+
+    @staticmethod
+    def _createTexture(size, components, dtype):
+        texture = OpenGLUtils.createTexture(size, components, dtype=dtype)
+        # integer textures cannot be filtered; all textures are read with texelFetch
+        texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        return texture
+
+    @staticmethod
+    def _writeTexture(texture, data, components, dtype):
+        """Write rows of data to texture, replacing it by a larger one if necessary"""
+        width = data.shape[1] // components
+        height = max(len(data), 1)
+        if texture is None or texture.height < height or texture.width != width:
+            if texture is not None:
+                OpenGLUtils.resourceManager.release(texture)
+            # rows are allocated in powers of two, so that growing lists rarely reallocate
+            capacity = 1 << (height - 1).bit_length()
+            texture = LightClusters._createTexture((width, capacity), components, dtype)
+        if len(data) > 0:
+            texture.write(data.tobytes(), viewport=(0, 0, width, len(data)))
+        return texture
+
+    @staticmethod
+    def getDepthRange(projectionMatrix):
+        """Near and far view depths of a perspective or orthographic projection"""
+        c, d = projectionMatrix[2, 2], projectionMatrix[2, 3]
+        if projectionMatrix[3, 2] != 0:
+            return d / (c - 1), d / (c + 1)
+        near, far = (d + 1) / c, (d - 1) / c
+        return min(near, far), max(near, far)
+
+    def _updateClusterBounds(self, projectionMatrix):
+        """Calculate view space bounding boxes of all clusters for projectionMatrix"""
+        key = projectionMatrix.tobytes()
+        if key == self.clusterBoundsKey:
+            return
+        self.clusterBoundsKey = key
+
+        P = projectionMatrix
+        perspective = P[3, 2] != 0
+        near, far = LightClusters.getDepthRange(P)
+        self.near, self.far, self.perspective = near, far, perspective
+
+        # depths bounding each slice
+        fractions = np.linspace(0, 1, self.sliceCount + 1)
+        if perspective:
+            sliceDepths = near * (far / near) ** fractions
+        else:
+            sliceDepths = near + (far - near) * fractions
+        self.sliceDepths = sliceDepths
+
+        def getViewCoordinates(ndc, row, depth):
+            # inverse of ndc = (P[row] . (v, -depth, 1)) / w, for the given depth
+            z = -depth
+            w = P[3, 2] * z + P[3, 3]
+            return (ndc * w - P[row, 2] * z - P[row, 3]) / P[row, row]
+
+        bounds = []
+        for axis, count in ((0, self.tileCountX), (1, self.tileCountY)):
+            edges = np.linspace(-1, 1, count + 1)
+            # shape (slices, tiles, 4): both tile edges at both depths of each slice
+            corners = np.stack(
+                [
+                    getViewCoordinates(edge, axis, depth)
+                    for edge in (edges[:-1], edges[1:])
+                    for depth in (sliceDepths[:-1, np.newaxis], sliceDepths[1:, np.newaxis])
+                ],
+                axis=-1,
+            )
+            bounds.append((corners.min(axis=-1), corners.max(axis=-1)))
+
+        # cluster index = (slice * tileCountY + y) * tileCountX + x
+        (xMin, xMax), (yMin, yMax) = bounds
+        self.clusterMin = np.stack(
+            np.broadcast_arrays(
+                xMin[:, np.newaxis, :],
+                yMin[:, :, np.newaxis],
+                -sliceDepths[1:, np.newaxis, np.newaxis],
+            ),
+            axis=-1,
+        ).reshape(-1, 3)
+        self.clusterMax = np.stack(
+            np.broadcast_arrays(
+                xMax[:, np.newaxis, :],
+                yMax[:, :, np.newaxis],
+                -sliceDepths[:-1, np.newaxis, np.newaxis],
+            ),
+            axis=-1,
+        ).reshape(-1, 3)
+
+        # parameters of the slice calculation in shaderCode
+        if perspective:
+            scale = self.sliceCount / np.log(far / near)
+            params = [scale, -scale * np.log(near)]
+        else:
+            scale = self.sliceCount / (far - near)
+            params = [scale, -scale * near]
+        self.uniformList.setUniformValue("clusterDepthParams", params)
+        self.uniformList.setUniformValue("clusterLogDepth", 1 if perspective else 0)
+
+    def _getSlices(self, depth):
+        """Index of the slice containing each view depth (not clamped)"""
+        if self.perspective:
+            depth = np.maximum(depth, 1e-6)
+            return np.floor(
+                self.sliceCount * np.log(depth / self.near) / np.log(self.far / self.near)
+            )
+        return np.floor(self.sliceCount * (depth - self.near) / (self.far - self.near))
+
+    @staticmethod
+    def _getTiles(coordinates, radii, nearDepth, farDepth, projectionMatrix, axis, count):
+        """First and last screen tiles covered by the projections of boxes
+        centered at coordinates (along axis), between the given view depths"""
+        P = projectionMatrix
+        # the projection of a box lies within the projections of its corners
+        #   when the whole box is in front of the camera
+        offsets = np.array([-1, 1, -1, 1])
+        edges = coordinates[:, np.newaxis] + offsets * radii[:, np.newaxis]
+        z = -np.stack([nearDepth, nearDepth, farDepth, farDepth], axis=-1)
+        w = P[3, 2] * z + P[3, 3]
+        inFront = (w > 1e-6).all(axis=1)
+        ndc = (P[axis, axis] * edges + P[axis, 2] * z + P[axis, 3]) / np.where(w > 1e-6, w, 1)
+        first = np.where(inFront, np.floor((ndc.min(axis=1) + 1) / 2 * count), 0)
+        last = np.where(inFront, np.floor((ndc.max(axis=1) + 1) / 2 * count), count - 1)
+        return first, last
+
+    def update(self, lightList, viewMatrix, projectionMatrix, viewport):
+        """Assign the lights of lightList to clusters, and store the data in the textures"""
+        viewMatrix = np.asarray(viewMatrix, dtype=float)
+        projectionMatrix = np.asarray(projectionMatrix, dtype=float)
+        self._updateClusterBounds(projectionMatrix)
+
+        # rows of lightData, with strength in the last column until colors are scaled
+        ambient = np.zeros(3)
+        globalRows = []
+        pointRows = []
+        for light in lightList:
+            # read directly: this loop runs for every light, every frame
+            uniforms = light.uniformList.data
+            if uniforms["isAmbient"].value:
+                ambient += np.multiply(uniforms["color"].value, uniforms["strength"].value)
+                continue
+
+            if uniforms["isDirectional"].value:
+                lightType = _DIRECTIONAL
+            elif uniforms["isPoint"].value:
+                lightType = _POINT
+            else:
+                continue
+            distance = uniforms["distance"].value
+            row = [
+                *uniforms["position"].value,
+                distance,
+                *uniforms["color"].value,
+                lightType,
+                *uniforms["direction"].value,
+                uniforms["strength"].value,
+            ]
+            if lightType == _POINT and distance > 0:
+                pointRows.append(row)
+            else:
+                globalRows.append(row)
+
+        # global lights come first; clustered light indices are rows of lightData
+        lightData = np.array(globalRows + pointRows, dtype=np.float32).reshape(-1, 12)
+        lightData[:, 4:7] *= lightData[:, 11:12]
+        lightData[:, 11] = 0
+        self.lightTexture = LightClusters._writeTexture(self.lightTexture, lightData, 4, "f4")
+
+        clusterCount = self.tileCountX * self.tileCountY * self.sliceCount
+        indices = np.zeros(0, dtype=np.uint32)
+        counts = np.zeros(clusterCount, dtype=np.uint32)
+        if pointRows:
+            positions = lightData[len(globalRows) :, 0:3].astype(float)
+            radii = lightData[len(globalRows) :, 3].astype(float)
+            centers = positions @ viewMatrix[0:3, 0:3].T + viewMatrix[0:3, 3]
+            lights, clusters = self._assignLights(centers, radii, projectionMatrix)
+
+            # lights of each cluster are listed together, in light order
+            order = np.lexsort((lights, clusters))
+            indices = (lights[order] + len(globalRows)).astype(np.uint32)
+            counts = np.bincount(clusters, minlength=clusterCount).astype(np.uint32)
+
+        offsets = np.zeros(clusterCount, dtype=np.uint32)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        clusterData = np.stack([offsets, counts], axis=-1).reshape(self.sliceCount, -1)
+        self.clusterTexture.write(clusterData.tobytes())
+
+        rowCount = -(-len(indices) // _INDEX_ROW_LENGTH)
+        indexData = np.zeros(rowCount * _INDEX_ROW_LENGTH, dtype=np.uint32)
+        indexData[: len(indices)] = indices
+        self.indexTexture = LightClusters._writeTexture(
+            self.indexTexture, indexData.reshape(rowCount, _INDEX_ROW_LENGTH), 1, "u4"
+        )
+
+        self.globalLightCount = len(globalRows)
+        self.clusteredLightCount = len(pointRows)
+        self.assignmentCount = len(indices)
+
+        uniformList = self.uniformList
+        uniformList.setUniformValue("lightData", self.lightTexture)
+        uniformList.setUniformValue("lightIndices", self.indexTexture)
+        uniformList.setUniformValue("globalLightCount", self.globalLightCount)
+        uniformList.setUniformValue("ambientLight", list(ambient))
+        uniformList.setUniformValue("clusterViewport", list(viewport))
+
+    @staticmethod
+    def _expandRanges(first, last):
+        """For ranges first[i]..last[i] (inclusive): the range index and value of every item"""
+        counts = last - first + 1
+        index = np.repeat(np.arange(len(first)), counts)
+        values = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return index, values + first[index]
+
+    def _assignLights(self, centers, radii, projectionMatrix):
+        """Return (light index, cluster index) arrays of the clusters each sphere overlaps"""
+        countX, countY, countZ = self.tileCountX, self.tileCountY, self.sliceCount
+
+        # slices overlapped by each sphere
+        depth = -centers[:, 2]
+        firstZ = np.clip(self._getSlices(depth - radii), 0, countZ - 1).astype(np.int64)
+        lastZ = self._getSlices(depth + radii)
+        visible = (lastZ >= 0) & (self._getSlices(depth - radii) < countZ)
+        lastZ = np.clip(lastZ, 0, countZ - 1).astype(np.int64)
+        lightIndex = np.flatnonzero(visible)
+        pairs, slices = LightClusters._expandRanges(firstZ[lightIndex], lastZ[lightIndex])
+        lights = lightIndex[pairs]
+
+        # part of each sphere within each of its slices: depth range, and the radius
+        #   of its largest cross-section there, which bounds it on screen
+        center, radius = centers[lights], radii[lights]
+        nearDepth = np.maximum(depth[lights] - radius, self.sliceDepths[slices])
+        farDepth = np.minimum(depth[lights] + radius, self.sliceDepths[slices + 1])
+        offset = np.maximum(np.maximum(nearDepth - depth[lights], depth[lights] - farDepth), 0)
+        crossRadius = np.sqrt(np.maximum(radius**2 - offset**2, 0))
+
+        ranges = []
+        for axis, count in ((0, countX), (1, countY)):
+            first, last = LightClusters._getTiles(
+                center[:, axis], crossRadius, nearDepth, farDepth, projectionMatrix, axis, count
+            )
+            ranges.append((first, last))
+        (firstX, lastX), (firstY, lastY) = ranges
+        visible = (lastX >= 0) & (firstX < countX) & (lastY >= 0) & (firstY < countY)
+        lights, slices = lights[visible], slices[visible]
+        firstX = np.clip(firstX[visible], 0, countX - 1).astype(np.int64)
+        lastX = np.clip(lastX[visible], 0, countX - 1).astype(np.int64)
+        firstY = np.clip(firstY[visible], 0, countY - 1).astype(np.int64)
+        lastY = np.clip(lastY[visible], 0, countY - 1).astype(np.int64)
+
+        # candidate clusters: rows of tiles, then the tiles of each row
+        pairs, y = LightClusters._expandRanges(firstY, lastY)
+        rows, x = LightClusters._expandRanges(firstX[pairs], lastX[pairs])
+        pairs = pairs[rows]
+        lights = lights[pairs]
+        clusters = (slices[pairs] * countY + y[rows]) * countX + x
+
+        # keep clusters whose bounding box intersects the sphere
+        center = centers[lights]
+        closest = np.clip(center, self.clusterMin[clusters], self.clusterMax[clusters])
+        overlap = ((closest - center) ** 2).sum(axis=1) <= radii[lights] ** 2
+        return lights[overlap], clusters[overlap]
+
+    def release(self):
+        for texture in (self.lightTexture, self.indexTexture, self.clusterTexture):
+            if texture is not None:
+                OpenGLUtils.resourceManager.release(texture)
@@ -1,14 +1,33 @@
+import numpy as np
+
 from .Object3D import Object3D
+from .OpenGLUtils import OpenGLUtils
 from .Uniform import Uniform, UniformList
 
 
 class Mesh(Object3D):
+    # True for meshes drawing many copies of their geometry (see InstancedMesh)
+    isInstanced = False
+
     def __init__(self, geometry, material):
         super().__init__()
+        # StaticBatch drawing this mesh, if any; notified of changes
+        self.staticBatch = None
+        # incremented when the geometry, material or visibility is replaced;
+        #   the RenderQueue keeps the sort key of the mesh until then
+        self.renderVersion = 0
+
         self.geometry = geometry
         self.material = material
         self.visible = True
 
+        # False to draw the mesh even when its bounds are outside the camera view,
+        #   for example when a custom vertex shader moves vertices
+        self.frustumCulled = True
+        # world space bounding sphere, and the (world matrix, geometry version) it belongs to
+        self._worldBoundingSphere = None
+        self._worldBoundsKey = None
+
         self.uniformList = UniformList()
         self.uniformList.addUniform(Uniform("mat4", "modelMatrix", self.transform.matrix))
 
@@ -16,6 +35,54 @@ class Mesh(Object3D):
         self.castShadow = False
         self.uniformList.addUniform(Uniform("bool", "receiveShadow", 0))
 
+    @property
+    def castShadow(self):
+        return self._castShadow
+
+    @castShadow.setter
+    def castShadow(self, state):
+        self._castShadow = state
+        if self._scene is not None:
+            self._scene._updateShadowCaster(self)
+        if self.staticBatch is not None:
+            self.staticBatch.markChanged()
+
+    @property
+    def visible(self):
+        return self._visible
+
+    @visible.setter
+    def visible(self, state):
+        self._visible = state
+        self.renderVersion += 1
+        if self.staticBatch is not None:
+            self.staticBatch.markChanged()
+
+    @property
+    def geometry(self):
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry):
+        self._geometry = geometry
+        self.renderVersion += 1
+
+    @property
+    def material(self):
+        return self._material
+
+    @material.setter
+    def material(self, material):
+        self._material = material
+        self.renderVersion += 1
+        if self.staticBatch is not None:
+            self.staticBatch.markChanged()
+
+    def _invalidateWorldMatrix(self):
+        super()._invalidateWorldMatrix()
+        if self.staticBatch is not None:
+            self.staticBatch.markChanged()
+
     def setCastShadow(self, state=True):
         self.castShadow = state
 
@@ -25,6 +92,26 @@ class Mesh(Object3D):
         else:
             self.uniformList.setUniformValue("receiveShadow", 0)
 
+    def getWorldBoundingSphere(self):
+        """Return (center, radius) of a sphere containing the mesh in world space, or None if unknown"""
+        worldMatrix = self.getWorldMatrix()
+        version = self.geometry.version
+        # the world matrix is a new array whenever it is recalculated
+        key = self._worldBoundsKey
+        if key is not None and key[0] is worldMatrix and key[1] == version:
+            return self._worldBoundingSphere
+
+        self._worldBoundsKey = (worldMatrix, version)
+        self._worldBoundingSphere = None
+        sphere = self.geometry.getBoundingSphere()
+        if sphere is not None:
+            center, radius = sphere
+            rotation = worldMatrix[0:3, 0:3]
+            # the largest scale factor along any axis bounds the scaled radius
+            scale = np.sqrt((rotation**2).sum(axis=0).max())
+            self._worldBoundingSphere = (rotation @ center + worldMatrix[0:3, 3], radius * scale)
+        return self._worldBoundingSphere
+
     def render(self, program=None):
         """Render mesh using ModernGL"""
         if not self.visible:
@@ -34,11 +121,20 @@ class Mesh(Object3D):
         if program is None:
             program = self.material.program
 
+        # copy changed elements of attributes edited in place (see Geometry.markAttributeDirty)
+        if self.geometry.dirtyAttributes:
+            self.geometry.uploadDirtyRanges()
+
         # Get VAO for this program
-        vao = self.geometry.getVAO(program)
+        vao = self.getVAO(program)
 
         # Update mesh-specific uniforms
-        self.uniformList.setUniformValue("modelMatrix", self.getWorldMatrix())
+        # the world matrix is a new array whenever it is recalculated,
+        #   so an identical object means the uploaded matrix is still current
+        worldMatrix = self.getWorldMatrix()
+        modelMatrix = self.uniformList.data["modelMatrix"]
+        if modelMatrix.value is not worldMatrix:
+            modelMatrix.value = worldMatrix
         self.uniformList.update(program)
 
         # Update material uniforms
@@ -48,5 +144,17 @@ class Mesh(Object3D):
         self.material.updateRenderSettings()
 
         # Render the VAO
-        if self.geometry.vertexCount > 0:
-            vao.render(mode=self.material.drawStyle)
+        if self.geometry.getDrawCount() > 0:
+            self.renderVAO(vao)
+
+    def getVAO(self, program):
+        """Return the vertex array used to draw this mesh with program"""
+        return self.geometry.getVAO(program)
+
+    def renderVAO(self, vao):
+        """Issue the draw call; overridden by InstancedMesh"""
+        # the count is passed on, since buffers may have been resized after the vertex array
+        #   was created
+        drawCount = self.geometry.getDrawCount()
+        vao.render(mode=self.material.drawStyle, vertices=drawCount)
+        OpenGLUtils.renderState.countDraw(drawCount)
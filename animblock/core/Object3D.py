@@ -11,12 +11,43 @@ class Object3D:
         self.transform._objectRef = self
         self.parent = None
         self.children = []
+
+        # Scene containing this object (if any); kept up to date by add/remove
+        self._scene = None
         self.name = ""
+        self.tags = set()
 
         # Cache for world matrix calculation
         self._worldMatrix = None
         self._worldMatrixNeedsUpdate = True
-        self._lastTransformMatrix = np.copy(self.transform.matrix)
+        # bytes of the transform matrix, to detect direct edits of its values
+        self._lastTransformData = self.transform.matrix.tobytes()
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if self._scene is not None:
+            self._scene._unindexObject(self)
+        self._name = name
+        if self._scene is not None:
+            self._scene._indexObject(self)
+
+    def addTag(self, tag):
+        if self._scene is not None:
+            self._scene._unindexObject(self)
+        self.tags.add(tag)
+        if self._scene is not None:
+            self._scene._indexObject(self)
+
+    def removeTag(self, tag):
+        if self._scene is not None:
+            self._scene._unindexObject(self)
+        self.tags.discard(tag)
+        if self._scene is not None:
+            self._scene._indexObject(self)
 
     def add(self, child):
         self.children.append(child)
@@ -24,14 +55,25 @@ class Object3D:
         # Force update of child world matrix
         child._invalidateWorldMatrix()
 
+        # keep scene registries up to date
+        if child._scene is not None and child._scene is not self._scene:
+            child._scene._unregisterSubtree(child)
+        if self._scene is not None:
+            self._scene._registerSubtree(child)
+
     def remove(self, child):
         self.children.remove(child)
         child.parent = None
 
+        if child._scene is not None:
+            child._scene._unregisterSubtree(child)
+
     def _hasTransformChanged(self):
         """Check if transform has changed since last world matrix calculation."""
-        if not np.array_equal(self._lastTransformMatrix, self.transform.matrix):
-            self._lastTransformMatrix = np.copy(self.transform.matrix)
+        # comparing bytes is much faster than np.array_equal on small matrices
+        data = self.transform.matrix.tobytes()
+        if data != self._lastTransformData:
+            self._lastTransformData = data
             return True
         return False
 
@@ -58,13 +100,14 @@ class Object3D:
 
     # return a list of descendants in depth-first order
     def getDepthFirstList(self):
-        # elements added to list as a stack for depth-first traversal
+        # elements added to list as a stack for depth-first traversal;
+        #   children pushed in reverse so the first child is visited first
         unvisitedList = [self]
         visitedList = []
         while len(unvisitedList) > 0:
-            item = unvisitedList.pop(0)
+            item = unvisitedList.pop()
             visitedList.append(item)
-            unvisitedList = item.children + unvisitedList
+            unvisitedList.extend(reversed(item.children))
         return visitedList
 
     # return a list of descendants x with filterFunction(x) = True
@@ -3,22 +3,136 @@ from pathlib import Path
 import moderngl
 from PIL import Image
 
+from .ProgramCache import ProgramCache
+from .RenderState import RenderState
+from .ResourceManager import ResourceManager
+from .UniformBinder import UniformBinder
+
 
 class OpenGLUtils:
     ctx = None  # ModernGL context, set by Base class
+    screen = None  # default framebuffer rendered to when no RenderTarget is given
+    renderState = RenderState(ctx)  # cached pipeline state of the context
+    uniformBinder = UniformBinder(renderState)  # uniform upload state of the context's programs
+    resourceManager = ResourceManager()  # GPU objects of the context, their sizes and owners
+    programCache = ProgramCache(resourceManager)  # programs shared by materials with identical code
+
+    # running totals of buffers created and bytes written to buffers; see Renderer.stats
+    bufferAllocationCount = 0
+    bufferUploadBytes = 0
 
     @staticmethod
-    def initializeShaderFromCode(vertexShaderCode, fragmentShaderCode):
-        """Create shader program using ModernGL"""
-        try:
-            # Fix GLSL syntax for ModernGL compatibility
-            vertexShaderCode = OpenGLUtils._fixVertexShaderSyntax(vertexShaderCode)
-            fragmentShaderCode = OpenGLUtils._fixFragmentShaderSyntax(fragmentShaderCode)
+    def setContext(ctx, screen=None):
+        """Set the global ModernGL context and its default framebuffer"""
+        OpenGLUtils.ctx = ctx
+        OpenGLUtils.screen = screen if screen is not None else ctx.screen
+        OpenGLUtils.renderState = RenderState(ctx)
+        OpenGLUtils.uniformBinder = UniformBinder(OpenGLUtils.renderState)
+        OpenGLUtils.resourceManager = ResourceManager()
+        OpenGLUtils.programCache = ProgramCache(OpenGLUtils.resourceManager)
+
+    @staticmethod
+    def createBuffer(data=None, reserve=0, owner=None):
+        """
+        Create a buffer containing data (bytes, or an object exposing its memory, such as
+        a contiguous numpy array), or with reserve bytes of uninitialized storage;
+        it is released with owner (see ResourceManager), or by resourceManager.release(buffer)
+        """
+        OpenGLUtils.bufferAllocationCount += 1
+        if data is None:
+            buffer = OpenGLUtils.ctx.buffer(reserve=reserve)
+        else:
+            OpenGLUtils.bufferUploadBytes += memoryview(data).nbytes
+            buffer = OpenGLUtils.ctx.buffer(data)
+        return OpenGLUtils.resourceManager.add(buffer, "buffer", owner)
+
+    @staticmethod
+    def replaceBufferData(buffer, data):
+        """
+        Replace all contents of buffer by data (bytes, or a contiguous array). The old storage
+        is orphaned, so the GPU can keep drawing from it while new storage (of the new size,
+        if different) is written; the buffer object stays the same, and so do vertex arrays
+        """
+        size = memoryview(data).nbytes
+        if size == 0:
+            return
+        resize = size != buffer.size
+        buffer.orphan(size)
+        if resize:
+            OpenGLUtils.resourceManager.updateSize(buffer)
+        OpenGLUtils.writeBuffer(buffer, data)
 
-            program = OpenGLUtils.ctx.program(
+    @staticmethod
+    def createTexture(size, components, data=None, dtype="f1", owner=None):
+        """Create a texture of size (width, height), released with owner (see createBuffer)"""
+        texture = OpenGLUtils.ctx.texture(size, components, data, dtype=dtype)
+        return OpenGLUtils.resourceManager.add(texture, "texture", owner)
+
+    @staticmethod
+    def createVertexArray(program, content, owner=None, indexBuffer=None):
+        """
+        Create a vertex array from (buffer, format, name) entries, released with owner;
+        with indexBuffer (of uint32 vertex numbers), primitives are drawn by index
+        """
+        vao = OpenGLUtils.ctx.vertex_array(
+            program, content, index_buffer=indexBuffer, index_element_size=4
+        )
+        return OpenGLUtils.resourceManager.add(vao, "vertexArray", owner)
+
+    @staticmethod
+    def writeBuffer(buffer, data, offset=0):
+        """Write data (bytes, or a contiguous array) to an existing buffer"""
+        OpenGLUtils.bufferUploadBytes += memoryview(data).nbytes
+        buffer.write(data, offset=offset)
+
+    @staticmethod
+    def preprocessShaderCode(vertexShaderCode, fragmentShaderCode, defines=None):
+        """Return the vertex and fragment shader code as compiled (see initializeShaderFromCode)"""
+        # Fix GLSL syntax for ModernGL compatibility
+        vertexShaderCode = OpenGLUtils._fixVertexShaderSyntax(vertexShaderCode)
+        fragmentShaderCode = OpenGLUtils._fixFragmentShaderSyntax(fragmentShaderCode)
+
+        if defines:
+            vertexShaderCode = OpenGLUtils._insertDefines(vertexShaderCode, defines)
+            fragmentShaderCode = OpenGLUtils._insertDefines(fragmentShaderCode, defines)
+
+        return vertexShaderCode, fragmentShaderCode
+
+    @staticmethod
+    def initializeShaderFromCode(vertexShaderCode, fragmentShaderCode, defines=None):
+        """Create shader program using ModernGL
+
+        defines: names (or a dictionary of name: value) added to both shaders
+          as #define lines, to select optional code inside #ifdef blocks
+        """
+        vertexShaderCode, fragmentShaderCode = OpenGLUtils.preprocessShaderCode(
+            vertexShaderCode, fragmentShaderCode, defines
+        )
+        program = OpenGLUtils._compileProgram(vertexShaderCode, fragmentShaderCode)
+        return OpenGLUtils.resourceManager.add(program, "program")
+
+    @staticmethod
+    def getProgram(vertexShaderCode, fragmentShaderCode, defines=None):
+        """
+        Return a program for the given code, shared with all other users of identical code;
+        it is compiled on first use only. Call programCache.release(program) when done with it.
+        """
+        vertexShaderCode, fragmentShaderCode = OpenGLUtils.preprocessShaderCode(
+            vertexShaderCode, fragmentShaderCode, defines
+        )
+        return OpenGLUtils.programCache.acquire(
+            (vertexShaderCode, fragmentShaderCode),
+            lambda: OpenGLUtils.resourceManager.add(
+                OpenGLUtils._compileProgram(vertexShaderCode, fragmentShaderCode), "program"
+            ),
+        )
+
+    @staticmethod
+    def _compileProgram(vertexShaderCode, fragmentShaderCode):
+        try:
+            return OpenGLUtils.ctx.program(
                 vertex_shader=vertexShaderCode, fragment_shader=fragmentShaderCode
             )
-            return program
         except Exception as e:
             print("=== VERTEX SHADER ===")
             print(vertexShaderCode)
@@ -27,6 +141,19 @@ class OpenGLUtils:
             print("=====================")
             raise Exception(f"Shader compilation failed: {e}")
 
+    @staticmethod
+    def _insertDefines(code, defines):
+        """Add #define lines directly after the #version line"""
+        if not isinstance(defines, dict):
+            defines = dict.fromkeys(defines)
+        # sorted, so that the same set of defines always produces the same code
+        lines = "".join(
+            f"#define {name}\n" if value is None else f"#define {name} {value}\n"
+            for name, value in sorted(defines.items(), key=lambda item: item[0])
+        )
+        versionEnd = code.index("\n", code.index("#version")) + 1
+        return code[:versionEnd] + lines + code[versionEnd:]
+
     @staticmethod
     def _fixVertexShaderSyntax(code):
         """Fix vertex shader syntax for GLSL 330 core"""
@@ -38,7 +165,7 @@ class OpenGLUtils:
     def _fixFragmentShaderSyntax(code):
         """Fix fragment shader syntax for GLSL 330 core"""
         if "#version" not in code:
-            code = "#version 330 core\nout vec4 fragColor;\n" + code
+            code = "#version 330 core\nlayout (location = 0) out vec4 fragColor;\n" + code
 
         # Fix deprecated gl_FragColor
         code = code.replace("gl_FragColor", "fragColor")
@@ -60,8 +187,21 @@ class OpenGLUtils:
         return code
 
     @staticmethod
-    def initializeTexture(imageFileName):
-        """Load texture using ModernGL"""
+    def initializeTexture(imageFileName, owner=None):
+        """
+        Load texture using ModernGL; the texture is released with owner (for example, the
+        material using it), or by OpenGLUtils.resourceManager.release(texture). Without an
+        owner, it is released with the last material sampling it (see Material.setUniform).
+        """
+        image = OpenGLUtils.readImage(imageFileName)
+        return OpenGLUtils.initializeSurface(image, owner)
+
+    @staticmethod
+    def readImage(imageFileName):
+        """
+        Decode an image file into an RGBA PIL image; needs no context, so it may run on
+        another thread or process (see AssetLoader)
+        """
         # Convert to Path object
         image_path = Path(imageFileName)
 
@@ -75,11 +215,11 @@ class OpenGLUtils:
         # Convert to RGBA if not already
         if image.mode != "RGBA":
             image = image.convert("RGBA")
-        return OpenGLUtils.initializeSurface(image)
+        return image
 
     @staticmethod
-    def initializeSurface(image):
-        """Create ModernGL texture from PIL image"""
+    def initializeSurface(image, owner=None):
+        """Create ModernGL texture from PIL image, released with owner (see initializeTexture)"""
         # Flip image to match OpenGL's coordinate system
         image = image.transpose(Image.FLIP_TOP_BOTTOM)
 
@@ -88,7 +228,7 @@ class OpenGLUtils:
         textureData = image.tobytes()
 
         # Create ModernGL texture
-        texture = OpenGLUtils.ctx.texture((width, height), 4, textureData)
+        texture = OpenGLUtils.createTexture((width, height), 4, textureData, owner=owner)
 
         # Set filtering (equivalent to PyOpenGL settings)
         texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
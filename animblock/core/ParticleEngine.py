@@ -6,6 +6,7 @@ from ..geometry import Geometry
 from ..material import Material
 from ..mathutils import RandomUtils
 from .Mesh import Mesh
+from .UniformBlock import UniformBlock
 
 
 # =============================================================================
@@ -34,8 +35,10 @@ class ParticleGeometry(Geometry):
 
 class ParticleMaterial(Material):
     def __init__(self, texture=None, additiveBlending=False, alphaTest=0.5):
-        # vertex shader code
-        vsCode = """
+        # vertex shader code; camera data is read from the uniform block shared by all materials
+        vsCode = (
+            UniformBlock.cameraCode
+            + """
         in vec3  particlePosition;
         in vec3  particleColor;
         in float particleOpacity;
@@ -45,8 +48,6 @@ class ParticleMaterial(Material):
         out vec4  rgbaColor;
         out float alive;
 
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
 
         // all components are in the range [0...1]
@@ -66,6 +67,7 @@ class ParticleMaterial(Material):
             gl_Position = projectionMatrix * eyePosition;
         }
         """
+        )
 
         # fragment shader code
         fsCode = """
@@ -177,6 +179,9 @@ class ParticleEngine(Mesh):
         self.sizeTween = sizeTween
 
         self.particleList = []
+        # (start, end) index ranges of particles initialized or activated by the latest update;
+        #   their colors, opacities and sizes are written to the geometry by the next update
+        self.resetRanges = []
 
         # global properties particle setting data something something
         self.particleDeathAge = particleDeathAge
@@ -277,40 +282,50 @@ class ParticleEngine(Mesh):
     def update(self, dt):
         # store indices of particles that have died
         recycleIndexList = []
+        # first and last index of particles updated
+        firstIndex = None
+        lastIndex = None
 
         # update particle data
         for particle in self.particleList:
             # only update alive particles
             if particle.alive == 1:
                 self.updateParticle(particle, dt)
+                if firstIndex is None:
+                    firstIndex = particle.index
+                lastIndex = particle.index
 
                 # keep track of particles that just died
                 if particle.alive == 0:
                     recycleIndexList.append(particle.index)
 
-                # update attribute data
-                self.particleGeometry.attributeData["particlePosition"]["value"][particle.index] = (
-                    particle.position
-                )
-                self.particleGeometry.attributeData["particleColor"]["value"][particle.index] = (
-                    particle.color
-                )
-                self.particleGeometry.attributeData["particleOpacity"]["value"][particle.index] = (
-                    particle.opacity
-                )
-                self.particleGeometry.attributeData["particleSize"]["value"][particle.index] = (
-                    particle.size
-                )
-                self.particleGeometry.attributeData["particleAlive"]["value"][particle.index] = (
-                    particle.alive
-                )
-
-        # flag geometry attributes so updated data is resent to buffers
-        self.particleGeometry.processAttribute("particlePosition")
-        self.particleGeometry.processAttribute("particleColor")
-        self.particleGeometry.processAttribute("particleOpacity")
-        self.particleGeometry.processAttribute("particleSize")
-        self.particleGeometry.processAttribute("particleAlive")
+        # copy changed particle data to the geometry attribute arrays, and flag the elements
+        #   so that only those are resent to buffers; particles in between that are not alive
+        #   are copied too, which does not change them
+        if firstIndex is not None:
+            updatedRange = [(firstIndex, lastIndex + 1)]
+            attributeRanges = [
+                ("particlePosition", "position", updatedRange),
+                ("particleAlive", "alive", updatedRange),
+            ]
+            for name, field, tween in (
+                ("particleColor", "color", self.colorTween),
+                ("particleOpacity", "opacity", self.opacityTween),
+                ("particleSize", "size", self.sizeTween),
+            ):
+                # without a tween, values only change when a particle is (re)initialized
+                ranges = updatedRange if tween is not None else self.resetRanges
+                attributeRanges.append((name, field, ranges))
+
+            geometry = self.particleGeometry
+            for name, field, ranges in attributeRanges:
+                array = geometry.getAttributeArray(name)
+                for start, end in ranges:
+                    array[start:end] = [
+                        getattr(particle, field) for particle in self.particleList[start:end]
+                    ]
+                    geometry.markAttributeDirty(name, start, end)
+        self.resetRanges = []
 
         # check if particle emitter is still running
         if not self.emitterAlive:
@@ -331,6 +346,8 @@ class ParticleEngine(Mesh):
             # activate the particles
             for index in range(startIndex, endIndex):
                 self.particleList[index].alive = 1
+            if endIndex > startIndex:
+                self.resetRanges.append((startIndex, endIndex))
 
         # debug
         # if len(recycleIndexList) > 0:
@@ -341,6 +358,7 @@ class ParticleEngine(Mesh):
             particle = self.particleList[index]
             self.initializeParticle(particle)
             particle.alive = 1
+            self.resetRanges.append((index, index + 1))
 
         # increase emitter age
         self.emitterAge += dt
@@ -0,0 +1,67 @@
+class ProgramCache:
+    """
+    Shader programs shared by all materials with identical (preprocessed) shader code;
+    materials differing only in uniform values use one program, and their values
+    are uploaded when each material is drawn.
+    Programs are reference counted, and released when their last user releases them.
+    """
+
+    def __init__(self, resourceManager):
+        # tracks and releases the compiled programs
+        self.resourceManager = resourceManager
+        # key=(vertex shader code, fragment shader code), value=program
+        self.programs = {}
+        # key=program, value=[cache key, number of users]
+        self.references = {}
+        # materials created by warmUp; their references keep programs compiled
+        self.warmMaterials = []
+
+        # running totals of programs compiled and of requests served from the cache
+        self.compileCount = 0
+        self.hitCount = 0
+
+    def acquire(self, key, compileProgram):
+        """Return the program stored under key, calling compileProgram() to create it if needed"""
+        program = self.programs.get(key)
+        if program is None:
+            program = compileProgram()
+            self.programs[key] = program
+            self.references[program] = [key, 0]
+            self.compileCount += 1
+        else:
+            self.hitCount += 1
+        self.references[program][1] += 1
+        return program
+
+    def release(self, program):
+        """Give up one reference to program; the last one releases the program"""
+        reference = self.references.get(program)
+        if reference is None:
+            return
+        reference[1] -= 1
+        if reference[1] > 0:
+            return
+        del self.references[program]
+        del self.programs[reference[0]]
+        self.resourceManager.release(program)
+
+    def getReferenceCount(self, program):
+        reference = self.references.get(program)
+        return 0 if reference is None else reference[1]
+
+    def warmUp(self, materialFactoryList):
+        """
+        Compile programs at load time instead of on first use: each entry is a material class
+        or a function returning a material (for example, lambda: SurfaceLightMaterial(useInstancing=True)).
+        The materials are kept, so their programs stay cached until clearWarmUp is called.
+        Returns the list of materials created.
+        """
+        materialList = [factory() for factory in materialFactoryList]
+        self.warmMaterials.extend(materialList)
+        return materialList
+
+    def clearWarmUp(self):
+        """Release the materials created by warmUp"""
+        for material in self.warmMaterials:
+            material.release()
+        self.warmMaterials = []
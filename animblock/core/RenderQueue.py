@@ -0,0 +1,179 @@
+import weakref
+
+import numpy as np
+
+
+# widths of the fields packed into a sort key (most significant first);
+#   ordinals wider than their field only weaken grouping, never ordering by pass
+_PASS_SHIFT = 62
+_DEPTH_BITS = 18
+_PROGRAM_BITS = 12
+_TEXTURE_BITS = 10
+_MATERIAL_BITS = 12
+_GEOMETRY_BITS = 10
+
+
+def _field(ordinal, bits):
+    return ordinal & ((1 << bits) - 1)
+
+
+class RenderQueue:
+    """
+    Orders meshes for drawing with a packed 64-bit sort key per mesh:
+      opaque meshes:      pass 0 | program | textures | material | geometry | depth (near to far)
+      transparent meshes: pass 1 | depth (far to near) | program | textures | material | geometry
+    Opaque meshes are grouped by state, then drawn front-to-back for early depth rejection;
+    transparent meshes are drawn back-to-front so that blending is correct.
+    """
+
+    def __init__(self):
+        # persistent ordinals, so that equal keys keep the same order from frame to frame;
+        #   an index is renumbered when its ordinals outgrow their key field (see _checkOrdinals)
+        self.programIndex = weakref.WeakKeyDictionary()
+        self.materialIndex = weakref.WeakKeyDictionary()
+        self.geometryIndex = weakref.WeakKeyDictionary()
+        self.textureIndex = weakref.WeakKeyDictionary()
+        # key=tuple of texture ordinals (of one material), value=ordinal
+        self.textureSetIndex = {}
+        # key=id of one of the indices above, value=number of ordinals handed out
+        self.ordinalCounts = {}
+
+        # key=material, value=(stamp, key): the pass and the program, texture and material
+        #   fields of its meshes; kept (as the same object) while the stamp is unchanged
+        self.materialKeys = weakref.WeakKeyDictionary()
+        # key=mesh, value=(renderVersion of the mesh, material key, pass, state key);
+        #   recalculated only when the mesh or its material key changes
+        self.meshKeys = weakref.WeakKeyDictionary()
+
+        # (index, width of its key field, keys and indices made from its ordinals)
+        self.ordinalFields = (
+            (self.programIndex, _PROGRAM_BITS, (self.materialKeys,)),
+            (self.textureIndex, _TEXTURE_BITS, (self.textureSetIndex, self.materialKeys)),
+            (self.textureSetIndex, _TEXTURE_BITS, (self.materialKeys,)),
+            (self.materialIndex, _MATERIAL_BITS, (self.materialKeys,)),
+            (self.geometryIndex, _GEOMETRY_BITS, (self.meshKeys,)),
+        )
+
+        # numbers of meshes in each pass, from the latest sort
+        self.opaqueCount = 0
+        self.transparentCount = 0
+
+    def _getOrdinal(self, index, item):
+        # numbered from a count rather than len(index): entries of collected objects
+        #   leave the weak dictionaries, and their ordinals must not be handed out again
+        ordinal = index.get(item)
+        if ordinal is None:
+            ordinal = index[item] = self.ordinalCounts.get(id(index), 0)
+            self.ordinalCounts[id(index)] = ordinal + 1
+        return ordinal
+
+    def _checkOrdinals(self):
+        # ordinals wider than their field share key bits with others. An index is numbered
+        #   again from 0 (in the same order, without entries of released objects) when that
+        #   frees at least half of its field; with more objects alive, its ordinals keep
+        #   folding into the field, which only weakens grouping. Only the keys made from
+        #   the renumbered ordinals are dropped.
+        for index, bits, dependents in self.ordinalFields:
+            if self.ordinalCounts.get(id(index), 0) < 1 << bits:
+                continue
+            liveCount = len(index)
+            if index is self.textureSetIndex:
+                # sets of released materials stay in the index; each material has one set
+                liveCount = min(liveCount, len(self.materialKeys))
+            if liveCount > 1 << (bits - 1):
+                continue
+            self._renumber(index)
+            for dependent in dependents:
+                dependent.clear()
+                self.ordinalCounts.pop(id(dependent), None)
+
+    def _renumber(self, index):
+        if index is self.textureSetIndex:
+            # numbered again by the materials using them
+            entries = []
+        else:
+            entries = sorted(index.items(), key=lambda entry: entry[1])
+        index.clear()
+        for ordinal, (item, _previous) in enumerate(entries):
+            index[item] = ordinal
+        self.ordinalCounts[id(index)] = len(entries)
+
+    def _getMaterialKey(self, material):
+        textures = tuple(
+            self._getOrdinal(self.textureIndex, uniform.value)
+            for uniform in material.uniformList.values()
+            if uniform.type == "sampler2D" and hasattr(uniform.value, "use")
+        )
+        stamp = (material.program, textures, material.isTransparent())
+        entry = self.materialKeys.get(material)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        state = _field(self._getOrdinal(self.programIndex, material.program), _PROGRAM_BITS)
+        state = (state << _TEXTURE_BITS) | _field(
+            self._getOrdinal(self.textureSetIndex, textures), _TEXTURE_BITS
+        )
+        state = (state << _MATERIAL_BITS) | _field(
+            self._getOrdinal(self.materialIndex, material), _MATERIAL_BITS
+        )
+        key = (1 if stamp[2] else 0, state)
+        self.materialKeys[material] = (stamp, key)
+        return key
+
+    def _getMeshKey(self, mesh, materialKey):
+        entry = self.meshKeys.get(mesh)
+        if entry is not None and entry[0] == mesh.renderVersion and entry[1] is materialKey:
+            return entry
+        geometry = self._getOrdinal(self.geometryIndex, mesh.geometry)
+        state = (materialKey[1] << _GEOMETRY_BITS) | _field(geometry, _GEOMETRY_BITS)
+        entry = self.meshKeys[mesh] = (mesh.renderVersion, materialKey, materialKey[0], state)
+        return entry
+
+    def sort(self, meshList, viewMatrix):
+        """Return meshList in drawing order, for a camera with the given view matrix"""
+        count = len(meshList)
+        if count < 2:
+            self.opaqueCount = sum(not mesh.material.isTransparent() for mesh in meshList)
+            self.transparentCount = count - self.opaqueCount
+            return list(meshList)
+
+        self._checkOrdinals()
+
+        # material keys are checked once per material (in order of first use, so that
+        #   ordinals follow the scene), since materials can change between sorts; the keys of meshes are only recalculated after changes
+        materialKeys = {
+            material: self._getMaterialKey(material)
+            for material in dict.fromkeys(mesh.material for mesh in meshList)
+        }
+        passes = np.empty(count, dtype=np.int64)
+        state = np.empty(count, dtype=np.int64)
+        positions = np.empty((count, 3))
+        for index, mesh in enumerate(meshList):
+            entry = self._getMeshKey(mesh, materialKeys[mesh.material])
+            passes[index] = entry[2]
+            state[index] = entry[3]
+
+            sphere = mesh.getWorldBoundingSphere()
+            positions[index] = sphere[0] if sphere is not None else mesh.getWorldMatrix()[0:3, 3]
+
+        # camera space depth: distance in front of the camera along its view direction
+        viewMatrix = np.asarray(viewMatrix)
+        depth = -(positions @ viewMatrix[2, 0:3] + viewMatrix[2, 3])
+
+        # depth quantized over the range covered by this list
+        depthMin = depth.min()
+        depthRange = depth.max() - depthMin
+        scale = ((1 << _DEPTH_BITS) - 1) / depthRange if depthRange > 0 else 0
+        depthBits = ((depth - depthMin) * scale).astype(np.int64)
+        maxDepth = (1 << _DEPTH_BITS) - 1
+
+        stateBits = _PROGRAM_BITS + _TEXTURE_BITS + _MATERIAL_BITS + _GEOMETRY_BITS
+        opaqueKey = (state << _DEPTH_BITS) | depthBits
+        transparentKey = ((maxDepth - depthBits) << stateBits) | state
+        sortKey = (passes << _PASS_SHIFT) | np.where(passes == 0, opaqueKey, transparentKey)
+
+        # stable, so meshes with equal keys keep their scene order
+        order = np.argsort(sortKey, kind="stable")
+        self.transparentCount = int(passes.sum())
+        self.opaqueCount = count - self.transparentCount
+        return [meshList[index] for index in order]
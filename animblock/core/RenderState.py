@@ -0,0 +1,154 @@
+import moderngl
+
+
+# blend functions by mode name; see RenderState.setBlending
+_BLEND_FUNCTIONS = {
+    "alpha": (moderngl.SRC_ALPHA, moderngl.ONE_MINUS_SRC_ALPHA),
+    "additive": (moderngl.SRC_ALPHA, moderngl.ONE),
+    "premultiplied": (moderngl.ONE, moderngl.ONE_MINUS_SRC_ALPHA),
+}
+
+# faces to cull for each (renderFront, renderBack) combination; None disables culling
+_CULL_FACES = {
+    (True, True): None,
+    (True, False): "back",
+    (False, True): "front",
+    (False, False): "front_and_back",
+}
+
+
+class RenderState:
+    """Cache of OpenGL pipeline state; only actual changes are sent to the driver"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+        # cached values; None means unknown, so the next request is always issued
+        self.enabled = {}
+        self.cullFace = None
+        self.blending = None
+        # key=texture unit, value=texture object bound to it
+        self.textures = {}
+        # program used by the latest draw call
+        self.program = None
+        # (settings, framebuffer) applied by the latest applyMaterial call;
+        #   cleared by any pipeline change made in between
+        self.materialState = None
+
+        # running totals of state changes issued / elided
+        self.changeCount = 0
+        self.skipCount = 0
+        # running totals of program changes, texture binds, draw calls and vertices drawn
+        self.programChangeCount = 0
+        self.textureBindCount = 0
+        self.drawCount = 0
+        self.vertexCount = 0
+
+    def reset(self):
+        """Forget cached state, after OpenGL state was changed outside this object"""
+        self.enabled = {}
+        self.cullFace = None
+        self.blending = None
+        self.textures = {}
+        self.program = None
+        self.materialState = None
+
+    def _setEnabled(self, flag, state):
+        if self.enabled.get(flag) is state:
+            self.skipCount += 1
+            return
+        if state:
+            self.ctx.enable(flag)
+        else:
+            self.ctx.disable(flag)
+        self.enabled[flag] = state
+        self.materialState = None
+        self.changeCount += 1
+
+    def setCulling(self, renderFront=True, renderBack=True):
+        face = _CULL_FACES[(bool(renderFront), bool(renderBack))]
+        if face is None:
+            self._setEnabled(moderngl.CULL_FACE, False)
+            return
+        self._setEnabled(moderngl.CULL_FACE, True)
+        if face == self.cullFace:
+            self.skipCount += 1
+            return
+        self.ctx.cull_face = face
+        self.cullFace = face
+        self.materialState = None
+        self.changeCount += 1
+
+    def setBlending(self, mode="alpha"):
+        """mode: "alpha" | "additive" | "premultiplied" | None (blending disabled)"""
+        if mode is None:
+            self._setEnabled(moderngl.BLEND, False)
+            return
+        self._setEnabled(moderngl.BLEND, True)
+        if mode == self.blending:
+            self.skipCount += 1
+            return
+        self.ctx.blend_func = _BLEND_FUNCTIONS[mode]
+        self.blending = mode
+        self.materialState = None
+        self.changeCount += 1
+
+    def setDepth(self, test=True, write=True):
+        self._setEnabled(moderngl.DEPTH_TEST, bool(test))
+        # the depth mask belongs to the framebuffer, and is reapplied when it is used
+        framebuffer = self.ctx.fbo
+        if framebuffer is None or framebuffer.depth_mask == bool(write):
+            self.skipCount += 1
+            return
+        framebuffer.depth_mask = bool(write)
+        self.materialState = None
+        self.changeCount += 1
+
+    def bindTexture(self, texture, unit):
+        if self.textures.get(unit) is texture:
+            self.skipCount += 1
+            return
+        texture.use(location=unit)
+        self.textures[unit] = texture
+        self.changeCount += 1
+        self.textureBindCount += 1
+
+    def useProgram(self, program):
+        """Record the program of the next draw call; returns True if it differs from the last"""
+        if program is self.program:
+            return False
+        self.program = program
+        self.programChangeCount += 1
+        return True
+
+    def countDraw(self, vertexCount):
+        """Record a draw call submitting vertexCount vertices"""
+        self.drawCount += 1
+        self.vertexCount += vertexCount
+
+    def applyMaterial(self, material):
+        """Set culling, blending and depth state from material flags"""
+        settings = (
+            material.renderFront,
+            material.renderBack,
+            material.additiveBlending,
+            material.premultipliedAlpha,
+            material.depthTest,
+            material.depthWrite,
+        )
+        # consecutive draws with the same settings (the common case once meshes
+        #   are grouped by material) need no checks at all
+        state = (settings, self.ctx.fbo)
+        if state == self.materialState:
+            self.skipCount += 1
+            return
+
+        self.setCulling(material.renderFront, material.renderBack)
+        if material.additiveBlending:
+            self.setBlending("additive")
+        elif material.premultipliedAlpha:
+            self.setBlending("premultiplied")
+        else:
+            self.setBlending("alpha")
+        self.setDepth(material.depthTest, material.depthWrite)
+        self.materialState = state
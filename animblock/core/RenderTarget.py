@@ -4,24 +4,50 @@ from .OpenGLUtils import OpenGLUtils
 
 
 class RenderTarget:
-    def __init__(self, width=512, height=512):
+    # attachments: list of (components, dtype) pairs, one per color texture,
+    #   for example [(4, "f1"), (4, "f4")]; dtype as in moderngl ("f1" is 8-bit RGBA).
+    #   fragment shader outputs are written to the attachment at their location;
+    #   an empty list creates a depth-only target (texture is then None, and textureID
+    #   is the depth texture)
+    def __init__(self, width=512, height=512, attachments=None):
+        if attachments is None:
+            attachments = [(4, "f1")]
+
         self.width = width
         self.height = height
 
         ctx = OpenGLUtils.ctx
-
-        # Create color texture
-        self.texture = ctx.texture((width, height), 4)  # RGBA texture
-        self.texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        # textures and framebuffer are released by release(), or after this target
+        #   is garbage collected (see ResourceManager)
+        resourceManager = OpenGLUtils.resourceManager
+
+        # Create color textures
+        self.textures = []
+        for components, dtype in attachments:
+            texture = OpenGLUtils.createTexture(
+                (width, height), components, dtype=dtype, owner=self
+            )
+            texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+            self.textures.append(texture)
+        self.texture = self.textures[0] if self.textures else None
 
         # Create depth texture
-        self.depthTexture = ctx.depth_texture((width, height))
+        self.depthTexture = resourceManager.add(
+            ctx.depth_texture((width, height)), "texture", owner=self
+        )
 
         # Create framebuffer with color and depth attachments
-        self.framebuffer = ctx.framebuffer(
-            color_attachments=[self.texture], depth_attachment=self.depthTexture
+        self.framebuffer = resourceManager.add(
+            ctx.framebuffer(color_attachments=self.textures, depth_attachment=self.depthTexture),
+            "framebuffer",
+            owner=self,
         )
 
-        # For compatibility with existing code
-        self.textureID = self.texture
+        # For compatibility with existing code; a depth-only target (such as a shadow map)
+        #   shows its depth texture
+        self.textureID = self.texture if self.texture is not None else self.depthTexture
         self.framebufferID = self.framebuffer
+
+    def release(self):
+        """Release the framebuffer and its textures"""
+        OpenGLUtils.resourceManager.releaseOwner(self)
@@ -1,8 +1,14 @@
-import moderngl
+import collections
+import contextlib
+import time
 
-from ..lights import Light
-from .Mesh import Mesh
+import numpy as np
+
+from .DeferredShading import DeferredShading
+from .LightClusters import LightClusters
 from .OpenGLUtils import OpenGLUtils
+from .RenderQueue import RenderQueue
+from .UniformBlock import UniformBlock
 
 
 class Renderer:
@@ -12,9 +18,15 @@ class Renderer:
 
         self.ctx = OpenGLUtils.ctx
 
+        # default framebuffer: the window, or an offscreen target when headless
+        self.screen = OpenGLUtils.screen if OpenGLUtils.screen is not None else self.ctx.screen
+
+        # culling, blending, depth and texture state; redundant changes are skipped
+        self.renderState = OpenGLUtils.renderState
+
         # Enable standard 3D rendering features
-        self.ctx.enable(moderngl.DEPTH_TEST)
-        self.ctx.enable(moderngl.BLEND)
+        self.renderState.setDepth(True, True)
+        self.renderState.setBlending("alpha")
         # Note: Multisampling is handled by GLFW window hints, not ModernGL directly
 
         # Set default viewport
@@ -25,6 +37,65 @@ class Renderer:
         self.fog = None
         self.shadowMapEnabled = False
 
+        # clustered (Forward+) lighting: lit surface materials evaluate only the point lights
+        #   near each fragment, so scenes can have any number of lights (see LightClusters);
+        #   otherwise the first UniformBlock.lightCount lights are used everywhere
+        self.clusteredLighting = False
+        # created on the first render using clustered lighting
+        self.lightClusters = None
+
+        # deferred shading: opaque meshes with materials that allow it are drawn into
+        #   a G-buffer and lit per pixel (see DeferredShading); others are drawn afterwards
+        self.deferredShading = False
+        # created on the first render using deferred shading
+        self.deferred = None
+
+        # skip meshes whose bounding sphere is outside the camera view
+        self.frustumCulling = True
+
+        # draw order of the main pass
+        self.renderQueue = RenderQueue()
+
+        # renderer settings compiled into material programs (see Material.updateSceneDefines);
+        #   replaced by a new dictionary when they change
+        self.sceneDefines = {}
+        # settings for the G-buffer variants of deferred materials
+        self.gBufferDefines = {}
+
+        # camera, fog and light data shared by all programs; written once per render call
+        self.cameraBlock = UniformBlock("Camera", 128)
+        self.fogBlock = UniformBlock("Fog", UniformBlock.fogStruct.size)
+        self.lightsBlock = UniformBlock(
+            "Lights", UniformBlock.lightStruct.size * UniformBlock.lightCount
+        )
+
+        # uniform uploads and state changes sent to / skipped by the GPU
+        #   during the latest render call
+        self.uniformUploadCount = 0
+        self.uniformSkipCount = 0
+        self.stateChangeCount = 0
+        self.stateSkipCount = 0
+        # meshes rejected by frustum culling during the latest render call, and shadow
+        #   casters outside the shadow camera regions (counted once per light)
+        self.culledCount = 0
+        self.culledShadowCasterCount = 0
+        # shadow maps rendered during the latest render call; unchanged ones are reused
+        self.shadowMapUpdateCount = 0
+
+        # figures of the latest render call (see render), and those of recent calls
+        self.stats = {}
+        self.statsHistory = collections.deque(maxlen=120)
+
+        # measure GPU time per pass with timer queries; reading the results waits for
+        #   the GPU to finish each pass, so this is only enabled when requested
+        self.gpuTiming = False
+        # key=pass name, value=moderngl Query; created once per pass
+        self.timerQueries = {}
+        # timer queries of the passes run by the current render call
+        self.gpuQueries = {}
+        # CPU time (seconds) per phase of the current render call
+        self.cpuTimes = {}
+
     def setViewport(self, left=0, bottom=0, width=512, height=512):
         """Set viewport dimensions"""
         self.left = left
@@ -51,51 +122,231 @@ class Renderer:
 
     def render(self, scene, camera, renderTarget=None, clearColor=True, clearDepth=True):
         """Main render method"""
+        startTime = time.perf_counter()
+        startCounters = self._getCounters()
+
+        # GPU objects of garbage collected geometries, materials, ... (see ResourceManager)
+        OpenGLUtils.resourceManager.collect()
+        self.cpuTimes = {"traversal": 0, "sort": 0, "shadowPass": 0, "mainPass": 0}
+        self.gpuQueries = {}
+
+        # merged geometry of static batches must be current before any pass draws it
+        scene.updateStaticBatches()
 
         # Shadow rendering pass (if enabled)
+        self.shadowMapUpdateCount = 0
+        self.culledShadowCasterCount = 0
         if self.shadowMapEnabled:
-            self._renderShadowPass(scene)
+            passStart = time.perf_counter()
+            with self._gpuTimer("shadowPass"):
+                self._renderShadowPass(scene)
+            self.cpuTimes["shadowPass"] = time.perf_counter() - passStart
 
         # Main rendering pass
-        self._renderMainPass(scene, camera, renderTarget, clearColor, clearDepth)
+        with self._gpuTimer("mainPass"):
+            self._renderMainPass(scene, camera, renderTarget, clearColor, clearDepth)
+
+        self._updateStats(startCounters, time.perf_counter() - startTime)
+
+    def _getCounters(self):
+        """Running totals of the figures reported in stats"""
+        uniformBinder = OpenGLUtils.uniformBinder
+        renderState = self.renderState
+        return {
+            "drawCalls": renderState.drawCount,
+            "vertices": renderState.vertexCount,
+            "programSwitches": renderState.programChangeCount,
+            "textureBinds": renderState.textureBindCount,
+            "stateChanges": renderState.changeCount,
+            "stateSkips": renderState.skipCount,
+            "uniformUploads": uniformBinder.uploadCount,
+            "uniformSkips": uniformBinder.skipCount,
+            "bufferAllocations": OpenGLUtils.bufferAllocationCount,
+            "bufferBytes": OpenGLUtils.bufferUploadBytes,
+        }
+
+    def _gpuTimer(self, name):
+        """Context manager measuring the GPU time of the enclosed commands, if enabled"""
+        if not self.gpuTiming:
+            return contextlib.nullcontext()
+        query = self.timerQueries.get(name)
+        if query is None:
+            query = self.timerQueries[name] = self.ctx.query(time=True)
+        self.gpuQueries[name] = query
+        return query
+
+    def _updateStats(self, startCounters, totalTime):
+        """
+        Store the figures of the latest render call in stats (and statsHistory):
+          counts of draw calls, vertices, program switches, texture binds, state changes,
+          uniform uploads, buffers created, bytes written to buffers, objects culled
+          by the main pass, shadow casters culled by the shadow pass (once per light)
+          and shadow maps rendered; gpuMemory: bytes of buffers and textures allocated
+          (see ResourceManager.getMemoryUsage for details);
+          cpuTime: milliseconds spent on traversal (render lists and culling), sorting,
+            the shadow pass, the main pass draw loop, and in total;
+          gpuTime: milliseconds per pass measured by timer queries (when gpuTiming is set)
+        """
+        stats = {name: value - startCounters[name] for name, value in self._getCounters().items()}
+        stats["culledObjects"] = self.culledCount
+        stats["culledShadowCasters"] = self.culledShadowCasterCount
+        stats["shadowMapUpdates"] = self.shadowMapUpdateCount
+        stats["gpuMemory"] = sum(OpenGLUtils.resourceManager.memoryUsage.values())
+
+        cpuTime = {name: seconds * 1000 for name, seconds in self.cpuTimes.items()}
+        cpuTime["total"] = totalTime * 1000
+        stats["cpuTime"] = cpuTime
+
+        # elapsed is in nanoseconds; reading it waits until the pass is finished
+        stats["gpuTime"] = {name: query.elapsed / 1e6 for name, query in self.gpuQueries.items()}
+
+        self.stats = stats
+        self.statsHistory.append(stats)
+
+        self.uniformUploadCount = stats["uniformUploads"]
+        self.uniformSkipCount = stats["uniformSkips"]
+        self.stateChangeCount = stats["stateChanges"]
+        self.stateSkipCount = stats["stateSkips"]
+
+    def getAverageStats(self, frameCount=None):
+        """Average figures of the latest frameCount render calls (default: all in statsHistory)"""
+        history = list(self.statsHistory)
+        if frameCount is not None:
+            history = history[-frameCount:]
+        if not history:
+            return {}
+
+        average = {}
+        for name, value in history[-1].items():
+            if isinstance(value, dict):
+                average[name] = {
+                    key: sum(stats[name].get(key, 0) for stats in history) / len(history)
+                    for key in value
+                }
+            else:
+                average[name] = sum(stats[name] for stats in history) / len(history)
+        return average
+
+    def getSceneDefines(self, lightCount):
+        """Preprocessor symbols for the current settings and a scene with lightCount lights"""
+        defines = {"LIGHT_COUNT": min(lightCount, UniformBlock.lightCount)}
+        if self.fog is not None:
+            defines["USE_FOG"] = None
+        if self.shadowMapEnabled:
+            defines["USE_SHADOWS"] = None
+        if self.clusteredLighting:
+            defines["USE_CLUSTERED_LIGHTS"] = None
+        # materials skip their update while the same dictionary is passed
+        if defines != self.sceneDefines:
+            self.sceneDefines = defines
+            # G-buffer variants do no lighting or fog
+            self.gBufferDefines = {"USE_GBUFFER": None}
+            if self.shadowMapEnabled:
+                self.gBufferDefines["USE_SHADOWS"] = None
+        return self.sceneDefines
 
     def _renderShadowPass(self, scene):
-        """Render shadow map pass"""
-        # Get shadow casting lights
-        shadowCastLightList = scene.getObjectsByFilter(
-            lambda x: isinstance(x, Light)
-            and hasattr(x, "shadowCamera")
-            and x.shadowCamera is not None
-        )
-
-        # Get shadow casting meshes
-        shadowCastMeshList = scene.getObjectsByFilter(
-            lambda x: isinstance(x, Mesh) and x.castShadow
-        )
+        """
+        Render the shadow map of each shadow casting light. Casters outside the shadow camera
+        region are skipped, and a shadow map is only rendered again when the shadow camera or
+        the casters inside its region changed (see _getShadowMapState)
+        """
+        # Get shadow casting lights and meshes from the scene registries
+        shadowCastLightList = scene.getShadowLightList()
+        shadowCastMeshList = scene.getShadowCasterRenderList()
 
         for light in shadowCastLightList:
-            if hasattr(light, "shadowRenderTarget") and light.shadowRenderTarget:
-                # Bind shadow framebuffer
-                light.shadowRenderTarget.framebuffer.use()
+            shadowCamera = light.shadowCamera
+            shadowCamera.updateViewMatrix()
+            casterList, culledCount = self.cullMeshList(
+                shadowCastMeshList, shadowCamera.getFrustumPlanes()
+            )
+            self.culledShadowCasterCount += culledCount
 
-                # Clear shadow buffer
-                self.ctx.clear(1.0, 0.0, 1.0, 1.0)  # Clear to magenta for debugging
+            state = Renderer._getShadowMapState(shadowCamera, casterList)
+            if light.shadowMapState is not None and light.shadowMapState[0] == state[0]:
+                continue
+            light.shadowMapState = state
+            self.shadowMapUpdateCount += 1
+
+            # Bind shadow framebuffer and clear its depth; it has no color attachment
+            framebuffer = light.shadowRenderTarget.framebuffer
+            framebuffer.use()
+            self.renderState.setDepth(True, True)
+            framebuffer.clear(depth=1.0)
+
+            # Update shadow camera matrices
+            shadowCamera.uniformList.setUniformValue(
+                "shadowProjectionMatrix", shadowCamera.getProjectionMatrix()
+            )
+            shadowCamera.uniformList.setUniformValue(
+                "shadowViewMatrix", shadowCamera.getViewMatrix()
+            )
 
-                # Update shadow camera matrices
-                light.shadowCamera.updateViewMatrix()
-                light.shadowCamera.uniformList.setUniformValue(
-                    "shadowProjectionMatrix", light.shadowCamera.getProjectionMatrix()
-                )
-                light.shadowCamera.uniformList.setUniformValue(
-                    "shadowViewMatrix", light.shadowCamera.getViewMatrix()
+            # Render shadow casting meshes
+            for mesh in casterList:
+                shadowProgram = light.getShadowMaterial(mesh.isInstanced).program
+                # Update shadow material uniforms
+                shadowCamera.uniformList.update(shadowProgram)
+                mesh.render(shadowProgram)
+
+    @staticmethod
+    def _getShadowMapState(shadowCamera, casterList):
+        """
+        Return (key, objects): key is equal for two calls only if a shadow map rendered with
+        the given camera and casters would be the same, and objects must be kept alive as long
+        as the key is compared, since it contains their ids.
+        World matrices and static batch geometries are replaced (not modified) when they
+        change, so their ids identify their contents
+        """
+        objects = []
+        casterKeys = []
+        for mesh in casterList:
+            worldMatrix = mesh.getWorldMatrix()
+            objects.append((mesh, worldMatrix, mesh.geometry))
+            casterKeys.append(
+                (
+                    id(mesh),
+                    id(worldMatrix),
+                    id(mesh.geometry),
+                    mesh.geometry.version,
+                    mesh.instanceVersion if mesh.isInstanced else 0,
                 )
-
-                # Render shadow casting meshes
-                for mesh in shadowCastMeshList:
-                    if hasattr(light, "shadowMaterial"):
-                        # Update shadow material uniforms
-                        light.shadowCamera.uniformList.update(light.shadowMaterial.program)
-                        mesh.render(light.shadowMaterial.program)
+            )
+        key = (
+            np.asarray(shadowCamera.getViewMatrix()).tobytes(),
+            np.asarray(shadowCamera.getProjectionMatrix()).tobytes(),
+            tuple(casterKeys),
+        )
+        return (key, objects)
+
+    def cullMeshList(self, meshList, frustumPlanes):
+        """
+        Return the visible meshes of meshList that are not entirely outside frustumPlanes,
+        and the number of visible meshes removed because they are outside
+        """
+        meshList = [mesh for mesh in meshList if mesh.visible]
+
+        # meshes without bounds (or with frustumCulled disabled) are always kept
+        spheres = [
+            mesh.getWorldBoundingSphere() if mesh.frustumCulled else None for mesh in meshList
+        ]
+        bounded = [index for index, sphere in enumerate(spheres) if sphere is not None]
+        if not bounded:
+            return meshList, 0
+
+        centers = np.array([spheres[index][0] for index in bounded])
+        radii = np.array([spheres[index][1] for index in bounded])
+
+        # signed distance of every center to every plane, in one operation
+        distances = centers @ frustumPlanes[:, 0:3].T + frustumPlanes[:, 3]
+        outside = (distances < -radii[:, np.newaxis]).any(axis=1)
+
+        culledCount = int(outside.sum())
+        if culledCount == 0:
+            return meshList, 0
+        culled = {bounded[index] for index in np.flatnonzero(outside)}
+        return [mesh for index, mesh in enumerate(meshList) if index not in culled], culledCount
 
     def _renderMainPass(self, scene, camera, renderTarget, clearColor, clearDepth):
         """Render main pass"""
@@ -103,11 +354,14 @@ class Renderer:
         # Set render target
         if renderTarget is None:
             # Render to screen
-            self.ctx.screen.use()
+            self.screen.use()
         else:
             # Render to custom framebuffer
             renderTarget.framebuffer.use()
 
+        # materials may have disabled depth writes, which would also prevent clearing
+        self.renderState.setDepth(True, True)
+
         # Clear buffers
         if clearColor and clearDepth:
             self.ctx.clear(
@@ -122,9 +376,11 @@ class Renderer:
             # Clear only depth - ModernGL approach
             self.ctx.clear(depth=1.0)
 
-        # Get objects to render
-        meshList = scene.getObjectsByFilter(lambda x: isinstance(x, Mesh))
-        lightList = scene.getObjectsByFilter(lambda x: isinstance(x, Light))
+        phaseStart = time.perf_counter()
+
+        # Get objects to render from the scene registries
+        meshList = scene.getRenderList()
+        lightList = scene.getLightList()
 
         # Update camera matrices
         camera.updateViewMatrix()
@@ -133,21 +389,88 @@ class Renderer:
         camera.uniformList.setUniformValue("projectionMatrix", projectionMatrix)
         camera.uniformList.setUniformValue("viewMatrix", viewMatrix)
 
-        # Group meshes by material to minimize program switches
-        meshList.sort(key=lambda mesh: id(mesh.material.program))
+        # Remove meshes outside the camera view before any other work is done for them
+        if self.frustumCulling:
+            meshList, self.culledCount = self.cullMeshList(meshList, camera.getFrustumPlanes())
+        else:
+            self.culledCount = 0
+
+        # Select the program variants of the materials to be drawn
+        sceneDefines = self.getSceneDefines(len(lightList))
+        deferredMaterials = set()
+        for material in {mesh.material for mesh in meshList}:
+            if self.deferredShading and self.isDeferred(material):
+                material.updateSceneDefines(self.gBufferDefines)
+                deferredMaterials.add(material)
+            else:
+                material.updateSceneDefines(sceneDefines)
 
-        # Pre-calculate light data
-        lightData = []
+        sortStart = time.perf_counter()
+        self.cpuTimes["traversal"] = sortStart - phaseStart
+
+        # Opaque meshes grouped by state and front-to-back, then transparent meshes back-to-front
+        meshList = self.renderQueue.sort(meshList, viewMatrix)
+
+        phaseStart = time.perf_counter()
+        self.cpuTimes["sort"] = phaseStart - sortStart
+
+        # Update light positions and directions
         for light in lightList:
-            lightInfo = {
-                "position": light.transform.getPosition(),
-                "direction": light.getDirection() if hasattr(light, "getDirection") else [0, 0, 0],
-                "light": light,
-            }
-            lightData.append(lightInfo)
+            direction = light.getDirection() if hasattr(light, "getDirection") else [0, 0, 0]
+            light.uniformList.setUniformValue("position", light.transform.getPosition())
+            light.uniformList.setUniformValue("direction", direction)
+            if light.shadowCamera is not None:
+                light.shadowCamera.uniformList.setUniformValue("shadowLightDirection", direction)
+
+        # Fill the shared uniform blocks once for all programs
+        self.cameraBlock.write(UniformBlock.packCamera(projectionMatrix, viewMatrix))
+        self.fogBlock.write(UniformBlock.packFog(self.fog))
+        self.lightsBlock.write(UniformBlock.packLights(lightList))
+        if self.clusteredLighting:
+            if self.lightClusters is None:
+                self.lightClusters = LightClusters()
+            self.lightClusters.update(lightList, viewMatrix, projectionMatrix, self.ctx.viewport)
+        self.cameraBlock.bind()
+        self.fogBlock.bind()
+        self.lightsBlock.bind()
+
+        if deferredMaterials:
+            deferredList = [mesh for mesh in meshList if mesh.material in deferredMaterials]
+            meshList = [mesh for mesh in meshList if mesh.material not in deferredMaterials]
+            self._renderDeferred(deferredList, camera, lightList, renderTarget)
 
         # Render meshes
-        currentProgram = None
+        self._drawMeshList(meshList, camera, lightList)
+
+        self.cpuTimes["mainPass"] = time.perf_counter() - phaseStart
+
+    @staticmethod
+    def isDeferred(material):
+        """True if meshes using material are drawn by the deferred path, when it is enabled"""
+        return material.allowDeferredShading and not material.isTransparent()
+
+    def _renderDeferred(self, meshList, camera, lightList, renderTarget):
+        """Draw meshList into the G-buffer, light it, and write the result to the render target"""
+        if self.deferred is None:
+            self.deferred = DeferredShading()
+        framebuffer = self.ctx.fbo
+        viewport = self.ctx.viewport
+        self.deferred.resize(viewport[2], viewport[3])
+
+        self.deferred.beginGeometryPass()
+        self._drawMeshList(meshList, camera, lightList)
+
+        self.deferred.renderLights(
+            lightList, camera.getViewMatrix(), camera.getProjectionMatrix(), self.renderState
+        )
+
+        framebuffer.use()
+        self.deferred.composite(viewport, self.renderState)
+
+    def _drawMeshList(self, meshList, camera, lightList):
+        """Draw meshList into the framebuffer in use"""
+        # per-program uniforms are refreshed on the first draw of each pass
+        self.renderState.program = None
         for mesh in meshList:
             if not mesh.visible:
                 continue
@@ -155,28 +478,22 @@ class Renderer:
             program = mesh.material.program
 
             # Switch program only when necessary
-            if program != currentProgram:
-                currentProgram = program
-
-                # Update camera uniforms for this program
+            if self.renderState.useProgram(program):
+                # programs declaring the shared blocks have nothing to update here;
+                #   plain camera/fog/light uniforms are still set for custom shaders
                 camera.uniformList.update(program)
 
-                # Update fog uniforms
+                if self.clusteredLighting:
+                    self.lightClusters.uniformList.update(program)
+
                 if self.fog is not None:
                     self.fog.uniformList.update(program)
 
-                # Update light uniforms
-                for lightInfo in lightData:
-                    light = lightInfo["light"]
-                    light.uniformList.setUniformValue("position", lightInfo["position"])
-                    light.uniformList.setUniformValue("direction", lightInfo["direction"])
+                for light in lightList:
                     light.uniformList.update(program)
 
                     # Update shadow uniforms if applicable
-                    if hasattr(light, "shadowCamera") and light.shadowCamera is not None:
-                        light.shadowCamera.uniformList.setUniformValue(
-                            "shadowLightDirection", lightInfo["direction"]
-                        )
+                    if light.shadowCamera is not None:
                         light.shadowCamera.uniformList.update(program)
 
             # Render the mesh
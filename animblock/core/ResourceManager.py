@@ -0,0 +1,196 @@
+import weakref
+
+
+class ResourceManager:
+    """
+    Tracks the GPU objects of the context (buffers, textures, vertex arrays, framebuffers and
+    programs) with their sizes in bytes, and releases them.
+
+    Objects are usually registered for an owner, such as a Geometry, Material or RenderTarget:
+    they are released when the owner is released (releaseOwner), or after the owner has been
+    garbage collected. OpenGL objects may only be released while the context is current, so
+    collected owners only queue their objects; the queue is emptied by collect, which the
+    Renderer calls at the start of each render.
+    """
+
+    categories = ("buffer", "texture", "vertexArray", "framebuffer", "program")
+
+    def __init__(self):
+        # key=GPU object, value=[category, size in bytes, id of owner or None]
+        self.resources = {}
+        # key=id(owner), value=dictionary of GPU object: function releasing it
+        self.owners = {}
+        # key=id(owner), value=weakref.finalize queueing the objects of the owner when collected
+        self.finalizers = {}
+        # (GPU object, release function) pairs of collected owners, released by collect
+        self.pending = []
+        # key=GPU object without an owner, value=number of users sharing it (see addReference)
+        self.references = {}
+
+        # bytes and numbers of objects currently allocated, by category
+        self.memoryUsage = dict.fromkeys(ResourceManager.categories, 0)
+        self.resourceCounts = dict.fromkeys(ResourceManager.categories, 0)
+
+        # running totals of objects registered and released
+        self.addCount = 0
+        self.releaseCount = 0
+
+    @staticmethod
+    def getTextureSize(texture):
+        """Bytes of storage of a texture (without mipmaps); dtype is f1, f2, f4, u4, ..."""
+        return texture.width * texture.height * texture.components * int(texture.dtype[1:])
+
+    def add(self, resource, category, owner=None, size=None):
+        """
+        Register a GPU object, optionally owned by owner, and return it.
+        The size of buffers and textures is read from the object; driver memory used by
+        vertex arrays, framebuffers and programs is unknown, and counted as 0 bytes.
+        """
+        if category not in ResourceManager.categories:
+            raise Exception(f"Unknown resource category: {category}")
+        if size is None:
+            if category == "buffer":
+                size = resource.size
+            elif category == "texture":
+                size = ResourceManager.getTextureSize(resource)
+            else:
+                size = 0
+        if resource in self.resources:
+            raise Exception("Resource is already registered")
+        self.resources[resource] = [category, size, None]
+        self.memoryUsage[category] += size
+        self.resourceCounts[category] += 1
+        self.addCount += 1
+        if owner is not None:
+            self.own(owner, resource)
+        return resource
+
+    def updateSize(self, resource, size=None):
+        """Record a new size for resource, for example after reallocating a buffer"""
+        record = self.resources.get(resource)
+        if record is None:
+            return
+        if size is None:
+            size = (
+                resource.size if record[0] == "buffer" else ResourceManager.getTextureSize(resource)
+            )
+        self.memoryUsage[record[0]] += size - record[1]
+        record[1] = size
+
+    def own(self, owner, resource, release=None):
+        """
+        Make owner responsible for resource: release(resource) is called when the owner is
+        released or collected. By default the object itself is released; shared objects pass
+        a function giving up a reference instead (for example, ProgramCache.release).
+        """
+        ownerId = id(owner)
+        owned = self.owners.get(ownerId)
+        if owned is None:
+            owned = self.owners[ownerId] = {}
+            finalizer = weakref.finalize(owner, self._queueOwner, ownerId)
+            # objects still allocated at exit are destroyed with the context
+            finalizer.atexit = False
+            self.finalizers[ownerId] = finalizer
+        owned[resource] = release if release is not None else self.release
+        if release is None and resource in self.resources:
+            self.resources[resource][2] = ownerId
+
+    def disown(self, owner, resource):
+        """Remove resource from the objects of owner, without releasing it"""
+        owned = self.owners.get(id(owner))
+        if owned is not None:
+            owned.pop(resource, None)
+        record = self.resources.get(resource)
+        if record is not None and record[2] == id(owner):
+            record[2] = None
+
+    def addReference(self, user, resource):
+        """
+        Make user one of the users of a shared object without an owner (for example, a texture
+        from OpenGLUtils.initializeTexture sampled by several materials): it is released when
+        its last user gives up its reference, or is released or collected. Objects with an
+        owner are released by their owner only; adding a user twice has no effect.
+        """
+        if resource not in self.resources:
+            return
+        owned = self.owners.get(id(user))
+        if owned is not None and resource in owned:
+            return
+        self.references[resource] = self.references.get(resource, 0) + 1
+        self.own(user, resource, self._removeReference)
+
+    def removeReference(self, user, resource):
+        """Give up the reference of user to resource (see addReference)"""
+        owned = self.owners.get(id(user))
+        if owned is not None and owned.get(resource) == self._removeReference:
+            del owned[resource]
+            self._removeReference(resource)
+
+    def _removeReference(self, resource):
+        count = self.references.pop(resource, 0) - 1
+        if count > 0:
+            self.references[resource] = count
+            return
+        record = self.resources.get(resource)
+        if record is not None and record[2] is None:
+            self.release(resource)
+
+    def release(self, resource):
+        """Release a GPU object now; releasing an object twice has no effect"""
+        self.references.pop(resource, None)
+        record = self.resources.pop(resource, None)
+        if record is not None:
+            category, size, _ownerId = record
+            self.memoryUsage[category] -= size
+            self.resourceCounts[category] -= 1
+            self.releaseCount += 1
+            owned = self.owners.get(record[2])
+            if owned is not None:
+                owned.pop(resource, None)
+        resource.release()
+
+    def releaseOwner(self, owner):
+        """Release all objects of owner now"""
+        ownerId = id(owner)
+        finalizer = self.finalizers.pop(ownerId, None)
+        if finalizer is not None:
+            finalizer.detach()
+        owned = self.owners.pop(ownerId, {})
+        for resource, release in owned.items():
+            release(resource)
+
+    def _queueOwner(self, ownerId):
+        # called when the owner is garbage collected, possibly on another thread
+        self.finalizers.pop(ownerId, None)
+        owned = self.owners.pop(ownerId, None)
+        if owned:
+            self.pending.extend(owned.items())
+
+    def collect(self):
+        """Release the objects of garbage collected owners; returns the number released"""
+        pending, self.pending = self.pending, []
+        for resource, release in pending:
+            release(resource)
+        return len(pending)
+
+    def isAllocated(self, resource):
+        """True if resource is registered and not released yet"""
+        return resource in self.resources
+
+    def releaseVertexArrays(self, vaoData):
+        """
+        Release the vertex arrays of vaoData (key=program) whose programs were released,
+        for example unused material variants; they cannot be drawn again
+        """
+        for program in [program for program in vaoData if program not in self.resources]:
+            self.release(vaoData.pop(program))
+
+    def getMemoryUsage(self):
+        """Return a dictionary of category: bytes allocated, with the sum under "total" """
+        usage = dict(self.memoryUsage)
+        usage["total"] = sum(self.memoryUsage.values())
+        return usage
+
+    def getResourceCounts(self):
+        """Return a dictionary of category: number of objects allocated"""
+        return dict(self.resourceCounts)
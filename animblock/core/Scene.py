@@ -1,6 +1,185 @@
+from .Mesh import Mesh
 from .Object3D import Object3D
+from .StaticBatch import StaticBatch
 
 
+# in addition to being the root of the scene graph, a Scene keeps registries
+#   of its descendants, updated incrementally by add/remove (and by changes to
+#   name, tags and castShadow), so that the renderer never traverses the graph.
+# registries are dictionaries used as insertion-ordered sets (values are None).
 class Scene(Object3D):
     def __init__(self):
+        # registries must exist before Object3D.__init__ assigns name
+        self.meshes = {}
+        self.lights = {}
+        self.shadowCasters = {}
+        # key=name, value=registry of objects with that name
+        self.nameIndex = {}
+        # key=tag, value=registry of objects with that tag
+        self.tagIndex = {}
+
+        # batches drawing meshes in place of the meshes themselves; see freezeStatic
+        self.staticBatches = []
+        # meshes and batches to draw, and the shadow casting ones;
+        #   rebuilt from the registries when needed
+        self._renderList = None
+        self._shadowCasterRenderList = None
+
         super().__init__()
+        self._scene = self
+        self._indexObject(self)
+
+    def _registerSubtree(self, root):
+        # imported here: the lights package itself imports core
+        from ..lights.Light import Light
+
+        for item in root.getDepthFirstList():
+            item._scene = self
+            if isinstance(item, Mesh):
+                self.meshes[item] = None
+                if item.castShadow:
+                    self.shadowCasters[item] = None
+            elif isinstance(item, Light):
+                self.lights[item] = None
+            self._indexObject(item)
+        self._invalidateRenderLists()
+
+    def _unregisterSubtree(self, root):
+        for item in root.getDepthFirstList():
+            self._unindexObject(item)
+            self.meshes.pop(item, None)
+            self.lights.pop(item, None)
+            self.shadowCasters.pop(item, None)
+            if getattr(item, "staticBatch", None) is not None:
+                item.staticBatch.removeMember(item)
+            item._scene = None
+        self._invalidateRenderLists()
+
+    def _indexObject(self, item):
+        self.nameIndex.setdefault(item.name, {})[item] = None
+        for tag in item.tags:
+            self.tagIndex.setdefault(tag, {})[item] = None
+
+    def _unindexObject(self, item):
+        objects = self.nameIndex.get(item.name)
+        if objects is not None:
+            objects.pop(item, None)
+            if not objects:
+                del self.nameIndex[item.name]
+        for tag in item.tags:
+            objects = self.tagIndex.get(tag)
+            if objects is not None:
+                objects.pop(item, None)
+                if not objects:
+                    del self.tagIndex[tag]
+
+    def _updateShadowCaster(self, mesh):
+        if mesh.castShadow:
+            self.shadowCasters[mesh] = None
+        else:
+            self.shadowCasters.pop(mesh, None)
+        self._invalidateRenderLists()
+
+    def _invalidateRenderLists(self):
+        self._renderList = None
+        self._shadowCasterRenderList = None
+
+    def freezeStatic(self, meshList=None):
+        """
+        Draw meshes that share a material with a single StaticBatch per material.
+        meshList defaults to all meshes in the scene; meshes that cannot be batched
+        (instanced meshes, sprites, particles, line strips, ...) are skipped.
+        Returns the list of new batches.
+        """
+        if meshList is None:
+            meshList = self.getMeshList()
+
+        # key=batch key, value=list of meshes
+        groups = {}
+        for mesh in meshList:
+            if mesh._scene is not self or mesh.staticBatch is not None:
+                continue
+            key = StaticBatch.getBatchKey(mesh)
+            if key is not None:
+                groups.setdefault(key, []).append(mesh)
+
+        batchList = [StaticBatch(group, self) for group in groups.values()]
+        self.staticBatches.extend(batchList)
+        self._invalidateRenderLists()
+        return batchList
+
+    def unfreezeStatic(self):
+        """Release all static batches; their meshes are drawn individually again"""
+        for batch in self.staticBatches:
+            batch.release()
+        self.staticBatches = []
+        self._invalidateRenderLists()
+
+    def updateStaticBatches(self):
+        """Rebuild batches with changed members; called by the Renderer before drawing"""
+        for batch in self.staticBatches:
+            batch.update()
+
+    def release(self):
+        """
+        Release the GPU objects of this scene: geometries, materials and instance data
+        of its meshes, static batches and shadow maps; for example before replacing it.
+        Textures without an owner are released with the last material sampling them.
+        Geometries and materials shared with another scene must not be released.
+        """
+        self.unfreezeStatic()
+        for mesh in self.meshes:
+            mesh.geometry.release()
+            mesh.material.release()
+            if mesh.isInstanced:
+                mesh.release()
+        for light in self.getShadowLightList():
+            light.shadowRenderTarget.release()
+
+    def getMeshList(self):
+        return list(self.meshes)
+
+    def getLightList(self):
+        return list(self.lights)
+
+    def getShadowCasterList(self):
+        return list(self.shadowCasters)
+
+    # meshes to draw: meshes not drawn by a static batch, followed by the batches
+    def getRenderList(self):
+        if self._renderList is None:
+            self._renderList = [mesh for mesh in self.meshes if mesh.staticBatch is None]
+            self._renderList.extend(self.staticBatches)
+        return list(self._renderList)
+
+    def getShadowCasterRenderList(self):
+        if self._shadowCasterRenderList is None:
+            self._shadowCasterRenderList = [
+                mesh for mesh in self.shadowCasters if mesh.staticBatch is None
+            ]
+            self._shadowCasterRenderList.extend(
+                batch for batch in self.staticBatches if batch.castShadow
+            )
+        return list(self._shadowCasterRenderList)
+
+    # lights which have had enableShadows called
+    def getShadowLightList(self):
+        return [light for light in self.lights if light.shadowCamera is not None]
+
+    # return first descendent (in depth-first order, as in Object3D) with name parameter
+    #   matching given value; the graph is only traversed when several objects share the name
+    def getObjectByName(self, name):
+        matches = self.nameIndex.get(name)
+        if not matches:
+            # same error as the list lookup of Object3D.getObjectByName
+            raise IndexError(f"No object named {name!r}")
+        if len(matches) == 1:
+            return next(iter(matches))
+        return next(item for item in self.getDepthFirstList() if item in matches)
+
+    # objects with the given name, in the order they were added
+    def getObjectsByName(self, name):
+        return list(self.nameIndex.get(name, ()))
+
+    def getObjectsByTag(self, tag):
+        return list(self.tagIndex.get(tag, ()))
@@ -0,0 +1,169 @@
+import moderngl
+import numpy as np
+
+from ..geometry.Geometry import Geometry
+from .Mesh import Mesh
+
+
+# draw styles whose primitives stay separate when vertex lists are concatenated,
+#   with the number of vertices per primitive
+_MERGEABLE_STYLES = {moderngl.TRIANGLES: 3, moderngl.LINES: 2, moderngl.POINTS: 1}
+
+# number of components of each attribute type
+_TYPE_SIZES = {"float": 1, "vec2": 2, "vec3": 3, "vec4": 4}
+
+
+# a single mesh drawing several meshes that share a material.
+#   the vertex data of all members is transformed to world space and
+#   concatenated into one geometry, so the whole group takes one draw call.
+#   members stay in the scene graph (and can still be found, moved, hidden, ...),
+#   but are drawn by the batch instead of individually; see Scene.freezeStatic.
+# the batch is rebuilt before the next draw after a member is changed:
+#   transform changes (of the member or any ancestor) made through Matrix methods,
+#   visibility, material and shadow flags, geometry attribute updates,
+#   and removal from the scene. members that no longer fit the batch
+#   (for example, after a material change) are released and drawn on their own.
+class StaticBatch(Mesh):
+    def __init__(self, meshList, scene=None):
+        if len(meshList) == 0:
+            raise Exception("StaticBatch requires at least one mesh")
+
+        self.key = StaticBatch.getBatchKey(meshList[0])
+        if self.key is None:
+            raise Exception("StaticBatch: mesh cannot be batched")
+
+        material, receiveShadow, castShadow, _attributes = self.key
+        super().__init__(Geometry("StaticBatch"), material)
+        self.castShadow = castShadow
+        self.setReceiveShadow(receiveShadow)
+
+        # scene whose render lists include this batch
+        self.scene = scene
+
+        self.members = []
+        for mesh in meshList:
+            if StaticBatch.getBatchKey(mesh) != self.key:
+                raise Exception(
+                    "StaticBatch: meshes must share material, shadow settings and attributes"
+                )
+            mesh.staticBatch = self
+            self.members.append(mesh)
+
+        # geometry and shadow-flag versions of members when the batch was last built
+        self.memberVersions = None
+        self.needsRebuild = True
+
+    @staticmethod
+    def getBatchKey(mesh):
+        """Return the value shared by meshes that can be batched together, or None"""
+        material = mesh.material
+        if mesh.isInstanced or not material.allowStaticBatching:
+            return None
+
+        geometry = mesh.geometry
+        if "vertexPosition" not in geometry.attributeData:
+            return None
+        attributes = tuple(
+            sorted((name, data["type"]) for name, data in geometry.attributeData.items())
+        )
+
+        # vertices are counted from the data (or indices), which is what merged buffers contain
+        if geometry.indices is not None:
+            drawCount = len(geometry.indices)
+        else:
+            drawCount = len(geometry.attributeData["vertexPosition"]["value"])
+        verticesPerPrimitive = _MERGEABLE_STYLES.get(material.drawStyle)
+        if verticesPerPrimitive is None or drawCount % verticesPerPrimitive != 0:
+            return None
+
+        receiveShadow = mesh.uniformList.getUniformValue("receiveShadow")
+        return (material, receiveShadow, mesh.castShadow, attributes)
+
+    def markChanged(self):
+        self.needsRebuild = True
+
+    def removeMember(self, mesh):
+        """Stop drawing mesh as part of this batch"""
+        self.members.remove(mesh)
+        mesh.staticBatch = None
+        self.needsRebuild = True
+        if self.scene is not None:
+            self.scene._invalidateRenderLists()
+
+    def release(self):
+        """Release all members (which are then drawn individually) and GPU resources"""
+        for mesh in self.members:
+            mesh.staticBatch = None
+        self.members = []
+        self.geometry.release()
+        if self.scene is not None:
+            self.scene._invalidateRenderLists()
+
+    def _getMemberVersions(self):
+        return [
+            (mesh.geometry.version, mesh.uniformList["receiveShadow"].version)
+            for mesh in self.members
+        ]
+
+    def update(self):
+        """Rebuild the merged geometry if any member changed since the last build"""
+        if not self.needsRebuild:
+            # geometry updates and receiveShadow are not reported to the batch
+            if self._getMemberVersions() == self.memberVersions:
+                return
+        self.rebuild()
+
+    def rebuild(self):
+        # members that no longer fit are drawn on their own from now on
+        for mesh in list(self.members):
+            if StaticBatch.getBatchKey(mesh) != self.key:
+                self.removeMember(mesh)
+
+        attributeTypes = dict(self.key[3])
+        arrays = {name: [] for name in attributeTypes}
+        vertexCount = 0
+        # indices of each member, offset by the vertices of the members before it;
+        #   used if any member is indexed (members drawn in order index all their vertices)
+        indexArrays = []
+        indexed = False
+
+        for mesh in self.members:
+            if not mesh.visible:
+                continue
+
+            worldMatrix = mesh.getWorldMatrix()
+            rotation = worldMatrix[0:3, 0:3]
+
+            for name, data in mesh.geometry.attributeData.items():
+                array = np.array(data["value"], dtype=np.float32).reshape(
+                    -1, _TYPE_SIZES[data["type"]]
+                )
+                if name == "vertexPosition":
+                    array = array @ rotation.T + worldMatrix[0:3, 3]
+                elif name == "vertexNormal":
+                    # same as the shaders: normalize(mat3(model) * normal)
+                    array = array @ rotation.T
+                    length = np.linalg.norm(array, axis=1, keepdims=True)
+                    array = array / np.where(length > 0, length, 1)
+                arrays[name].append(array.astype(np.float32))
+
+            memberVertexCount = len(mesh.geometry.attributeData["vertexPosition"]["value"])
+            if mesh.geometry.indices is not None:
+                indexed = True
+                indexArrays.append(mesh.geometry.indices.astype(np.int64) + vertexCount)
+            else:
+                indexArrays.append(np.arange(vertexCount, vertexCount + memberVertexCount))
+            vertexCount += memberVertexCount
+
+        self.geometry.release()
+        geometry = Geometry("StaticBatch")
+        if vertexCount > 0:
+            for name, arrayList in arrays.items():
+                geometry.setAttribute(attributeTypes[name], name, np.concatenate(arrayList))
+            if indexed:
+                geometry.setIndices(np.concatenate(indexArrays))
+        geometry.vertexCount = vertexCount
+        self.geometry = geometry
+
+        self.memberVersions = self._getMemberVersions()
+        self.needsRebuild = False
@@ -1,3 +1,8 @@
+import weakref
+
+from .OpenGLUtils import OpenGLUtils
+
+
 class Uniform:
     def __init__(self, type, name, value):
         # type: float | vec2 | vec3 | vec4 | mat4 | bool | sampler2D
@@ -6,6 +11,11 @@ class Uniform:
         # name of corresponding variable in shader program
         self.name = name
 
+        # incremented whenever value is assigned;
+        #   packed data is cached by the UniformBinder until then
+        self.version = 0
+        self._packed = None
+
         # value to be sent to shader.
         #   float/vecN/matN: numeric data
         #   bool: 0 for False, 1 for True
@@ -13,9 +23,24 @@ class Uniform:
         self.value = value
 
         # only used for uniform sampler2D variables;
-        #   used to track texture unit assignment
+        #   texture unit to use, or None to have one assigned per program
         self.textureNumber = None
 
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.version += 1
+        self._packed = None
+
+    def markChanged(self):
+        """Call after editing a value (list or numpy array) in place, so that it is uploaded"""
+        self.version += 1
+        self._packed = None
+
     def update(self, program):
         """Update uniform in ModernGL program - simplified interface"""
         # For ModernGL, uniform updates are handled directly by the Material class
@@ -29,11 +54,15 @@ class UniformList:
     def __init__(self):
         self.data = {}
 
+        # key=program, value=list of (uniform, slot) pairs; built by UniformBinder
+        self._bindings = weakref.WeakKeyDictionary()
+
     def addUniform(self, uniform, indexName=None):
         """Add uniform to collection"""
         if indexName is None:
             indexName = uniform.name
         self.data[indexName] = uniform
+        self._bindings.clear()
 
     def getUniformValue(self, indexName):
         """Get uniform value by name"""
@@ -43,44 +72,25 @@ class UniformList:
         """Set uniform value by name"""
         self.data[indexName].value = value
 
+    # dictionary-style access to the Uniform objects (used for Material.uniformList)
+    def __getitem__(self, indexName):
+        return self.data[indexName]
+
+    def __contains__(self, indexName):
+        return indexName in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return self.data.items()
+
+    def values(self):
+        return self.data.values()
+
     def update(self, program):
-        """Update all uniforms in ModernGL program"""
-        textureUnit = 1  # Start at 1, unit 0 reserved for shadow maps
-
-        for uniform in self.data.values():
-            if uniform.name not in program:
-                continue
-
-            try:
-                if uniform.type == "sampler2D":
-                    # Handle texture uniforms
-                    if uniform.value and hasattr(uniform.value, "use"):
-                        # This is a ModernGL texture
-                        uniform.value.use(location=textureUnit)
-                        program[uniform.name].value = textureUnit
-                        uniform.textureNumber = textureUnit
-                        textureUnit += 1
-                    elif isinstance(uniform.value, int) and uniform.value > 0:
-                        # Legacy texture ID - assign texture unit
-                        program[uniform.name].value = (
-                            uniform.textureNumber if uniform.textureNumber else 0
-                        )
-                else:
-                    # Handle other uniform types directly
-                    if uniform.type == "bool":
-                        program[uniform.name].value = bool(uniform.value)
-                    elif uniform.type == "mat4":
-                        # ModernGL expects matrices as bytes
-                        import numpy as np
-
-                        if isinstance(uniform.value, np.ndarray):
-                            # Convert to float32 and transpose for column-major order
-                            matrix_data = uniform.value.astype(np.float32).T
-                            program[uniform.name].write(matrix_data.tobytes())
-                        else:
-                            program[uniform.name].value = uniform.value
-                    else:
-                        program[uniform.name].value = uniform.value
-            except Exception:
-                # Silently skip uniforms that don't exist in this program
-                pass
+        """Update all uniforms in ModernGL program (unchanged values are skipped)"""
+        OpenGLUtils.uniformBinder.update(program, self)
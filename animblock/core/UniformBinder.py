@@ -0,0 +1,164 @@
+import struct
+import weakref
+
+import numpy as np
+
+
+# numpy element type for each moderngl uniform format character
+_FORMAT_DTYPES = {"f": np.float32, "d": np.float64, "i": np.int32, "I": np.uint32}
+
+
+# packing functions shared by all uniform variables of the same layout, so that values
+#   packed for one program are reused by the others (see Uniform._packed)
+_PACKERS = {}
+
+
+def _getPacker(member):
+    """Return a function converting a uniform value to the bytes expected by member"""
+    key = (member.fmt, member.matrix, member.array_length, member.dimension)
+    pack = _PACKERS.get(key)
+    if pack is None:
+        pack = _PACKERS[key] = _makePacker(member)
+    return pack
+
+
+def _makePacker(member):
+    fmt = member.fmt
+    dtype = _FORMAT_DTYPES.get(fmt[-1], np.float32)
+
+    if member.matrix:
+        # values are stored row-major; OpenGL expects column-major
+        return lambda value: np.asarray(value, dtype=dtype).swapaxes(-1, -2).tobytes()
+
+    if member.array_length > 1:
+        return lambda value: np.asarray(value, dtype=dtype).tobytes()
+
+    packer = struct.Struct("=" + fmt)
+    if member.dimension == 1:
+        return packer.pack
+    return lambda value: packer.pack(*value)
+
+
+class UniformSlot:
+    """Upload state of a single uniform variable in a single program"""
+
+    def __init__(self, member, unit=None):
+        self.member = member
+        # texture unit for sampler uniforms, None otherwise
+        self.unit = unit
+        self.pack = _getPacker(member) if unit is None else None
+        # bytes most recently written to the program
+        self.data = None
+        # the Uniform most recently sent to this slot, and its version at the time
+        self.uniform = None
+        self.version = None
+
+
+class UniformBinder:
+    """Uploads UniformList contents, skipping values the program already holds"""
+
+    def __init__(self, renderState):
+        # texture bindings go through the context's RenderState
+        self.renderState = renderState
+
+        # key=program, value={uniform name: UniformSlot}
+        self.programSlots = weakref.WeakKeyDictionary()
+        # key=program, value=next free texture unit;
+        #   unit 0 is left to samplers with a preset textureNumber (shadow maps)
+        self.nextTextureUnit = weakref.WeakKeyDictionary()
+
+        # running totals; see Renderer for per-render figures
+        self.uploadCount = 0
+        self.skipCount = 0
+
+    def resetCounters(self):
+        self.uploadCount = 0
+        self.skipCount = 0
+
+    def _getSlot(self, program, uniform):
+        slots = self.programSlots.get(program)
+        if slots is None:
+            slots = self.programSlots[program] = {}
+
+        slot = slots.get(uniform.name)
+        if slot is None:
+            member = program[uniform.name]
+            if uniform.type == "sampler2D":
+                unit = uniform.textureNumber
+                if unit is None:
+                    unit = self.nextTextureUnit.get(program, 1)
+                    self.nextTextureUnit[program] = unit + 1
+                # sampler values never change, so they are set once here
+                member.value = unit
+                slot = UniformSlot(member, unit)
+            else:
+                slot = UniformSlot(member)
+            slots[uniform.name] = slot
+        return slot
+
+    def _resolve(self, program, uniformList):
+        # uniforms missing from the program (optimized out, or used by
+        #   other shaders) are dropped here, once, instead of on every draw
+        bindings = [
+            (uniform, self._getSlot(program, uniform))
+            for uniform in uniformList.data.values()
+            if uniform.name in program
+        ]
+        # values are checked against the shader variables once, here, rather than per upload
+        for uniform, slot in bindings:
+            if slot.unit is None:
+                UniformBinder._checkValue(uniform, slot)
+        uniformList._bindings[program] = bindings
+        return bindings
+
+    @staticmethod
+    def _checkValue(uniform, slot):
+        member = slot.member
+        try:
+            size = len(slot.pack(uniform.value))
+        except (struct.error, TypeError, ValueError) as error:
+            raise Exception(
+                f"Value of uniform {uniform.name} does not fit its shader variable"
+            ) from error
+        if size != member.element_size * member.array_length:
+            raise Exception(
+                f"Value of uniform {uniform.name} has {size} bytes; "
+                f"its shader variable has {member.element_size * member.array_length}"
+            )
+
+    def update(self, program, uniformList):
+        """Send the uniforms of uniformList to program"""
+        bindings = uniformList._bindings.get(program)
+        if bindings is None:
+            bindings = self._resolve(program, uniformList)
+
+        for uniform, slot in bindings:
+            if slot.unit is not None:
+                value = uniform._value
+                if hasattr(value, "use"):
+                    self.renderState.bindTexture(value, slot.unit)
+                continue
+
+            # the slot holds this version of this uniform already;
+            #   values edited in place must be reported with Uniform.markChanged
+            version = uniform.version
+            if slot.uniform is uniform and slot.version == version:
+                self.skipCount += 1
+                continue
+            slot.uniform = uniform
+            slot.version = version
+
+            # the packed value is kept until the uniform is reassigned
+            packed = uniform._packed
+            if packed is None or packed[0] is not slot.pack:
+                packed = uniform._packed = (slot.pack, slot.pack(uniform._value))
+            data = packed[1]
+
+            # another uniform (of another mesh or material) may have sent the same value
+            if data == slot.data:
+                self.skipCount += 1
+                continue
+
+            slot.member.write(data)
+            slot.data = data
+            self.uploadCount += 1
@@ -0,0 +1,154 @@
+import struct
+from types import MappingProxyType
+
+import numpy as np
+
+from .OpenGLUtils import OpenGLUtils
+
+
+# std140 uniform buffer holding data shared by every program that declares
+#   a block with the same name (camera matrices, fog settings, lights).
+#   the Renderer writes each block once per render call;
+#   programs only need their block bound to the matching binding point,
+#   which Material does when its program is created.
+# shaders include the declarations below; block members have no instance name,
+#   so they are used exactly like the plain uniforms they replace.
+class UniformBlock:
+    # fixed binding point of each shared block (read-only, shared by all blocks)
+    bindingPoints = MappingProxyType({"Camera": 0, "Fog": 1, "Lights": 2})
+
+    # number of lights available to shaders
+    lightCount = 4
+
+    cameraCode = """
+    layout (std140) uniform Camera
+    {
+        mat4 projectionMatrix;
+        mat4 viewMatrix;
+    };
+    """
+
+    fogCode = """
+    layout (std140) uniform Fog
+    {
+        bool useFog;
+        float fogStartDistance;
+        float fogEndDistance;
+        vec3 fogColor;
+    };
+    """
+
+    lightsCode = """
+    struct Light
+    {
+        bool isAmbient;
+        bool isDirectional;
+        bool isPoint;
+
+        // used by all lights
+        float strength;
+        vec3 color;
+
+        // used by point light
+        vec3 position;
+        // distance at which a point light fades out completely; 0 means unlimited
+        float distance;
+
+        // used by directional light
+        vec3 direction;
+    };
+
+    layout (std140) uniform Lights
+    {
+        Light lights[4];
+    };
+
+    // smooth falloff reaching zero at distance; lights without a distance are not attenuated
+    float getAttenuation(float lightDistance, float distance)
+    {
+        if ( distance <= 0.0 )
+            return 1.0;
+        float ratio = lightDistance / distance;
+        float window = clamp( 1.0 - ratio * ratio * ratio * ratio, 0.0, 1.0 );
+        return window * window;
+    }
+
+    // number of entries of lights in use; set by the Renderer for each scene
+    //   (see Material.updateSceneDefines), so that loops have a constant length
+    #ifndef LIGHT_COUNT
+    #define LIGHT_COUNT 4
+    #endif
+    """
+
+    # std140 layouts of the blocks above
+    fogStruct = struct.Struct("=iff4x3f4x")
+    lightStruct = struct.Struct("=3if3f4x3ff3f4x")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.binding = UniformBlock.bindingPoints[name]
+        self.buffer = OpenGLUtils.createBuffer(reserve=size, owner=self)
+        # bytes currently stored in the buffer
+        self.data = None
+
+    def write(self, data):
+        """Store data in the buffer, unless it is already there"""
+        if data == self.data:
+            return False
+        OpenGLUtils.writeBuffer(self.buffer, data)
+        self.data = data
+        return True
+
+    def bind(self):
+        self.buffer.bind_to_uniform_block(self.binding)
+
+    def release(self):
+        OpenGLUtils.resourceManager.release(self.buffer)
+
+    @staticmethod
+    def bindProgram(program):
+        """Connect the shared blocks declared by program to their binding points"""
+        for name, binding in UniformBlock.bindingPoints.items():
+            if name in program:
+                program[name].binding = binding
+
+    @staticmethod
+    def packCamera(projectionMatrix, viewMatrix):
+        # numpy matrices are row-major; std140 matrices are column-major
+        matrices = np.array([projectionMatrix, viewMatrix], dtype=np.float32)
+        return matrices.transpose(0, 2, 1).tobytes()
+
+    @staticmethod
+    def packFog(fog):
+        if fog is None:
+            return UniformBlock.fogStruct.pack(0, 0, 0, 0, 0, 0)
+        uniformList = fog.uniformList
+        return UniformBlock.fogStruct.pack(
+            uniformList.getUniformValue("useFog"),
+            uniformList.getUniformValue("fogStartDistance"),
+            uniformList.getUniformValue("fogEndDistance"),
+            *uniformList.getUniformValue("fogColor"),
+        )
+
+    @staticmethod
+    def packLights(lightList):
+        # lights beyond lightCount are ignored; unused entries are zero,
+        #   which shaders treat as "no light"
+        data = []
+        for light in lightList[: UniformBlock.lightCount]:
+            uniformList = light.uniformList
+            data.append(
+                UniformBlock.lightStruct.pack(
+                    uniformList.getUniformValue("isAmbient"),
+                    uniformList.getUniformValue("isDirectional"),
+                    uniformList.getUniformValue("isPoint"),
+                    uniformList.getUniformValue("strength"),
+                    *uniformList.getUniformValue("color"),
+                    *uniformList.getUniformValue("position"),
+                    uniformList.getUniformValue("distance"),
+                    *uniformList.getUniformValue("direction"),
+                )
+            )
+        unused = UniformBlock.lightCount - len(data)
+        data.append(bytes(UniformBlock.lightStruct.size * unused))
+        return b"".join(data)
@@ -1,15 +1,27 @@
+from .AssetLoader import *
 from .Base import *
+from .DeferredShading import *
 from .FirstPersonController import *
 from .Fog import *
+from .HeadlessBase import *
 from .Input import *
+from .InstancedMesh import *
+from .LightClusters import *
 from .Mesh import *
 from .Object3D import *
 from .OpenGLUtils import *
 from .OrbitController import *
 from .ParticleEngine import *
+from .ProgramCache import *
 from .Renderer import *
+from .RenderQueue import *
+from .RenderState import *
 from .RenderTarget import *
+from .ResourceManager import *
 from .Scene import *
 from .Sprite import *
+from .StaticBatch import *
 from .TextImage import *
 from .Uniform import *
+from .UniformBinder import *
+from .UniformBlock import *
@@ -1,5 +1,7 @@
 from math import pi
 
+import numpy as np
+
 from ..mathutils import MatrixFactory
 from .Geometry import Geometry
 from .QuadGeometry import QuadGeometry
@@ -12,94 +14,64 @@ class BoxGeometry(Geometry):
         super().__init__()
 
         # create from 6 quads.
+        #   each entry: quad size and resolution, and the matrix moving it into place
+        faces = [
+            (
+                (width, height, widthResolution, heightResolution),
+                MatrixFactory.makeTranslation(0, 0, depth / 2),
+            ),
+            (
+                (width, height, widthResolution, heightResolution),
+                MatrixFactory.makeTranslation(0, 0, -depth / 2) @ MatrixFactory.makeRotationY(pi),
+            ),
+            (
+                (depth, height, depthResolution, heightResolution),
+                MatrixFactory.makeTranslation(-width / 2, 0, 0)
+                @ MatrixFactory.makeRotationY(-pi / 2),
+            ),
+            (
+                (depth, height, depthResolution, heightResolution),
+                MatrixFactory.makeTranslation(width / 2, 0, 0)
+                @ MatrixFactory.makeRotationY(pi / 2),
+            ),
+            (
+                (width, depth, widthResolution, depthResolution),
+                MatrixFactory.makeTranslation(0, height / 2, 0)
+                @ MatrixFactory.makeRotationX(-pi / 2),
+            ),
+            (
+                (width, depth, widthResolution, depthResolution),
+                MatrixFactory.makeTranslation(0, -height / 2, 0)
+                @ MatrixFactory.makeRotationX(pi / 2),
+            ),
+        ]
 
         vertexPositionData = []
         vertexUVData = []
         vertexNormalData = []
+        indexData = []
+        vertexCount = 0
+        for quadParameters, matrix in faces:
+            quad = QuadGeometry(*quadParameters)
+            vertexPositionData.append(
+                self.applyMat4ToVec3List(matrix, quad.getAttributeArray("vertexPosition"))
+            )
+            vertexUVData.append(quad.getAttributeArray("vertexUV"))
+            # directions are rotated, not translated
+            vertexNormalData.append(quad.getAttributeArray("vertexNormal") @ matrix[0:3, 0:3].T)
+            # faces keep their own vertices (their normals differ along the edges)
+            indexData.append(quad.indices + vertexCount)
+            vertexCount += quad.vertexCount
+            quad.release()
 
-        frontQuad = QuadGeometry(width, height, widthResolution, heightResolution)
-        frontMatrix = MatrixFactory.makeTranslation(0, 0, depth / 2)
-        vertexPositionData += self.applyMat4ToVec3List(
-            frontMatrix, frontQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += frontQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            frontMatrix, frontQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        backQuad = QuadGeometry(width, height, widthResolution, heightResolution)
-        backMatrix = MatrixFactory.makeTranslation(0, 0, -depth / 2) @ MatrixFactory.makeRotationY(
-            pi
-        )
-        vertexPositionData += self.applyMat4ToVec3List(
-            backMatrix, backQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += backQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            backMatrix, backQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        leftQuad = QuadGeometry(depth, height, depthResolution, heightResolution)
-        leftMatrix = MatrixFactory.makeTranslation(-width / 2, 0, 0) @ MatrixFactory.makeRotationY(
-            -pi / 2
-        )
-        vertexPositionData += self.applyMat4ToVec3List(
-            leftMatrix, leftQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += leftQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            leftMatrix, leftQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        rightQuad = QuadGeometry(depth, height, depthResolution, heightResolution)
-        rightMatrix = MatrixFactory.makeTranslation(width / 2, 0, 0) @ MatrixFactory.makeRotationY(
-            pi / 2
-        )
-        vertexPositionData += self.applyMat4ToVec3List(
-            rightMatrix, rightQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += rightQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            rightMatrix, rightQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        topQuad = QuadGeometry(width, depth, widthResolution, depthResolution)
-        topMatrix = MatrixFactory.makeTranslation(0, height / 2, 0) @ MatrixFactory.makeRotationX(
-            -pi / 2
-        )
-        vertexPositionData += self.applyMat4ToVec3List(
-            topMatrix, topQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += topQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            topMatrix, topQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        bottomQuad = QuadGeometry(width, depth, widthResolution, depthResolution)
-        bottomMatrix = MatrixFactory.makeTranslation(
-            0, -height / 2, 0
-        ) @ MatrixFactory.makeRotationX(pi / 2)
-        vertexPositionData += self.applyMat4ToVec3List(
-            bottomMatrix, bottomQuad.attributeData["vertexPosition"]["value"]
-        )
-        vertexUVData += bottomQuad.attributeData["vertexUV"]["value"]
-        vertexNormalData += self.applyMat4ToVec3List(
-            bottomMatrix, bottomQuad.attributeData["vertexNormal"]["value"]
-        )
-
-        self.setAttribute("vec3", "vertexPosition", vertexPositionData)
-        self.setAttribute("vec2", "vertexUV", vertexUVData)
-        self.setAttribute("vec3", "vertexNormal", vertexNormalData)
+        self.setAttribute("vec3", "vertexPosition", np.concatenate(vertexPositionData))
+        self.setAttribute("vec2", "vertexUV", np.concatenate(vertexUVData))
+        self.setAttribute("vec3", "vertexNormal", np.concatenate(vertexNormalData))
+        self.setIndices(np.concatenate(indexData))
 
-        self.vertexCount = len(vertexPositionData)
+        self.vertexCount = vertexCount
 
     def applyMat4ToVec3List(self, matrix, originalVectorList):
-        newVectorList = []
-        count = len(originalVectorList)
-        for index in range(count):
-            v = originalVectorList[index]
-            v.append(1)  # convert to homogeneous coordinates
-            v = list(matrix @ v)
-            v.pop(3)  # convert back to vec3
-            newVectorList.append(v)
-        return newVectorList
+        """Return the points of originalVectorList (shape (n, 3)) transformed by a 4x4 matrix"""
+        matrix = np.asarray(matrix)
+        return np.asarray(originalVectorList) @ matrix[0:3, 0:3].T + matrix[0:3, 3]
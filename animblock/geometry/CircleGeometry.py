@@ -1,4 +1,6 @@
-from math import cos, radians, sin
+from math import pi
+
+import numpy as np
 
 from .Geometry import Geometry
 
@@ -7,27 +9,27 @@ from .Geometry import Geometry
 class CircleGeometry(Geometry):
     def __init__(self, radius=1, segments=32):
         super().__init__()
-        vertexPositionData = []
-        vertexUVData = []
-        vertexNormalData = []
-
-        angle = radians(360) / segments
-        posCenter = [0, 0, 0]
-        uvCenter = [0.5, 0.5]
-        normal = [0, 0, 1]
-        for i in range(segments):
-            posA = [radius * cos(i * angle), radius * sin(i * angle), 0]
-            posB = [radius * cos((i + 1) * angle), radius * sin((i + 1) * angle), 0]
-            vertexPositionData.extend([posCenter, posA, posB])
 
-            uvA = [cos(i * angle) * 0.5 + 0.5, sin(i * angle) * 0.5 + 0.5]
-            uvB = [cos((i + 1) * angle) * 0.5 + 0.5, sin((i + 1) * angle) * 0.5 + 0.5]
-            vertexUVData.extend([uvCenter, uvA, uvB])
+        # a center vertex and segments rim vertices, with a triangle
+        #   (center, rim i, rim i+1) per segment
+        angles = np.arange(segments) * (2 * pi / segments)
+        cosines = np.cos(angles)
+        sines = np.sin(angles)
 
-            vertexNormalData.extend([normal, normal, normal])
+        vertexPositionData = np.concatenate(
+            [[[0, 0, 0]], np.stack([radius * cosines, radius * sines, np.zeros(segments)], axis=1)]
+        )
+        vertexUVData = np.concatenate(
+            [[[0.5, 0.5]], np.stack([cosines * 0.5 + 0.5, sines * 0.5 + 0.5], axis=1)]
+        )
+        vertexNormalData = np.tile([0, 0, 1], (segments + 1, 1))
 
         self.setAttribute("vec3", "vertexPosition", vertexPositionData)
         self.setAttribute("vec2", "vertexUV", vertexUVData)
         self.setAttribute("vec3", "vertexNormal", vertexNormalData)
-
         self.vertexCount = len(vertexPositionData)
+
+        rim = np.arange(segments)
+        self.setIndices(
+            np.stack([np.zeros(segments, dtype=int), 1 + rim, 1 + (rim + 1) % segments], axis=1)
+        )
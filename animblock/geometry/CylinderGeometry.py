@@ -1,4 +1,6 @@
-from math import cos, pi, radians, sin
+from math import pi
+
+import numpy as np
 
 from .SurfaceGeometry import SurfaceGeometry
 
@@ -22,58 +24,54 @@ class CylinderGeometry(SurfaceGeometry):
             1,
             heightSegments,
             lambda a, b: [
-                (b * radiusTop + (1 - b) * radiusBottom) * cos(-a),
+                (b * radiusTop + (1 - b) * radiusBottom) * np.cos(-a),
                 (b - 0.5) * height,
-                (b * radiusTop + (1 - b) * radiusBottom) * sin(-a),
+                (b * radiusTop + (1 - b) * radiusBottom) * np.sin(-a),
             ],
         )
 
-        vertexPositionData = self.attributeData["vertexPosition"]["value"]
-        vertexUVData = self.attributeData["vertexUV"]["value"]
-        vertexNormalData = self.attributeData["vertexNormal"]["value"]
-
-        if circleTop:
-            angle = radians(360) / radialSegments
-            posCenter = [0, height / 2, 0]
-            uvCenter = [0.5, 0.5]
-            normal = [0, 1, 0]
-            for i in range(radialSegments):
-                posA = [radiusTop * cos(i * angle), height / 2, radiusTop * sin(i * angle)]
-                posB = [
-                    radiusTop * cos((i + 1) * angle),
-                    height / 2,
-                    radiusTop * sin((i + 1) * angle),
-                ]
-                vertexPositionData.extend([posCenter, posA, posB])
-
-                uvA = [cos(i * angle) * 0.5 + 0.5, sin(i * angle) * 0.5 + 0.5]
-                uvB = [cos((i + 1) * angle) * 0.5 + 0.5, sin((i + 1) * angle) * 0.5 + 0.5]
-                vertexUVData.extend([uvCenter, uvA, uvB])
-
-                vertexNormalData.extend([normal, normal, normal])
-
-        if circleBottom:
-            angle = radians(360) / radialSegments
-            posCenter = [0, -height / 2, 0]
-            uvCenter = [0.5, 0.5]
-            normal = [0, -1, 0]
-            for i in range(radialSegments):
-                posA = [radiusBottom * cos(i * angle), -height / 2, radiusBottom * sin(i * angle)]
-                posB = [
-                    radiusBottom * cos((i + 1) * angle),
-                    -height / 2,
-                    radiusBottom * sin((i + 1) * angle),
-                ]
-                vertexPositionData.extend([posCenter, posA, posB])
+        # caps: a center vertex and radialSegments rim vertices each,
+        #   with a triangle (center, rim i, rim i+1) per segment
+        angles = np.arange(radialSegments) * (2 * pi / radialSegments)
+        rimUVs = np.stack([np.cos(angles) * 0.5 + 0.5, np.sin(angles) * 0.5 + 0.5], axis=1)
+        segments = np.arange(radialSegments)
 
-                uvA = [cos(i * angle) * 0.5 + 0.5, sin(i * angle) * 0.5 + 0.5]
-                uvB = [cos((i + 1) * angle) * 0.5 + 0.5, sin((i + 1) * angle) * 0.5 + 0.5]
-                vertexUVData.extend([uvCenter, uvA, uvB])
+        positionArrays = [self.getAttributeArray("vertexPosition")]
+        uvArrays = [self.getAttributeArray("vertexUV")]
+        normalArrays = [self.getAttributeArray("vertexNormal")]
+        indexArrays = [self.indices]
+        vertexCount = self.vertexCount
 
-                vertexNormalData.extend([normal, normal, normal])
+        for enabled, radius, y, normal in (
+            (circleTop, radiusTop, height / 2, [0, 1, 0]),
+            (circleBottom, radiusBottom, -height / 2, [0, -1, 0]),
+        ):
+            if not enabled:
+                continue
+            rimPositions = np.stack(
+                [radius * np.cos(angles), np.full(radialSegments, y), radius * np.sin(angles)],
+                axis=1,
+            )
+            positionArrays.append(np.concatenate([[[0, y, 0]], rimPositions]))
+            uvArrays.append(np.concatenate([[[0.5, 0.5]], rimUVs]))
+            normalArrays.append(np.tile(normal, (radialSegments + 1, 1)))
 
-        self.vertexCount = len(vertexPositionData)
+            center = vertexCount
+            indexArrays.append(
+                np.stack(
+                    [
+                        np.full(radialSegments, center),
+                        center + 1 + segments,
+                        center + 1 + (segments + 1) % radialSegments,
+                    ],
+                    axis=1,
+                ).reshape(-1)
+            )
+            vertexCount += radialSegments + 1
 
-        self.setAttribute("vec3", "vertexPosition", vertexPositionData)
-        self.setAttribute("vec2", "vertexUV", vertexUVData)
-        self.setAttribute("vec3", "vertexNormal", vertexNormalData)
+        # the caps follow the side surface
+        self.setAttribute("vec3", "vertexPosition", np.concatenate(positionArrays))
+        self.setAttribute("vec2", "vertexUV", np.concatenate(uvArrays))
+        self.setAttribute("vec3", "vertexNormal", np.concatenate(normalArrays))
+        self.setIndices(np.concatenate(indexArrays))
+        self.vertexCount = vertexCount
@@ -3,44 +3,271 @@ import numpy as np
 from ..core.OpenGLUtils import OpenGLUtils
 
 
+# components of each attribute type
+_COMPONENT_COUNTS = {"float": 1, "vec2": 2, "vec3": 3, "vec4": 4}
+# dirty ranges separated by fewer elements than this are uploaded with one write
+_MERGE_GAP = 16
+
+
 class Geometry:
     def __init__(self, name="Geometry"):
+        # key=attribute name, value=dictionary of type, name, value, buffer, dirtyRanges;
+        #   each value is a contiguous float32 array, of shape (vertices,) for float attributes
+        #   and (vertices, components) for vector attributes; buffers are created from its memory
         self.attributeData = {}
         self.vertexCount = None  # must be set by extending class
         self.name = name
 
+        # vertex numbers of the primitives (contiguous uint32 array, three per triangle),
+        #   or None to draw vertices in order; see setIndices
+        self.indices = None
+        self.indexBuffer = None
+
         # store vertex array objects for different programs
-        # index by program object id
+        # index by program object
         self.vaoData = {}
 
         # Store ModernGL buffers
         self.buffers = {}
+        # buffers and vertex arrays are owned by this geometry (see ResourceManager):
+        #   they are released by release(), or after the geometry is garbage collected
+
+        # incremented whenever attribute data changes
+        self.version = 0
+        # incremented whenever buffers are created or released; vertex arrays made
+        #   for an earlier layout do not read the current buffers
+        self.layoutVersion = 0
+        # names of attributes with elements marked by markAttributeDirty
+        self.dirtyAttributes = set()
+
+        # bounding volumes of vertexPosition data, and the version they were computed for
+        self._boundingBox = None
+        self._boundingSphere = None
+        self._boundsVersion = None
+
+    @staticmethod
+    def toAttributeArray(type, value):
+        """
+        Return value (an array or nested lists of numbers) as stored for an attribute of the
+        given type; float32 arrays that are contiguous already are used without a copy
+        """
+        array = np.ascontiguousarray(value, dtype=np.float32)
+        components = _COMPONENT_COUNTS[type]
+        return array.reshape(-1) if components == 1 else array.reshape(-1, components)
 
     def setAttribute(self, type, name, value):
-        """Set attribute data and create ModernGL buffer"""
-        data = {"type": type, "name": name, "value": value, "buffer": None}
+        """
+        Set attribute data and create ModernGL buffer; value may be a list or an array
+        (a contiguous float32 array is stored as given, so later edits of it are shared)
+        """
+        value = Geometry.toAttributeArray(type, value)
+        data = {"type": type, "name": name, "value": value, "buffer": None, "dirtyRanges": []}
+        # an attribute of the same type keeps its buffer (and its place in vertex arrays)
+        previous = self.attributeData.get(name)
+        if previous is not None and previous["buffer"] is not None:
+            if previous["type"] == type:
+                data["buffer"] = previous["buffer"]
+            else:
+                self._releaseVertexArrays()
+                OpenGLUtils.resourceManager.release(previous["buffer"])
+                del self.buffers[name]
         self.attributeData[name] = data
+        self.dirtyAttributes.discard(name)
         self.processAttribute(name)
 
     def processAttribute(self, name):
-        """Create ModernGL buffer for attribute data"""
+        """
+        Copy all data of an attribute to its buffer; the buffer is created on first use,
+        and later replaced in place (orphaned and written, reallocated if the size changed),
+        so that vertex arrays using it stay valid
+        """
         data = self.attributeData[name]
 
-        # Convert to numpy array and create ModernGL buffer
-        array = np.array(data["value"], dtype=np.float32)
-        buffer = OpenGLUtils.ctx.buffer(array.tobytes())
+        # copied from the array memory (value may also have been replaced by a list)
+        array = data["value"] = Geometry.toAttributeArray(data["type"], data["value"])
+        if data["buffer"] is None:
+            # vertex arrays created so far do not include the new buffer
+            self._releaseVertexArrays()
+            buffer = OpenGLUtils.createBuffer(array, owner=self)
+            data["buffer"] = buffer
+            self.buffers[name] = buffer
+        else:
+            OpenGLUtils.replaceBufferData(data["buffer"], array)
 
-        data["buffer"] = buffer
-        self.buffers[name] = buffer
+        # all elements are current now
+        data["dirtyRanges"] = []
+        self.dirtyAttributes.discard(name)
+        self.version += 1
 
     def updateAttribute(self, name, value):
         """Update attribute data and ModernGL buffer"""
         self.attributeData[name]["value"] = value
         self.processAttribute(name)
 
-    def setupVAO(self, program):
-        """Setup ModernGL VertexArray for given program"""
-        # Build content list for ModernGL vertex array
+    def setIndices(self, indices):
+        """
+        Draw primitives from the vertices listed in indices (an array or list of vertex
+        numbers, for example three per triangle), so that vertices shared by several
+        primitives are stored and processed once; None draws all vertices in order again
+        """
+        if indices is None:
+            if self.indexBuffer is not None:
+                # vertex arrays include the index buffer
+                self._releaseVertexArrays()
+                OpenGLUtils.resourceManager.release(self.indexBuffer)
+            self.indices = None
+            self.indexBuffer = None
+        else:
+            self.indices = np.ascontiguousarray(indices, dtype=np.uint32).reshape(-1)
+            if self.indexBuffer is None:
+                self._releaseVertexArrays()
+            elif len(self.indices) > 0:
+                OpenGLUtils.replaceBufferData(self.indexBuffer, self.indices)
+        self.version += 1
+
+    def getIndexBuffer(self):
+        """
+        Return the buffer of indices, or None if not indexed; it is created for the first
+        vertex array using it (and again after release)
+        """
+        if self.indices is not None and self.indexBuffer is None and len(self.indices) > 0:
+            self.indexBuffer = OpenGLUtils.createBuffer(self.indices, owner=self)
+        return self.indexBuffer
+
+    def getDrawCount(self):
+        """Number of vertices submitted by a draw call: the number of indices, if indexed"""
+        if self.indices is not None:
+            return len(self.indices)
+        return self.vertexCount
+
+    def weld(self, decimals=None):
+        """
+        Merge vertices with equal values of all attributes (for example position, uv and
+        normal) and draw the remaining vertices by index (see setIndices); with decimals,
+        values are compared after rounding, so that nearly equal vertices are merged too.
+        Returns the number of vertices removed.
+        """
+        names = list(self.attributeData)
+        arrays = [self.attributeData[name]["value"] for name in names]
+        vertexCount = len(arrays[0]) if arrays else 0
+        if vertexCount == 0:
+            return 0
+        if any(len(array) != vertexCount for array in arrays):
+            raise Exception("Geometry.weld: attributes have different numbers of vertices")
+
+        rows = np.concatenate([array.reshape(vertexCount, -1) for array in arrays], axis=1)
+        if decimals is not None:
+            rows = np.round(rows, decimals)
+        # -0.0 and 0.0 differ in their bits, compared below; adding 0.0 gives 0.0 for both
+        rows = np.ascontiguousarray(rows + np.float32(0), dtype=np.float32)
+        keys = rows.view(np.dtype((np.void, rows.itemsize * rows.shape[1]))).reshape(-1)
+        _unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        # keep vertices in order of first use, so that nearby primitives share nearby vertices
+        order = np.argsort(first)
+        kept = first[order]
+        newIndex = np.empty(len(kept), dtype=np.uint32)
+        newIndex[order] = np.arange(len(kept), dtype=np.uint32)
+        indices = newIndex[inverse.reshape(-1)]
+        if self.indices is not None:
+            indices = indices[self.indices]
+
+        for name in names:
+            data = self.attributeData[name]
+            self.setAttribute(data["type"], name, data["value"][kept])
+        self.vertexCount = len(kept)
+        self.setIndices(indices)
+        return vertexCount - len(kept)
+
+    def getAttributeArray(self, name):
+        """
+        Return the array storing an attribute, for editing in place; call markAttributeDirty
+        (or processAttribute) afterwards to copy the changes to the buffer
+        """
+        return self.attributeData[name]["value"]
+
+    def markAttributeDirty(self, name, start=0, end=None):
+        """
+        Mark elements (vertices) start, ..., end-1 of an attribute as changed, after editing
+        its value in place; only marked elements are copied to the buffer, before the
+        geometry is drawn next (see uploadDirtyRanges)
+        """
+        data = self.attributeData[name]
+        if end is None:
+            end = len(data["value"])
+        if end <= start:
+            return
+        data["dirtyRanges"].append((start, end))
+        self.dirtyAttributes.add(name)
+        self.version += 1
+
+    def uploadDirtyRanges(self):
+        """Copy the elements marked by markAttributeDirty to the buffers"""
+        for name in self.dirtyAttributes:
+            data = self.attributeData[name]
+            elementSize = _COMPONENT_COUNTS[data["type"]] * 4
+            value = data["value"]
+            for start, end in Geometry._mergeRanges(data["dirtyRanges"]):
+                # rows of a contiguous array are contiguous too, and written without a copy
+                OpenGLUtils.writeBuffer(
+                    data["buffer"], value[start:end], offset=start * elementSize
+                )
+            data["dirtyRanges"] = []
+        self.dirtyAttributes = set()
+
+    @staticmethod
+    def _mergeRanges(ranges):
+        """
+        Return the (start, end) ranges sorted and combined; ranges separated by fewer than
+        _MERGE_GAP elements are combined too, since one larger write is cheaper than two
+        """
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + _MERGE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _releaseVertexArrays(self):
+        resourceManager = OpenGLUtils.resourceManager
+        for vao in self.vaoData.values():
+            resourceManager.release(vao)
+        self.vaoData = {}
+        self.layoutVersion += 1
+
+    def _updateBounds(self):
+        if self._boundsVersion == self.version:
+            return
+        self._boundsVersion = self.version
+        self._boundingBox = None
+        self._boundingSphere = None
+
+        data = self.attributeData.get("vertexPosition")
+        if data is None or len(data["value"]) == 0:
+            return
+        positions = data["value"]
+        boxMin = positions.min(axis=0)
+        boxMax = positions.max(axis=0)
+        self._boundingBox = (boxMin, boxMax)
+
+        # sphere centered on the box; tighter than the sphere around the box
+        center = (boxMin + boxMax) / 2
+        radius = float(np.sqrt(((positions - center) ** 2).sum(axis=1).max()))
+        self._boundingSphere = (center, radius)
+
+    def getBoundingBox(self):
+        """Return (min, max) corners of the vertexPosition data, or None if there is none"""
+        self._updateBounds()
+        return self._boundingBox
+
+    def getBoundingSphere(self):
+        """Return (center, radius) of a sphere containing the vertexPosition data, or None"""
+        self._updateBounds()
+        return self._boundingSphere
+
+    def getVAOContent(self, program):
+        """Return (buffer, format, name) entries for the attributes used by program"""
         vao_content = []
 
         for name, data in self.attributeData.items():
@@ -63,22 +290,36 @@ class Geometry:
             if data["name"] in program:
                 vao_content.append((data["buffer"], format_str, data["name"]))
 
-        # Create ModernGL VertexArray
-        if vao_content:
-            vao = OpenGLUtils.ctx.vertex_array(program, vao_content)
-        else:
-            # Create empty VAO if no valid attributes
-            vao = OpenGLUtils.ctx.vertex_array(program, [])
+        return vao_content
+
+    def setupVAO(self, program):
+        """Setup ModernGL VertexArray for given program"""
+        OpenGLUtils.resourceManager.releaseVertexArrays(self.vaoData)
+
+        # Build content list for ModernGL vertex array
+        # (an empty list creates an empty VAO if no valid attributes)
+        vao = OpenGLUtils.createVertexArray(
+            program, self.getVAOContent(program), owner=self, indexBuffer=self.getIndexBuffer()
+        )
 
-        # Store VAO using program object as key
-        self.vaoData[id(program)] = vao
+        # Store VAO using program object as key; ids of released programs
+        #   (for example, unused material variants) may be reused by new ones
+        self.vaoData[program] = vao
         return vao
 
     def getVAO(self, program):
         """Get ModernGL VertexArray for given program"""
-        program_id = id(program)
-
-        if program_id not in self.vaoData:
+        if program not in self.vaoData:
             self.setupVAO(program)
 
-        return self.vaoData[program_id]
+        return self.vaoData[program]
+
+    def release(self):
+        """Release the buffers and vertex arrays of this geometry"""
+        OpenGLUtils.resourceManager.releaseOwner(self)
+        self.vaoData = {}
+        self.layoutVersion += 1
+        self.buffers = {}
+        self.indexBuffer = None
+        for data in self.attributeData.values():
+            data["buffer"] = None
@@ -10,16 +10,10 @@ class LineGeometry(Geometry):
         self.setAttribute("vec3", "vertexPosition", vertexPositionData)
 
         # calculate arclength parameters; used by LineDashedMaterial
-        vertexCount = len(vertexPositionData)
-        totalArcLength = 0
-        vertexArcLengthData = [0]
-        for index in range(1, vertexCount):
-            segmentLength = np.linalg.norm(
-                np.subtract(vertexPositionData[index], vertexPositionData[index - 1])
-            )
-            totalArcLength += segmentLength
-            vertexArcLengthData.append(totalArcLength)
+        points = np.asarray(vertexPositionData, dtype=float).reshape(-1, 3)
+        segmentLengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        vertexArcLengthData = np.concatenate([[0], np.cumsum(segmentLengths)])
 
         self.setAttribute("float", "vertexArcLength", vertexArcLengthData)
 
-        self.vertexCount = len(vertexPositionData)
+        self.vertexCount = len(points)
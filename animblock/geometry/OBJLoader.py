@@ -0,0 +1,391 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+
+class OBJLoader:
+    """
+    Reads Wavefront OBJ files into arrays for indexed geometry (see OBJGeometry).
+
+    The file is read in chunks of whole lines; consecutive lines of the same kind (v, vt,
+    vn, f) are split together, and all numbers are converted to numpy arrays at once.
+    Faces may have any number of corners (they are triangulated as fans), and corners may
+    omit texture coordinates and normals (p, p/t, p//n or p/t/n; negative numbers count
+    back from the last element).
+    Missing normals are computed from the faces. Each distinct corner (position, texture
+    coordinates, normal) becomes one vertex.
+
+    Parsed arrays of larger files are cached in .npz files in cacheDirectory (None disables
+    the cache), keyed by the absolute path, modification time and size of the file.
+    """
+
+    cacheDirectory = os.path.join(os.path.expanduser("~"), ".cache", "animblock", "obj")
+    # changed whenever the cached arrays change
+    cacheFormat = 1
+    # smaller files parse about as fast as a cache file loads, and are not cached
+    cacheMinimumSize = 1 << 16
+    # characters of the file read at a time
+    chunkSize = 1 << 20
+
+    @staticmethod
+    def load(fileName, smoothNormals=False, useCache=True):
+        """
+        Return a dictionary of arrays:
+            positions (vertices, 3), normals (vertices, 3), and uvs (vertices, 2),
+            or None if the file has no texture coordinates,
+            indices (three per triangle), filePositions (the v lines, in order),
+            objects (the text after each o line)
+        With smoothNormals, the normals of all corners at the same position are averaged.
+        """
+        cacheFileName = None
+        if (
+            useCache
+            and OBJLoader.cacheDirectory is not None
+            and os.path.getsize(fileName) >= OBJLoader.cacheMinimumSize
+        ):
+            cacheFileName = OBJLoader.getCacheFileName(fileName, smoothNormals)
+            data = OBJLoader._readCache(cacheFileName)
+            if data is not None:
+                return data
+
+        data = OBJLoader.parse(fileName, smoothNormals)
+
+        if cacheFileName is not None:
+            OBJLoader._writeCache(cacheFileName, data)
+        return data
+
+    @staticmethod
+    def getCacheFileName(fileName, smoothNormals=False):
+        """Return the cache file for the current version of fileName"""
+        path = os.path.abspath(fileName)
+        status = os.stat(path)
+        key = "|".join(
+            str(part)
+            for part in (
+                path,
+                status.st_mtime_ns,
+                status.st_size,
+                smoothNormals,
+                OBJLoader.cacheFormat,
+            )
+        )
+        name = hashlib.sha1(key.encode(), usedforsecurity=False).hexdigest() + ".npz"
+        return os.path.join(OBJLoader.cacheDirectory, name)
+
+    @staticmethod
+    def _readCache(cacheFileName):
+        try:
+            with np.load(cacheFileName) as cache:
+                data = {name: cache[name] for name in cache.files}
+        except (OSError, ValueError):
+            return None
+        data.setdefault("uvs", None)
+        data["objects"] = [str(text) for text in data["objects"]]
+        return data
+
+    @staticmethod
+    def _writeCache(cacheFileName, data):
+        # written to a temporary file first, so readers never see a partial cache file
+        arrays = {name: value for name, value in data.items() if value is not None}
+        arrays["objects"] = np.array(data["objects"], dtype=str)
+        temporaryFileName = f"{cacheFileName}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cacheFileName), exist_ok=True)
+            with open(temporaryFileName, "wb") as cacheFile:
+                np.savez(cacheFile, **arrays)
+            os.replace(temporaryFileName, cacheFileName)
+        except OSError:
+            # the cache only saves time; models load without it
+            if os.path.exists(temporaryFileName):
+                os.remove(temporaryFileName)
+
+    @staticmethod
+    def parse(fileName, smoothNormals=False):
+        """Read fileName and return the arrays described in load (without the cache)"""
+        tokens = _OBJTokens()
+        with open(fileName) as objFile:
+            while True:
+                # about chunkSize characters, completed to a whole line
+                text = objFile.read(OBJLoader.chunkSize)
+                if len(text) == 0:
+                    break
+                tokens.addText(text + objFile.readline())
+
+        positionTokens = tokens.positionTokens
+        uvTokens = tokens.uvTokens
+        normalTokens = tokens.normalTokens
+        cornerTokens = tokens.cornerTokens
+        cornerCounts = tokens.cornerCounts
+        objects = tokens.objects
+
+        filePositions = np.array(positionTokens, dtype=np.float64).reshape(-1, 3)
+        fileUVs = np.array(uvTokens, dtype=np.float64).reshape(-1, 2)
+        fileNormals = np.array(normalTokens, dtype=np.float64).reshape(-1, 3)
+        # position, uv and normal numbers of each corner: 0-based, -1 where missing
+        corners = OBJLoader._parseCorners(cornerTokens) - 1
+
+        # triangulate faces as fans: corners (0, i, i+1) for i = 1, ..., count-2
+        cornerCounts = np.array(cornerCounts, dtype=np.int64)
+        faceStarts = np.cumsum(cornerCounts) - cornerCounts
+        triangleCounts = np.maximum(cornerCounts - 2, 0)
+        firstCorners = np.repeat(faceStarts, triangleCounts)
+        # i for each triangle: its position within the face, plus 1
+        triangleNumbers = np.arange(len(firstCorners)) - np.repeat(
+            np.cumsum(triangleCounts) - triangleCounts, triangleCounts
+        )
+        triangles = np.stack(
+            [firstCorners, firstCorners + triangleNumbers + 1, firstCorners + triangleNumbers + 2],
+            axis=1,
+        )
+        triangleCorners = corners[triangles]  # (triangles, 3 corners, 3 numbers)
+
+        # unit normals of the triangles, for corners without normals
+        p = filePositions[triangleCorners[:, :, 0]]
+        faceNormals = OBJLoader._normalize(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]))
+
+        cornerList = triangleCorners.reshape(-1, 3)
+        hasNormal = cornerList[:, 2] >= 0
+        cornerNormals = np.where(
+            hasNormal[:, None],
+            fileNormals[np.maximum(cornerList[:, 2], 0)] if len(fileNormals) else 0.0,
+            np.repeat(faceNormals, 3, axis=0),
+        )
+
+        # corners that become the same vertex share these keys
+        keys = cornerList.copy()
+        if smoothNormals:
+            keys[:, 2] = 0
+        else:
+            # corners with computed normals belong to their triangle
+            cornerTriangles = np.repeat(np.arange(len(triangleCorners)), 3)
+            keys[:, 2] = np.where(hasNormal, keys[:, 2], -1 - cornerTriangles)
+        if len(keys) == 0:
+            return OBJLoader._emptyData(filePositions, objects)
+        first, inverse = OBJLoader._findUnique(keys)
+
+        # vertices in order of first use
+        order = np.argsort(first)
+        vertexCorners = first[order]
+        newIndex = np.empty(len(order), dtype=np.uint32)
+        newIndex[order] = np.arange(len(order), dtype=np.uint32)
+        indices = newIndex[inverse]
+
+        vertexPositionNumbers = cornerList[vertexCorners, 0]
+        if smoothNormals:
+            # sum the corner normals at each position (equal positions listed more than once
+            #   in the file are combined too), then normalize
+            _unique, positionGroups = np.unique(filePositions, axis=0, return_inverse=True)
+            positionGroups = positionGroups.reshape(-1)
+            cornerGroups = positionGroups[cornerList[:, 0]]
+            groupCount = positionGroups.max() + 1
+            groupNormals = np.stack(
+                [
+                    np.bincount(cornerGroups, weights=cornerNormals[:, axis], minlength=groupCount)
+                    for axis in range(3)
+                ],
+                axis=1,
+            )
+            normals = OBJLoader._normalize(groupNormals)[positionGroups[vertexPositionNumbers]]
+        else:
+            normals = cornerNormals[vertexCorners]
+
+        uvs = None
+        if len(fileUVs) > 0:
+            uvNumbers = cornerList[vertexCorners, 1]
+            uvs = np.where((uvNumbers >= 0)[:, None], fileUVs[np.maximum(uvNumbers, 0)], 0.0)
+            uvs = uvs.astype(np.float32)
+
+        return {
+            "positions": filePositions[vertexPositionNumbers].astype(np.float32),
+            "normals": normals.astype(np.float32),
+            "uvs": uvs,
+            "indices": indices,
+            "filePositions": filePositions.astype(np.float32),
+            "objects": objects,
+        }
+
+    @staticmethod
+    def _parseCorners(cornerTokens):
+        # return an integer array of (position, uv, normal) numbers per corner, 0 if missing
+        if len(cornerTokens) == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        text = " ".join(cornerTokens)
+        slashCount = text.count("/")
+        if slashCount == 2 * len(cornerTokens):
+            # all corners are p/t/n or p//n
+            numbers = text.replace("//", "/0/").replace("/", " ").split()
+            return np.array(numbers, dtype=np.int64).reshape(-1, 3)
+        if slashCount == 0:
+            # all corners are p
+            numbers = np.array(cornerTokens, dtype=np.int64)
+            return np.stack([numbers, np.zeros_like(numbers), np.zeros_like(numbers)], axis=1)
+
+        # corners of different forms
+        numbers = []
+        for corner in cornerTokens:
+            position, _, rest = corner.partition("/")
+            uv, _, normal = rest.partition("/")
+            numbers.extend((position, uv or "0", normal or "0"))
+        return np.array(numbers, dtype=np.int64).reshape(-1, 3)
+
+    @staticmethod
+    def _findUnique(rows):
+        """
+        Return (first, inverse): the first row equal to each distinct row of rows (an integer
+        array with 3 columns, values from -1), and the number of the distinct row of each row
+        """
+        # rows are packed into single numbers when they fit, which sorts much faster
+        low = rows.min(axis=0)
+        sizes = rows.max(axis=0) - low + 1
+        if np.prod(sizes.astype(float)) < 2**62:
+            shifted = rows - low
+            keys = (shifted[:, 0] * sizes[1] + shifted[:, 1]) * sizes[2] + shifted[:, 2]
+            _unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        else:
+            _unique, first, inverse = np.unique(
+                rows, axis=0, return_index=True, return_inverse=True
+            )
+        return first, inverse.reshape(-1)
+
+    @staticmethod
+    def _normalize(vectors):
+        length = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(length > 0, length, 1)
+
+    @staticmethod
+    def _emptyData(filePositions, objects):
+        return {
+            "positions": np.zeros((0, 3), dtype=np.float32),
+            "normals": np.zeros((0, 3), dtype=np.float32),
+            "uvs": None,
+            "indices": np.zeros(0, dtype=np.uint32),
+            "filePositions": filePositions.astype(np.float32),
+            "objects": objects,
+        }
+
+
+# numbers per line of the coordinate keywords
+_COORDINATE_COUNTS = {"v": 3, "vt": 2, "vn": 3}
+
+
+class _OBJTokens:
+    """
+    Collects the numbers of an OBJ file as strings, for OBJLoader.parse. Lines of the same
+    kind usually follow each other; each such block is split at once, and only unusual
+    lines (relative indices, tabs, extra numbers) are handled one at a time.
+    """
+
+    def __init__(self):
+        # coordinates, three numbers per position and normal, two per uv
+        self.positionTokens = []
+        self.uvTokens = []
+        self.normalTokens = []
+        # corners of all faces (strings p, p/t, p//n or p/t/n), and the number of corners
+        #   of each face
+        self.cornerTokens = []
+        self.cornerCounts = []
+        # text after each o keyword
+        self.objects = []
+        # key=keyword, value=pattern finding the end of a block of lines with that keyword
+        self.blockEndPatterns = {}
+
+    def addText(self, text):
+        """Add whole lines of the file"""
+        position = 0
+        while position < len(text):
+            lineEnd = text.find("\n", position)
+            if lineEnd < 0:
+                lineEnd = len(text)
+            values = text[position:lineEnd].split(None, 1)
+            if len(values) == 0:
+                position = lineEnd + 1
+                continue
+            keyword = values[0]
+            if keyword not in ("v", "vt", "vn", "f") or not text.startswith(
+                keyword + " ", position
+            ):
+                self.addLine(text[position:lineEnd])
+                position = lineEnd + 1
+                continue
+
+            # the block ends before the first line not starting with the same keyword
+            pattern = self.blockEndPatterns.get(keyword)
+            if pattern is None:
+                pattern = self.blockEndPatterns[keyword] = re.compile(rf"\n(?!{keyword} )")
+            match = pattern.search(text, position)
+            blockEnd = match.start() if match is not None else len(text)
+            self.addBlock(keyword, text[position:blockEnd])
+            position = blockEnd + 1
+
+    def addBlock(self, keyword, block):
+        """Add lines of text that all start with keyword and a space"""
+        tokens = block.split()
+        lineCount = block.count("\n") + 1
+        if keyword == "f":
+            if "-" in block:
+                # relative numbers refer to the elements before each face
+                for line in block.split("\n"):
+                    self.addLine(line)
+            elif len(tokens) == 4 * lineCount:
+                # triangles only
+                del tokens[::4]
+                self.cornerTokens.extend(tokens)
+                self.cornerCounts.extend([3] * lineCount)
+            else:
+                for line in block.split("\n"):
+                    corners = line.split()[1:]
+                    self.cornerTokens.extend(corners)
+                    self.cornerCounts.append(len(corners))
+            return
+
+        count = _COORDINATE_COUNTS[keyword]
+        tokenList = {"v": self.positionTokens, "vt": self.uvTokens, "vn": self.normalTokens}[
+            keyword
+        ]
+        if len(tokens) == (count + 1) * lineCount:
+            # remove the keywords
+            del tokens[:: count + 1]
+            tokenList.extend(tokens)
+        else:
+            # some lines have more numbers (for example, a w coordinate)
+            for line in block.split("\n"):
+                tokenList.extend(line.split()[1 : count + 1])
+
+    def addLine(self, line):
+        """Add one line of any kind"""
+        values = line.split()
+        if len(values) == 0:
+            return
+        keyword = values[0]
+        if keyword == "v":
+            self.positionTokens.extend(values[1:4])
+        elif keyword == "vt":
+            self.uvTokens.extend(values[1:3])
+        elif keyword == "vn":
+            self.normalTokens.extend(values[1:4])
+        elif keyword == "f":
+            corners = values[1:]
+            if "-" in line:
+                corners = self.resolveRelative(corners)
+            self.cornerTokens.extend(corners)
+            self.cornerCounts.append(len(corners))
+        elif keyword == "o":
+            self.objects.append(line.strip()[1:].strip())
+
+    def resolveRelative(self, corners):
+        """Return corners with negative numbers replaced by 1-based numbers"""
+        elementCounts = (
+            len(self.positionTokens) // 3,
+            len(self.uvTokens) // 2,
+            len(self.normalTokens) // 3,
+        )
+        resolved = []
+        for corner in corners:
+            numbers = corner.split("/")
+            for index, number in enumerate(numbers):
+                if number.startswith("-"):
+                    numbers[index] = str(elementCounts[index] + 1 + int(number))
+            resolved.append("/".join(numbers))
+        return resolved
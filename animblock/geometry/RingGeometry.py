@@ -1,4 +1,6 @@
-from math import cos, radians, sin
+from math import pi
+
+import numpy as np
 
 from .Geometry import Geometry
 
@@ -7,41 +9,23 @@ class RingGeometry(Geometry):
     def __init__(self, innerRadius=0.25, outerRadius=1, segments=32):
         super().__init__()
 
-        vertexPositionData = []
-        vertexUVData = []
-        vertexNormalData = []
-
-        angle = radians(360) / segments
-        normal = [0, 0, 1]
-        for i in range(segments):
-            posA = [innerRadius * cos(i * angle), innerRadius * sin(i * angle), 0]
-            posB = [outerRadius * cos(i * angle), outerRadius * sin(i * angle), 0]
-            posC = [outerRadius * cos((i + 1) * angle), outerRadius * sin((i + 1) * angle), 0]
-            posD = [innerRadius * cos((i + 1) * angle), innerRadius * sin((i + 1) * angle), 0]
-            vertexPositionData.extend([posA, posB, posC, posA, posC, posD])
-
-            uvA = [
-                innerRadius * cos(i * angle) * 0.5 + 0.5,
-                innerRadius * sin(i * angle) * 0.5 + 0.5,
-            ]
-            uvB = [
-                outerRadius * cos(i * angle) * 0.5 + 0.5,
-                outerRadius * sin(i * angle) * 0.5 + 0.5,
-            ]
-            uvC = [
-                outerRadius * cos((i + 1) * angle) * 0.5 + 0.5,
-                outerRadius * sin((i + 1) * angle) * 0.5 + 0.5,
-            ]
-            uvD = [
-                innerRadius * cos((i + 1) * angle) * 0.5 + 0.5,
-                innerRadius * sin((i + 1) * angle) * 0.5 + 0.5,
-            ]
-            vertexUVData.extend([uvA, uvB, uvC, uvA, uvC, uvD])
-
-            vertexNormalData.extend([normal, normal, normal, normal, normal, normal])
+        # segments inner vertices followed by segments outer vertices;
+        #   segment i is the quad (inner i, outer i, outer i+1, inner i+1)
+        angles = np.arange(segments) * (2 * pi / segments)
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        rims = np.concatenate([innerRadius * directions, outerRadius * directions])
+
+        vertexPositionData = np.concatenate([rims, np.zeros((2 * segments, 1))], axis=1)
+        vertexUVData = rims * 0.5 + 0.5
+        vertexNormalData = np.tile([0, 0, 1], (2 * segments, 1))
 
         self.setAttribute("vec3", "vertexPosition", vertexPositionData)
         self.setAttribute("vec2", "vertexUV", vertexUVData)
         self.setAttribute("vec3", "vertexNormal", vertexNormalData)
-
         self.vertexCount = len(vertexPositionData)
+
+        a = np.arange(segments)
+        b = a + segments
+        c = (a + 1) % segments + segments
+        d = (a + 1) % segments
+        self.setIndices(np.stack([a, b, c, a, c, d], axis=1))
@@ -1,4 +1,6 @@
-from math import cos, pi, sin
+from math import pi
+
+import numpy as np
 
 from .SurfaceGeometry import SurfaceGeometry
 
@@ -12,5 +14,9 @@ class SphereGeometry(SurfaceGeometry):
             -pi / 2,
             pi / 2,
             yResolution,
-            lambda u, v: [radius * sin(u) * cos(v), radius * sin(v), radius * cos(u) * cos(v)],
+            lambda u, v: [
+                radius * np.sin(u) * np.cos(v),
+                radius * np.sin(v),
+                radius * np.cos(u) * np.cos(v),
+            ],
         )
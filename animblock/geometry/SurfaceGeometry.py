@@ -1,65 +1,55 @@
-from ..mathutils import Surface
+import numpy as np
+
+from ..mathutils import ArrayUtils, Surface
 from .Geometry import Geometry
 
 
+# surfaceFunction(u, v) returns a point [x, y, z]; if it uses numpy functions (np.sin rather
+#   than math.sin), all grid points are computed at once. uDerivative and vDerivative are
+#   optional functions returning the partial derivatives, for exact normals (see Surface)
 class SurfaceGeometry(Geometry):
-    def __init__(self, uStart, uEnd, uResolution, vStart, vEnd, vResolution, surfaceFunction):
+    def __init__(
+        self,
+        uStart,
+        uEnd,
+        uResolution,
+        vStart,
+        vEnd,
+        vResolution,
+        surfaceFunction,
+        uDerivative=None,
+        vDerivative=None,
+    ):
         super().__init__()
 
-        surface = Surface(surfaceFunction)
+        surface = Surface(surfaceFunction, uDerivative, vDerivative)
 
-        positions = surface.getPoints(uStart, uEnd, uResolution, vStart, vEnd, vResolution)
+        u, v = Surface.getGrid(uStart, uEnd, uResolution, vStart, vEnd, vResolution)
+        positions = ArrayUtils.evaluate(surface.f, u, v)
         uvs = surface.getUVs(uResolution, vResolution)
-        normals = surface.getNormals(uStart, uEnd, uResolution, vStart, vEnd, vResolution)
-
-        vertexPositionData = []
-        vertexUVData = []
-        vertexNormalData = []
-
-        # group vertex data into triangles
-        # note: .copy() is necessary to avoid storing references
-        for xIndex in range(uResolution):
-            for yIndex in range(vResolution):
-                # position coordinates
-                pA = positions[xIndex + 0][yIndex + 0]
-                pB = positions[xIndex + 1][yIndex + 0]
-                pD = positions[xIndex + 0][yIndex + 1]
-                pC = positions[xIndex + 1][yIndex + 1]
-
-                vertexPositionData += [
-                    pA.copy(),
-                    pB.copy(),
-                    pC.copy(),
-                    pA.copy(),
-                    pC.copy(),
-                    pD.copy(),
-                ]
-
-                # uv coordinates
-                uvA = uvs[xIndex + 0][yIndex + 0]
-                uvB = uvs[xIndex + 1][yIndex + 0]
-                uvD = uvs[xIndex + 0][yIndex + 1]
-                uvC = uvs[xIndex + 1][yIndex + 1]
-
-                vertexUVData += [uvA, uvB, uvC, uvA, uvC, uvD]
-
-                # normal coordinates
-                nA = normals[xIndex + 0][yIndex + 0]
-                nB = normals[xIndex + 1][yIndex + 0]
-                nD = normals[xIndex + 0][yIndex + 1]
-                nC = normals[xIndex + 1][yIndex + 1]
-
-                vertexNormalData += [
-                    nA.copy(),
-                    nB.copy(),
-                    nC.copy(),
-                    nA.copy(),
-                    nC.copy(),
-                    nD.copy(),
-                ]
-
-        self.setAttribute("vec3", "vertexPosition", vertexPositionData)
-        self.setAttribute("vec2", "vertexUV", vertexUVData)
-        self.setAttribute("vec3", "vertexNormal", vertexNormalData)
-
-        self.vertexCount = len(vertexPositionData)
+        normals = surface.getNormalArray(u, v, positions)
+
+        # one vertex per grid point, (uResolution+1) x (vResolution+1) in row-major order;
+        #   cells share the vertices at their corners
+        self.setAttribute("vec3", "vertexPosition", np.reshape(positions, (-1, 3)))
+        self.setAttribute("vec2", "vertexUV", np.reshape(uvs, (-1, 2)))
+        self.setAttribute("vec3", "vertexNormal", np.reshape(normals, (-1, 3)))
+        self.vertexCount = (uResolution + 1) * (vResolution + 1)
+
+        self.setIndices(SurfaceGeometry.getGridIndices(uResolution, vResolution))
+
+    @staticmethod
+    def getGridIndices(uResolution, vResolution):
+        """
+        Return the indices of two triangles per cell of a grid of (uResolution+1) x
+        (vResolution+1) vertices in row-major order; cell corners A=(u,v), B=(u+1,v),
+        C=(u+1,v+1), D=(u,v+1) give triangles ABC and ACD
+        """
+        grid = np.arange((uResolution + 1) * (vResolution + 1), dtype=np.uint32).reshape(
+            uResolution + 1, vResolution + 1
+        )
+        a = grid[:-1, :-1]
+        b = grid[1:, :-1]
+        c = grid[1:, 1:]
+        d = grid[:-1, 1:]
+        return np.stack([a, b, c, a, c, d], axis=-1).reshape(-1)
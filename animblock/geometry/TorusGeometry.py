@@ -1,4 +1,6 @@
-from math import cos, pi, sin
+from math import pi
+
+import numpy as np
 
 from .SurfaceGeometry import SurfaceGeometry
 
@@ -15,8 +17,8 @@ class TorusGeometry(SurfaceGeometry):
             2 * pi,
             radialSegments,
             lambda u, v: [
-                ((centralRadius + tubeRadius * cos(v)) * cos(u) * scale),
-                ((centralRadius + tubeRadius * cos(v)) * sin(u) * scale),
-                (tubeRadius * sin(v) * scale),
+                ((centralRadius + tubeRadius * np.cos(v)) * np.cos(u) * scale),
+                ((centralRadius + tubeRadius * np.cos(v)) * np.sin(u) * scale),
+                (tubeRadius * np.sin(v) * scale),
             ],
         )
@@ -8,6 +8,7 @@ from .IcosahedronGeometry import *
 from .LineGeometry import *
 from .OBJExtruder import *
 from .OBJGeometry import *
+from .OBJLoader import *
 from .OctahedronGeometry import *
 from .PointGeometry import *
 from .PolygonGeometry import *
@@ -10,28 +10,10 @@ class BoxHelper(Mesh):
         if "vertexPosition" not in baseMesh.geometry.attributeData.keys():
             raise Exception("No vertexPosition attribute present in base mesh.")
 
-        xMin = +999999
-        yMin = +999999
-        zMin = +999999
-        xMax = -999999
-        yMax = -999999
-        zMax = -999999
-
-        vertexPositionData = baseMesh.geometry.attributeData["vertexPosition"]["value"]
-        for position in vertexPositionData:
-            x, y, z = position
-            if x > xMax:
-                xMax = x
-            if y > yMax:
-                yMax = y
-            if z > zMax:
-                zMax = z
-            if x < xMin:
-                xMin = x
-            if y < yMin:
-                yMin = y
-            if z < zMin:
-                zMin = z
+        # corners of the cached bounding box of the geometry
+        boxMin, boxMax = baseMesh.geometry.getBoundingBox()
+        xMin, yMin, zMin = boxMin.tolist()
+        xMax, yMax, zMax = boxMax.tolist()
 
         # add 12 pairs of points (line segments for cube)
         points = []
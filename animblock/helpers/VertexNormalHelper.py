@@ -12,18 +12,12 @@ class VertexNormalHelper(Mesh):
         if "vertexNormal" not in baseMesh.geometry.attributeData.keys():
             raise Exception("No vertexNormal attribute present in base mesh.")
 
-        points = []
-        count = len(baseMesh.geometry.attributeData["vertexPosition"]["value"])
-
-        for index in range(count):
-            startPoint = baseMesh.geometry.attributeData["vertexPosition"]["value"][index]
-            points.append(startPoint)
-
-            normal = baseMesh.geometry.attributeData["vertexNormal"]["value"][index]
-            c = np.linalg.norm(np.array(normal))
-            endPoint = np.array(startPoint) + np.array(normal) * lineLength / c
-            endPoint = list(endPoint)  # convert back to list structure
-            points.append(endPoint)
+        # one segment per vertex, from the vertex along its normal
+        positions = baseMesh.geometry.getAttributeArray("vertexPosition")
+        normals = baseMesh.geometry.getAttributeArray("vertexNormal")
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        endPoints = positions + normals * lineLength / lengths
+        points = np.stack([positions, endPoints], axis=1).reshape(-1, 3)
 
         geo = LineGeometry(points)
 
@@ -1,9 +1,11 @@
 from math import acos
 
+import moderngl
 import numpy as np
 
 from ..cameras import ShadowCamera
-from ..core import RenderTarget, Uniform
+from ..core import Uniform
+from ..core.RenderTarget import RenderTarget
 from ..material import ShadowMaterial
 from ..mathutils import MatrixFactory
 from .Light import Light
@@ -62,6 +64,8 @@ class DirectionalLight(Light):
         self.shadowCamera = ShadowCamera(left=-2, right=2, top=2, bottom=-2, near=10, far=0)
 
         self.shadowMaterial = ShadowMaterial()
+        # created when the first InstancedMesh casts a shadow
+        self.instancedShadowMaterial = None
 
         # TODO: connect shadowCamera transform directly to this directional light's transform
         #   so that moving the light automatically moves the shadowCamera and shadowLightDirection also
@@ -81,9 +85,30 @@ class DirectionalLight(Light):
             Uniform("vec3", "shadowLightDirection", self.getDirection())
         )
 
-        self.shadowRenderTarget = RenderTarget.RenderTarget(size[0], size[1])
-        self.shadowCamera.uniformList.addUniform(
-            Uniform("sampler2D", "shadowMap", self.shadowRenderTarget.textureID)
-        )
+        # casters only write depth; the depth texture is read as an ordinary sampler2D
+        self.shadowRenderTarget = RenderTarget(size[0], size[1], attachments=[])
+        shadowMap = self.shadowRenderTarget.depthTexture
+        shadowMap.compare_func = ""
+        shadowMap.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        self.shadowCamera.uniformList.addUniform(Uniform("sampler2D", "shadowMap", shadowMap))
         # texture slot 0 reserved for shadow map texture
         self.shadowCamera.uniformList.data["shadowMap"].textureNumber = 0
+
+        # state of the shadow camera and casters when the shadow map was last rendered;
+        #   the Renderer only renders the shadow map again when it changes
+        self.shadowMapState = None
+
+    def invalidateShadowMap(self):
+        """
+        Render the shadow map again on the next render call; only needed after changes
+        the Renderer cannot detect, such as editing geometry buffers directly
+        """
+        self.shadowMapState = None
+
+    def getShadowMaterial(self, instanced=False):
+        """Return the material used to render shadow casters into the shadow map"""
+        if not instanced:
+            return self.shadowMaterial
+        if self.instancedShadowMaterial is None:
+            self.instancedShadowMaterial = ShadowMaterial(useInstancing=True)
+        return self.instancedShadowMaterial
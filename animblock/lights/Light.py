@@ -42,6 +42,12 @@ class Light(Object3D):
             Uniform("vec3", self.name + ".direction", [0, 0, 0]), indexName="direction"
         )
 
+        # point light range (0 means unlimited); lights with a range can be
+        #   skipped for distant surfaces (see LightClusters)
+        self.uniformList.addUniform(
+            Uniform("float", self.name + ".distance", 0), indexName="distance"
+        )
+
         # store light position in matrix to simplify light movement (PointLight)
         # and to adjust position of helper meshes (DirectionalLightHelper, PointLightHelper)
         # also used in shadow calculations for directional light
@@ -2,8 +2,9 @@ from .Light import Light
 
 
 class PointLight(Light):
-    # TODO: add attenuation coefficients (constant, linear, quadratic)
-    def __init__(self, position=None, color=None, strength=1):
+    # distance: light fades out smoothly, reaching zero at this distance;
+    #   0 means the light reaches everything, unattenuated
+    def __init__(self, position=None, color=None, strength=1, distance=0):
         if color is None:
             color = [1, 1, 1]
         if position is None:
@@ -11,3 +12,4 @@ class PointLight(Light):
         super().__init__(position=position, color=color, strength=strength)
 
         self.uniformList.setUniformValue("isPoint", 1)
+        self.uniformList.setUniformValue("distance", distance)
@@ -1,13 +1,20 @@
 from ..core import *
+from ..core.UniformBlock import UniformBlock
 from .Material import Material
 
 
 class LineBasicMaterial(Material):
-    def __init__(self, color=None, alpha=1, lineWidth=4, useVertexColors=False):
+    def __init__(
+        self, color=None, alpha=1, lineWidth=4, useVertexColors=False, useInstancing=False
+    ):
         # vertex shader code
         if color is None:
             color = [1, 1, 1]
-        vsCode = """
+        # camera and fog data are read from uniform blocks shared by all materials
+        vsCode = (
+            UniformBlock.cameraCode
+            + UniformBlock.fogCode
+            + """
         in vec3 vertexPosition;
 
         in vec3 vertexColor;
@@ -16,18 +23,29 @@ class LineBasicMaterial(Material):
         in float vertexArcLength;
         out float arcLength;
 
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
 
-        uniform bool useFog;
+        #ifdef USE_INSTANCING
+        // per-instance transform and color (see InstancedMesh)
+        in mat4 instanceMatrix;
+        in vec3 instanceColor;
+        uniform bool useInstanceColors;
+        out vec3 vInstanceColor;
+        #endif
+
         out float cameraDistance;
 
         void main()
         {
+            mat4 model = modelMatrix;
+            #ifdef USE_INSTANCING
+            model = modelMatrix * instanceMatrix;
+            vInstanceColor = useInstanceColors ? instanceColor : vec3(1.0);
+            #endif
+
             arcLength = vertexArcLength;
             vColor = vertexColor;
-            gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1.0);
+            gl_Position = projectionMatrix * viewMatrix * model * vec4(vertexPosition, 1.0);
 
             if (useFog)
             {
@@ -35,9 +53,12 @@ class LineBasicMaterial(Material):
             }
         }
         """
+        )
 
         # fragment shader code
-        fsCode = """
+        fsCode = (
+            UniformBlock.fogCode
+            + """
 
         uniform vec3 color;
         uniform float alpha;
@@ -45,16 +66,16 @@ class LineBasicMaterial(Material):
         uniform bool useVertexColors;
         in vec3 vColor;
 
+        #ifdef USE_INSTANCING
+        in vec3 vInstanceColor;
+        #endif
+
         uniform bool useDashes;
         uniform float dashLength;
         uniform float gapLength;
         in float arcLength;
 
-        // parameters for fog calculations
-        uniform bool useFog;
-        uniform vec3 fogColor;
-        uniform float fogStartDistance;
-        uniform float fogEndDistance;
+        // distance used in fog calculations
         in float cameraDistance;
 
         void main()
@@ -71,6 +92,10 @@ class LineBasicMaterial(Material):
             if ( useVertexColors )
                 baseColor *= vec4( vColor, 1.0 );
 
+            #ifdef USE_INSTANCING
+            baseColor *= vec4(vInstanceColor, 1.0);
+            #endif
+
             if ( useFog )
             {
                 float fogFactor = clamp( (fogEndDistance - cameraDistance)/(fogEndDistance - fogStartDistance), 0.0, 1.0 );
@@ -80,9 +105,12 @@ class LineBasicMaterial(Material):
             gl_FragColor = baseColor;
         }
         """
+        )
 
-        # initialize shaders
-        super().__init__(vsCode, fsCode)
+        # initialize shaders;
+        #   the instanced variant reads per-instance data (see InstancedMesh)
+        defines = ["USE_INSTANCING"] if useInstancing else None
+        super().__init__(vsCode, fsCode, defines=defines)
 
         # set render values
         self.drawStyle = GL_LINE_STRIP
@@ -11,3 +11,6 @@ class LineSegmentMaterial(LineBasicMaterial):
         )
 
         self.drawStyle = GL_LINES
+        # separate segments can be merged, unlike the strips of LineBasicMaterial;
+        #   vertices are only transformed by modelMatrix
+        self.allowStaticBatching = True
@@ -1,16 +1,46 @@
 import moderngl
 
 from ..core.OpenGLUtils import OpenGLUtils
-from ..core.Uniform import Uniform
+from ..core.Uniform import Uniform, UniformList
+from ..core.UniformBlock import UniformBlock
 
 
 class Material:
-    def __init__(self, vertexShaderCode, fragmentShaderCode, uniforms=None, name="Material"):
-        self.program = OpenGLUtils.initializeShaderFromCode(vertexShaderCode, fragmentShaderCode)
+    def __init__(
+        self,
+        vertexShaderCode,
+        fragmentShaderCode,
+        uniforms=None,
+        name="Material",
+        defines=None,
+        sceneDefineNames=(),
+    ):
+        # kept for compiling program variants
+        self.vertexShaderCode = vertexShaderCode
+        self.fragmentShaderCode = fragmentShaderCode
+
+        # preprocessor symbols enabling optional shader code (for example, USE_INSTANCING)
+        self.materialDefines = (
+            dict(defines) if isinstance(defines, dict) else dict.fromkeys(defines or ())
+        )
+        # symbols describing renderer settings (light count, fog, shadows) used by the shaders;
+        #   their values are supplied by the Renderer, see updateSceneDefines
+        self.sceneDefineNames = tuple(sceneDefineNames)
+        self.sceneDefines = {}
+        # dictionary last passed to updateSceneDefines
+        self.sceneDefinesSource = None
+
+        # all defines of the current variant
+        self.defines = {**self.materialDefines}
+
+        # materials with identical shader code and defines share one program (see ProgramCache);
+        #   compiled on first use, normally after the Renderer has supplied the scene defines,
+        #   so that each material compiles only the variant it is drawn with
+        self._program = None
         self.name = name
 
-        # Store uniform objects for compatibility with existing code
-        self.uniformList = {}
+        # Uniform objects by name; supports dictionary-style access
+        self.uniformList = UniformList()
 
         if uniforms is not None:
             for uniform in uniforms:
@@ -31,64 +61,147 @@ class Material:
         self.renderFront = True
         self.renderBack = True
 
+        # blending: additive takes precedence over premultiplied alpha;
+        #   when neither is set, standard alpha blending is used
         self.additiveBlending = False
+        self.premultipliedAlpha = False
+
+        # set depthWrite to False for transparent surfaces that should not hide others
+        self.depthTest = True
+        self.depthWrite = True
+
         self.linearFiltering = True
 
+        # transparent materials are drawn after opaque ones, farthest first;
+        #   None decides from the blending flags, depthWrite and the alpha uniform
+        self.transparent = None
+
+        # True if the vertex shader only transforms vertexPosition (and vertexNormal)
+        #   by modelMatrix, so meshes can be drawn with world space vertex data
+        #   (see StaticBatch)
+        self.allowStaticBatching = False
+
+        # True if the shaders can write a G-buffer when compiled with USE_GBUFFER,
+        #   so that opaque meshes can be lit by the deferred path (see DeferredShading)
+        self.allowDeferredShading = False
+
     @property
     def shaderProgramID(self):
         """Compatibility property - return the ModernGL program object"""
         return self.program
 
+    @property
+    def program(self):
+        if self._program is None:
+            self._compileProgram()
+        return self._program
+
+    def _updateProgram(self):
+        """Switch to the program variant for the current defines (once one has been used)"""
+        self.defines = {**self.materialDefines, **self.sceneDefines}
+        if self._program is not None:
+            self._compileProgram()
+
+    def _compileProgram(self):
+        program = OpenGLUtils.getProgram(
+            self.vertexShaderCode, self.fragmentShaderCode, self.defines
+        )
+        # shared camera/fog/light data is read from uniform blocks written by the Renderer
+        UniformBlock.bindProgram(program)
+        self._releaseProgram()
+        self._program = program
+        # the reference is given up when this material is released or garbage collected
+        OpenGLUtils.resourceManager.own(self, program, OpenGLUtils.programCache.release)
+
+    def setDefine(self, name, value=None):
+        """Add or change a preprocessor symbol; the matching program variant is used from now on"""
+        if name in self.materialDefines and self.materialDefines[name] == value:
+            return
+        self.materialDefines[name] = value
+        self._updateProgram()
+
+    def removeDefine(self, name):
+        """Remove a preprocessor symbol; the matching program variant is used from now on"""
+        if name not in self.materialDefines:
+            return
+        del self.materialDefines[name]
+        self._updateProgram()
+
+    def updateSceneDefines(self, sceneDefines):
+        """
+        Select the program variant for the renderer settings in sceneDefines
+        (name: value; disabled settings are missing); called by the Renderer before drawing.
+        Only the names listed in sceneDefineNames are used.
+        """
+        # the Renderer passes the same dictionary until its settings change
+        if sceneDefines is self.sceneDefinesSource:
+            return
+        self.sceneDefinesSource = sceneDefines
+
+        defines = {
+            name: sceneDefines[name] for name in self.sceneDefineNames if name in sceneDefines
+        }
+        if defines != self.sceneDefines:
+            self.sceneDefines = defines
+            self._updateProgram()
+
     def setUniform(self, type, name, value):
         """Set uniform value - compatible with existing interface"""
-        self.uniformList[name] = Uniform(type, name, value)
+        previous = self.uniformList[name] if name in self.uniformList else None
+        previousTexture = (
+            previous.value if previous is not None and previous.type == "sampler2D" else None
+        )
+        # reuse the existing uniform so that its program bindings stay valid
+        if previous is not None and previous.type == type:
+            self.uniformList.setUniformValue(name, value)
+        else:
+            self.uniformList.addUniform(Uniform(type, name, value))
+
+        if type == "sampler2D" or previousTexture is not None:
+            self._updateTextureReferences(value if type == "sampler2D" else None, previousTexture)
+
+    def _updateTextureReferences(self, texture, previous):
+        # textures without an owner (for example, from OpenGLUtils.initializeTexture) are
+        #   released with the last material sampling them (see ResourceManager.addReference)
+        resourceManager = OpenGLUtils.resourceManager
+        if texture is not None:
+            resourceManager.addReference(self, texture)
+        if previous is not None and previous is not texture:
+            for uniform in self.uniformList.values():
+                if uniform.type == "sampler2D" and uniform.value is previous:
+                    return
+            resourceManager.removeReference(self, previous)
+
+    def isTransparent(self):
+        if self.transparent is not None:
+            return self.transparent
+        if self.additiveBlending or self.premultipliedAlpha or not self.depthWrite:
+            return True
+        return "alpha" in self.uniformList and self.uniformList["alpha"].value < 1
 
     def updateRenderSettings(self):
-        """Update ModernGL render settings"""
-        ctx = OpenGLUtils.ctx
-
+        """Update ModernGL render settings (unchanged settings are skipped)"""
         # Point size (ModernGL doesn't have direct equivalent, handled in shader)
         # Line width (ModernGL doesn't have direct equivalent, handled in shader)
 
-        # Face culling
-        if self.renderFront and self.renderBack:
-            ctx.disable(moderngl.CULL_FACE)
-        else:
-            ctx.enable(moderngl.CULL_FACE)
-            # Note: ModernGL face culling is different from PyOpenGL
-            # We'll keep it simple for now
+        # Face culling, blending mode and depth settings
+        OpenGLUtils.renderState.applyMaterial(self)
+
+    def _releaseProgram(self):
+        if self._program is not None:
+            OpenGLUtils.resourceManager.disown(self, self._program)
+            OpenGLUtils.programCache.release(self._program)
+            self._program = None
 
-        # Blending mode - ModernGL handles this differently
-        # Blending is already enabled in the context, specific blend modes
-        # would need to be set per-render call if needed
-        pass
+    def release(self):
+        """
+        Give up this material's references to its shared program and textures, and release
+        the objects it owns (for example, textures loaded with owner=material; see
+        ResourceManager)
+        """
+        self._releaseProgram()
+        OpenGLUtils.resourceManager.releaseOwner(self)
 
     def updateUniforms(self):
-        """Update all uniforms in the program"""
-        textureUnit = 1  # Start at 1, unit 0 reserved for shadow maps
-
-        for uniform_name, uniform_obj in self.uniformList.items():
-            if uniform_name not in self.program:
-                continue
-
-            try:
-                if uniform_obj.type == "sampler2D":
-                    # Handle texture uniforms
-                    if uniform_obj.value and hasattr(uniform_obj.value, "use"):
-                        # This is a ModernGL texture
-                        uniform_obj.value.use(location=textureUnit)
-                        self.program[uniform_name].value = textureUnit
-                        textureUnit += 1
-                    elif isinstance(uniform_obj.value, int) and uniform_obj.value > 0:
-                        # Legacy texture ID handling
-                        self.program[uniform_name].value = (
-                            uniform_obj.textureNumber
-                            if hasattr(uniform_obj, "textureNumber")
-                            else 0
-                        )
-                else:
-                    # Handle other uniform types
-                    self.program[uniform_name].value = uniform_obj.value
-            except Exception:
-                # Silently skip uniforms that don't exist in this program
-                pass
+        """Update all uniforms in the program (unchanged values are skipped)"""
+        self.uniformList.update(self.program)
@@ -1,4 +1,5 @@
 from ..core import *
+from ..core.UniformBlock import UniformBlock
 from .Material import Material
 
 
@@ -12,11 +13,15 @@ class PointBasicMaterial(Material):
         usePerspective=True,
         useVertexColors=False,
         alphaTest=0.75,
+        useInstancing=False,
     ):
         # vertex shader code
         if color is None:
             color = [1, 1, 1]
-        vsCode = """
+        # camera data is read from the uniform block shared by all materials
+        vsCode = (
+            UniformBlock.cameraCode
+            + """
         in vec3 vertexPosition;
 
         in vec3 vertexColor;
@@ -26,14 +31,26 @@ class PointBasicMaterial(Material):
         uniform bool usePerspective;
         uniform float size;
 
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
 
+        #ifdef USE_INSTANCING
+        // per-instance transform and color (see InstancedMesh)
+        in mat4 instanceMatrix;
+        in vec3 instanceColor;
+        uniform bool useInstanceColors;
+        out vec3 vInstanceColor;
+        #endif
+
         void main()
         {
+            mat4 model = modelMatrix;
+            #ifdef USE_INSTANCING
+            model = modelMatrix * instanceMatrix;
+            vInstanceColor = useInstanceColors ? instanceColor : vec3(1.0);
+            #endif
+
             vColor = vertexColor;
-            vec4 eyePosition = viewMatrix * modelMatrix * vec4(vertexPosition, 1.0);
+            vec4 eyePosition = viewMatrix * model * vec4(vertexPosition, 1.0);
 
             if ( usePerspective )
                 gl_PointSize = 500 * size / length(eyePosition);
@@ -43,6 +60,7 @@ class PointBasicMaterial(Material):
             gl_Position = projectionMatrix * eyePosition;
         }
         """
+        )
 
         # fragment shader code
         fsCode = """
@@ -52,6 +70,10 @@ class PointBasicMaterial(Material):
         uniform bool useVertexColors;
         in vec3 vColor;
 
+        #ifdef USE_INSTANCING
+        in vec3 vInstanceColor;
+        #endif
+
         uniform bool useTexture;
         uniform sampler2D image;
         uniform float alphaTest;
@@ -62,6 +84,10 @@ class PointBasicMaterial(Material):
             if ( useVertexColors )
                 baseColor *= vec4(vColor, 1.0);
 
+            #ifdef USE_INSTANCING
+            baseColor *= vec4(vInstanceColor, 1.0);
+            #endif
+
             if ( useTexture )
                 baseColor *= texture(image, gl_PointCoord);
 
@@ -72,8 +98,12 @@ class PointBasicMaterial(Material):
         }
         """
 
-        # initialize shaders
-        super().__init__(vsCode, fsCode)
+        # initialize shaders;
+        #   the instanced variant reads per-instance data (see InstancedMesh)
+        defines = ["USE_INSTANCING"] if useInstancing else None
+        super().__init__(vsCode, fsCode, defines=defines)
+        # vertices are only transformed by modelMatrix
+        self.allowStaticBatching = True
 
         # set render values
         self.drawStyle = GL_POINTS
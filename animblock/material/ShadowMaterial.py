@@ -2,25 +2,32 @@ from .Material import Material
 
 
 class ShadowMaterial(Material):
-    def __init__(self):
+    def __init__(self, useInstancing=False):
         # vertex shader code
         vsCode = """
         in vec3 vertexPosition;
         uniform mat4 shadowProjectionMatrix;
         uniform mat4 shadowViewMatrix;
         uniform mat4 modelMatrix;
+        #ifdef USE_INSTANCING
+        in mat4 instanceMatrix;
+        #endif
         void main()
         {
-            gl_Position = shadowProjectionMatrix * shadowViewMatrix * modelMatrix * vec4(vertexPosition, 1);
+            mat4 model = modelMatrix;
+            #ifdef USE_INSTANCING
+            model = modelMatrix * instanceMatrix;
+            #endif
+            gl_Position = shadowProjectionMatrix * shadowViewMatrix * model * vec4(vertexPosition, 1);
         }
         """
-        # fragment shader code
+        # fragment shader code; only depth is written, to a depth-only render target
         fsCode = """
         void main()
         {
-            gl_FragColor = vec4(gl_FragCoord.z, gl_FragCoord.z, gl_FragCoord.z, 1);
         }
         """
 
-        # initialize shaders
-        super().__init__(vsCode, fsCode)
+        # initialize shaders; the instanced variant is used for InstancedMesh casters
+        defines = ["USE_INSTANCING"] if useInstancing else None
+        super().__init__(vsCode, fsCode, defines=defines)
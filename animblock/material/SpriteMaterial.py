@@ -1,5 +1,6 @@
 from OpenGL.GL import *
 
+from ..core.UniformBlock import UniformBlock
 from .Material import Material
 
 
@@ -12,15 +13,16 @@ class SpriteMaterial(Material):
             anchor = [0.5, 0.5]
         if size is None:
             size = [1, 1]
-        vsCode = """
+        # camera data is read from the uniform block shared by all materials
+        vsCode = (
+            UniformBlock.cameraCode
+            + """
         in vec2 vertexData;
         out vec2 UV;
 
         uniform vec2 anchor;
         uniform vec2 size;
 
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
 
         void main()
@@ -40,6 +42,7 @@ class SpriteMaterial(Material):
             gl_Position = projectionMatrix * billboardMatrix * vec4( position, 1 );
         }
         """
+        )
 
         # fragment shader code
         fsCode = """
@@ -1,9 +1,22 @@
+from types import MappingProxyType
+
 import moderngl
 
+from ..core.LightClusters import LightClusters
+from ..core.UniformBlock import UniformBlock
 from .Material import Material
 
 
 class SurfaceBasicMaterial(Material):
+    # boolean uniforms that select program variants, and their preprocessor symbols
+    featureDefines = MappingProxyType(
+        {
+            "useVertexColors": "USE_VERTEX_COLORS",
+            "useTexture": "USE_TEXTURE",
+            "useLight": "USE_LIGHT",
+        }
+    )
+
     def __init__(
         self,
         color=None,
@@ -13,12 +26,17 @@ class SurfaceBasicMaterial(Material):
         lineWidth=1,
         useVertexColors=False,
         alphaTest=0,
+        useInstancing=False,
+        useLight=False,
     ):
         if color is None:
             color = [1, 1, 1]
 
-        # Fixed vertex shader - compatible with GLSL 330 core
-        vsCode = """#version 330 core
+        # camera and fog data are read from uniform blocks shared by all materials
+        vsCode = (
+            UniformBlock.cameraCode
+            + UniformBlock.fogCode
+            + """
         in vec3 vertexPosition;
         in vec2 vertexUV;
         in vec3 vertexNormal;
@@ -29,13 +47,19 @@ class SurfaceBasicMaterial(Material):
         out vec3 normal;
         out vec3 vColor;
 
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
         uniform mat4 modelMatrix;
 
-        uniform bool useFog;
+        #ifdef USE_INSTANCING
+        // per-instance transform and color (see InstancedMesh)
+        in mat4 instanceMatrix;
+        in vec3 instanceColor;
+        uniform bool useInstanceColors;
+        out vec3 vInstanceColor;
+        #endif
+
         out float cameraDistance;
 
+        #ifdef USE_SHADOWS
         uniform bool receiveShadow;
 
         // assume that at most one light casts shadows
@@ -43,34 +67,49 @@ class SurfaceBasicMaterial(Material):
         uniform mat4 shadowProjectionMatrix;
         uniform mat4 shadowViewMatrix;
         out vec4 positionFromShadowLight;
+        #endif
 
         void main()
         {
+            mat4 model = modelMatrix;
+            #ifdef USE_INSTANCING
+            model = modelMatrix * instanceMatrix;
+            vInstanceColor = useInstanceColors ? instanceColor : vec3(1.0);
+            #endif
+
             // out values being sent to fragment shader
-            position = vec3( modelMatrix * vec4(vertexPosition, 1) );
+            position = vec3( model * vec4(vertexPosition, 1) );
             UV = vertexUV;
-            normal = normalize(mat3(modelMatrix) * vertexNormal); // normalize in case of model scaling
+            normal = normalize(mat3(model) * vertexNormal); // normalize in case of model scaling
             vColor = vertexColor;
 
+            #ifdef USE_SHADOWS
             if (receiveShadow)
             {
                 // multiply by modelMatrix works for directly overhead light
-                positionFromShadowLight = shadowProjectionMatrix * shadowViewMatrix * modelMatrix * vec4(vertexPosition, 1);
+                positionFromShadowLight = shadowProjectionMatrix * shadowViewMatrix * model * vec4(vertexPosition, 1);
             }
+            #endif
 
-            gl_Position = projectionMatrix * viewMatrix * modelMatrix * vec4(vertexPosition, 1);
+            gl_Position = projectionMatrix * viewMatrix * model * vec4(vertexPosition, 1);
 
+            #ifdef USE_FOG
             if (useFog)
             {
                 cameraDistance = gl_Position.w;
             }
+            #endif
         }
         """
-
-        # Fixed fragment shader - compatible with GLSL 330 core
-        fsCode = """#version 330 core
-        out vec4 fragColor;
-
+        )
+
+        # fog and light data are read from uniform blocks shared by all materials;
+        #   many lights are read from the textures of LightClusters instead
+        fsCode = (
+            UniformBlock.cameraCode
+            + UniformBlock.fogCode
+            + UniformBlock.lightsCode
+            + """
         uniform vec3 color;
         uniform float alpha;
 
@@ -78,38 +117,19 @@ class SurfaceBasicMaterial(Material):
         in vec2 UV;
         in vec3 normal;
 
-        uniform bool useVertexColors;
         in vec3 vColor;
 
-        uniform bool useTexture;
+        #ifdef USE_INSTANCING
+        in vec3 vInstanceColor;
+        #endif
+
+        #ifdef USE_TEXTURE
         uniform sampler2D image;
+        #endif
 
         uniform float alphaTest;
 
-        uniform bool useLight;
-
-        struct Light
-        {
-            bool isAmbient;
-            bool isDirectional;
-            bool isPoint;
-
-            // used by all lights
-            float strength;
-            vec3 color;
-
-            // used by point light
-            vec3 position;
-
-            // used by directional light
-            vec3 direction;
-        };
-
-        uniform Light light0;
-        uniform Light light1;
-        uniform Light light2;
-        uniform Light light3;
-
+        #ifdef USE_LIGHT
         vec3 lightCalculation(Light light, vec3 fragPosition, vec3 fragNormal)
         {
             if ( light.isAmbient )
@@ -128,7 +148,7 @@ class SurfaceBasicMaterial(Material):
                 float lightDistance = length(light.position - fragPosition);
                 vec3 unitNormal = normalize(fragNormal);
                 float cosAngle = max( dot(unitNormal, lightDirection), 0.0 );
-                float attenuation = 1.0;
+                float attenuation = getAttenuation(lightDistance, light.distance);
                 return light.color * light.strength * cosAngle * attenuation;
             }
             else // occurs if no data set for this light; bool values default to 0
@@ -136,14 +156,17 @@ class SurfaceBasicMaterial(Material):
                 return vec3(0,0,0);
             }
         }
+        #endif
+        """
+            + "#ifdef USE_CLUSTERED_LIGHTS\n"
+            + LightClusters.shaderCode
+            + "#endif\n"
+            + """
 
-        // parameters for fog calculations
-        uniform bool useFog;
-        uniform vec3 fogColor;
-        uniform float fogStartDistance;
-        uniform float fogEndDistance;
+        // distance used in fog calculations
         in float cameraDistance;
 
+        #ifdef USE_SHADOWS
         // assume that at most one light casts shadows
         //   and its values have been passed in here
         uniform bool receiveShadow;
@@ -153,80 +176,139 @@ class SurfaceBasicMaterial(Material):
         uniform float shadowBias;
         uniform vec3 shadowLightDirection;
 
+        // color multiplier: shadowStrength in shadow, 1 otherwise
+        float getShadowFactor()
+        {
+            if ( !receiveShadow )
+                return 1.0;
+
+            // do not apply shadow if surface is facing away from directional light
+            vec3 unitNormal = normalize(normal);
+            float cosAngle = dot(unitNormal, shadowLightDirection);
+            bool facingLight = (cosAngle < -0.05);
+
+            vec3 shadowCoord = ( positionFromShadowLight.xyz / positionFromShadowLight.w ) / 2.0 + 0.5;
+            float closestDistanceToLight = texture(shadowMap, shadowCoord.xy).r;
+            float fragmentDistanceToLight = shadowCoord.z;
+            // is this fragment in shadow?
+            if (facingLight && fragmentDistanceToLight > closestDistanceToLight + shadowBias)
+                return shadowStrength;
+            return 1.0;
+        }
+        #endif
+
+        #ifdef USE_GBUFFER
+        // surface data for deferred shading (see DeferredShading);
+        //   fragColor holds the unlit color. every alpha value is 1,
+        //   so that the alpha blending set by materials stores values unchanged
+        layout (location = 1) out vec4 gPosition;  // world position
+        layout (location = 2) out vec4 gNormal;    // unit normal
+        layout (location = 3) out vec4 gMaterial;  // shadow factor, 1 if lit, alpha
+        #endif
+
         void main()
         {
             vec4 baseColor = vec4(color, alpha);
 
-            if ( useVertexColors )
-                baseColor *= vec4(vColor, 1);
+            #ifdef USE_VERTEX_COLORS
+            baseColor *= vec4(vColor, 1);
+            #endif
 
-            if ( useTexture )
-                baseColor *= texture(image, UV);
+            #ifdef USE_INSTANCING
+            baseColor *= vec4(vInstanceColor, 1.0);
+            #endif
 
-            if ( useLight )
-            {
-                // Fixed C-style initializer issue
-                Light lightArray[4];
-                lightArray[0] = light0;
-                lightArray[1] = light1;
-                lightArray[2] = light2;
-                lightArray[3] = light3;
-
-                vec3 totalLight = vec3(0,0,0);
-                for (int n = 0; n < 4; n++)
-                    totalLight += lightCalculation( lightArray[n], position, normal );
-                totalLight = min( totalLight, vec3(1,1,1) );
-                baseColor *= vec4( totalLight, 1 );
-            }
+            #ifdef USE_TEXTURE
+            baseColor *= texture(image, UV);
+            #endif
 
+            #ifdef USE_GBUFFER
+            if (baseColor.a < alphaTest)
+                discard;
+
+            float shadowFactor = 1.0;
+            #ifdef USE_SHADOWS
+            shadowFactor = getShadowFactor();
+            #endif
+            #ifdef USE_LIGHT
+            float lit = 1.0;
+            #else
+            float lit = 0.0;
+            #endif
+
+            fragColor = vec4(baseColor.rgb, 1.0);
+            gPosition = vec4(position, 1.0);
+            gNormal = vec4(normalize(normal), 1.0);
+            gMaterial = vec4(shadowFactor, lit, baseColor.a, 1.0);
+            #else
+
+            #ifdef USE_LIGHT
+            #ifdef USE_CLUSTERED_LIGHTS
+            vec3 totalLight = clusteredLightCalculation( position, normal );
+            #else
+            vec3 totalLight = vec3(0,0,0);
+            for (int n = 0; n < LIGHT_COUNT; n++)
+                totalLight += lightCalculation( lights[n], position, normal );
+            #endif
+            totalLight = min( totalLight, vec3(1,1,1) );
+            baseColor *= vec4( totalLight, 1 );
+            #endif
+
+            #ifdef USE_FOG
             if ( useFog )
             {
                 float fogFactor = clamp( (fogEndDistance - cameraDistance)/(fogEndDistance - fogStartDistance), 0.0, 1.0 );
                 baseColor = mix( vec4(fogColor,1.0), baseColor, fogFactor );
             }
+            #endif
 
-            if ( receiveShadow )
-            {
-                // do not apply shadow if surface is facing away from directional light
-                vec3 unitNormal = normalize(normal);
-                float cosAngle = dot(unitNormal, shadowLightDirection);
-                bool facingLight = (cosAngle < -0.05);
-
-                vec3 shadowCoord = ( positionFromShadowLight.xyz / positionFromShadowLight.w ) / 2.0 + 0.5;
-                float closestDistanceToLight = texture(shadowMap, shadowCoord.xy).r;
-                float fragmentDistanceToLight = shadowCoord.z;
-                // is this fragment in shadow?
-                if (facingLight && fragmentDistanceToLight > closestDistanceToLight + shadowBias)
-                    baseColor *= vec4( shadowStrength, shadowStrength, shadowStrength, 1.0 );
-            }
+            #ifdef USE_SHADOWS
+            float shadowFactor = getShadowFactor();
+            baseColor *= vec4( shadowFactor, shadowFactor, shadowFactor, 1.0 );
+            #endif
 
             fragColor = baseColor;
 
             if (fragColor.a < alphaTest)
                 discard;
+            #endif
         }
         """
+        )
 
-        # Initialize parent with fixed shaders
-        super().__init__(vsCode, fsCode)
+        # Features are compiled into program variants instead of being tested per fragment;
+        #   the instanced variant reads per-instance data (see InstancedMesh)
+        defines = []
+        if useVertexColors:
+            defines.append("USE_VERTEX_COLORS")
+        if texture is not None:
+            defines.append("USE_TEXTURE")
+        if useLight:
+            defines.append("USE_LIGHT")
+        if useInstancing:
+            defines.append("USE_INSTANCING")
+
+        super().__init__(
+            vsCode,
+            fsCode,
+            defines=defines,
+            sceneDefineNames=SurfaceBasicMaterial._getSceneDefineNames(useLight),
+        )
+        # vertices are only transformed by modelMatrix
+        self.allowStaticBatching = True
+        # opaque meshes can be drawn by the deferred path (see DeferredShading)
+        self.allowDeferredShading = True
 
         # Set default uniform values
         self.setUniform("vec3", "color", color)
         self.setUniform("float", "alpha", alpha)
 
-        if useVertexColors:
-            self.setUniform("bool", "useVertexColors", 1)
-        else:
-            self.setUniform("bool", "useVertexColors", 0)
-
-        if texture is None:
-            self.setUniform("bool", "useTexture", 0)
-            self.setUniform("sampler2D", "image", None)
-        else:
-            self.setUniform("bool", "useTexture", 1)
-            self.setUniform("sampler2D", "image", texture)
-
-        self.setUniform("bool", "useLight", 0)
+        # feature flags are kept as uniforms too, so that they can still be changed
+        #   with setUniform (which then selects another variant)
+        self.setUniform("bool", "useVertexColors", 1 if useVertexColors else 0)
+        self.setUniform("bool", "useTexture", 0 if texture is None else 1)
+        self.setUniform("sampler2D", "image", texture)
+        self.setUniform("bool", "useLight", 1 if useLight else 0)
         self.setUniform("float", "alphaTest", alphaTest)
 
         # Set default render values
@@ -238,3 +320,30 @@ class SurfaceBasicMaterial(Material):
         # Customize draw style
         if wireframe:
             self.drawStyle = moderngl.LINES
+
+    @staticmethod
+    def _getSceneDefineNames(useLight):
+        # unlit variants do not depend on the number of lights
+        if useLight:
+            return ("LIGHT_COUNT", "USE_CLUSTERED_LIGHTS", "USE_FOG", "USE_SHADOWS", "USE_GBUFFER")
+        return ("USE_FOG", "USE_SHADOWS", "USE_GBUFFER")
+
+    def setUniform(self, type, name, value):
+        super().setUniform(type, name, value)
+
+        define = SurfaceBasicMaterial.featureDefines.get(name)
+        if define is None:
+            return
+        if name == "useLight":
+            self.sceneDefineNames = SurfaceBasicMaterial._getSceneDefineNames(bool(value))
+            self.sceneDefines = {
+                symbol: symbolValue
+                for symbol, symbolValue in self.sceneDefines.items()
+                if symbol in self.sceneDefineNames
+            }
+            # scene defines are selected again before the next draw
+            self.sceneDefinesSource = None
+        if value:
+            self.setDefine(define)
+        else:
+            self.removeDefine(define)
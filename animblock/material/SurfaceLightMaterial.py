@@ -11,6 +11,7 @@ class SurfaceLightMaterial(SurfaceBasicMaterial):
         lineWidth=1,
         useVertexColors=False,
         alphaTest=0,
+        useInstancing=False,
     ):
         if color is None:
             color = [1, 1, 1]
@@ -24,7 +25,7 @@ class SurfaceLightMaterial(SurfaceBasicMaterial):
             lineWidth=lineWidth,
             useVertexColors=useVertexColors,
             alphaTest=alphaTest,
+            useInstancing=useInstancing,
+            # Enable lighting for this material
+            useLight=True,
         )
-
-        # Enable lighting for this material
-        self.setUniform("bool", "useLight", 1)
@@ -0,0 +1,28 @@
+import numpy as np
+
+
+class ArrayUtils:
+    @staticmethod
+    def evaluate(function, *parameters):
+        """
+        Evaluate a vector-valued function (such as a curve or surface function, returning a
+        list of coordinates) at many parameter values at once. parameters are arrays of the
+        same shape; the result has one more axis, of the coordinates of each point.
+
+        The function is called once with the whole arrays if it accepts them (for example,
+        a lambda using numpy functions and arithmetic); functions that only accept numbers
+        (for example, using math.sin) are called once per point instead.
+        """
+        parameters = [np.asarray(parameter, dtype=float) for parameter in parameters]
+        shape = parameters[0].shape
+        try:
+            result = function(*parameters)
+            # coordinates may be constants, or arrays of the parameter shape
+            coordinates = [np.broadcast_to(np.asarray(c, dtype=float), shape) for c in result]
+            return np.stack(coordinates, axis=-1)
+        except (TypeError, ValueError):
+            # math functions raise TypeError for arrays, and conditions raise ValueError
+            points = [
+                function(*values) for values in zip(*(p.flat for p in parameters), strict=True)
+            ]
+            return np.array(points, dtype=float).reshape(*shape, -1)
@@ -1,13 +1,11 @@
-import math
-
 import numpy as np
 
-from .MatrixFactory import MatrixFactory
+from .ArrayUtils import ArrayUtils
 
 
 # a curve consists of a function, a domain [min,max], and a resolution (divisions).
 # getPoints() returns equally spaced points along the curve
-# getFrames() returns { "tangents" : list, "normals" : list, "binormals" : list } at same set of points
+# getFrames() returns { "tangents" : array, "normals" : array, "binormals" : array } at same set of points
 
 
 class Curve:
@@ -27,67 +25,56 @@ class Curve:
         self.calculateArcLengths()
 
     def calculateArcLengths(self):
-        # note: points stored as numpy arrays for simpler calculation syntax
-        arcLengthPoints = []
+        # parameter values of the table, and the arc length from tMin to each of them
         deltaT = (self.tMax - self.tMin) / (self.arcLengthDivisions - 1)
+        self.arcLengthTs = self.tMin + np.arange(self.arcLengthDivisions) * deltaT
+        arcLengthPoints = self.getPointArray(self.arcLengthTs)
 
-        for index in range(self.arcLengthDivisions):
-            t = self.tMin + index * deltaT
-            point = self.getPointAt(t)
-            arcLengthPoints.append(np.array(point))
-
-        self.arcLengths = [0]
-        for index in range(1, self.arcLengthDivisions):
-            arcLength = np.linalg.norm(arcLengthPoints[index] - arcLengthPoints[index - 1])
-            self.arcLengths.append(self.arcLengths[index - 1] + arcLength)
+        segmentLengths = np.linalg.norm(np.diff(arcLengthPoints, axis=0), axis=1)
+        self.arcLengths = np.concatenate([[0], np.cumsum(segmentLengths)])
 
-        self.totalArcLength = self.arcLengths[self.arcLengthDivisions - 1]
+        self.totalArcLength = self.arcLengths[-1]
 
     # u - percentage of total curve distance traversed, in [0,1]
     # t - corresponding value of variable from original parameterization
+    # u may also be an array, converted all at once
     def convert_u_to_t(self, u):
-        arcLength = u * self.totalArcLength
-        # index = np.searchsorted(list, value) means that list[index-1] < value <= list[index]
-        index = np.searchsorted(self.arcLengths, arcLength)
-        # arcLengthA < arcLength < arcLengthB
-        arcLengthA = self.arcLengths[index - 1]
-        arcLengthB = self.arcLengths[index]
-        segmentLength = arcLengthB - arcLengthA
-        # determine how far along the segment this arclength would be
-        percent = (arcLength - arcLengthA) / segmentLength
-        #
-        deltaT = (self.tMax - self.tMin) / (self.arcLengthDivisions - 1)
-        tA = self.tMin + (index - 1) * deltaT
-        t = tA + percent * deltaT
-        return t
+        # interpolate linearly between the entries of the arc length table
+        return np.interp(np.multiply(u, self.totalArcLength), self.arcLengths, self.arcLengthTs)
 
     # calculates a point according to original parameterization
     def getPointAt(self, t):
         return self.f(t)
 
+    # calculates points according to original parameterization, at each value of the array t;
+    #   returns an array with one point per row (see ArrayUtils.evaluate)
+    def getPointArray(self, t):
+        return ArrayUtils.evaluate(self.f, t)
+
     # calculates a point according to arclength parameterization
     # u - percentage of total curve distance traversed, in [0,1]
     def getPoint(self, u):
         t = self.convert_u_to_t(u)
         return self.getPointAt(t)
 
-    # calculates a list of equally spaced points along the curve
-    # size of list specified by divisions parameter in constructor
+    # values of u of the points returned by getPoints and getFrames
+    def getDivisionParameters(self):
+        return np.arange(self.divisions) / (self.divisions - 1)
+
+    # calculates an array of equally spaced points along the curve, one point per row
+    # number of points specified by divisions parameter in constructor
     def getPoints(self):
-        points = []
-        deltaU = 1 / (self.divisions - 1)
-        for index in range(self.divisions):
-            u = index * deltaU
-            point = self.getPoint(u)
-            points.append(point)
-        return points
+        return self.getPointArray(self.convert_u_to_t(self.getDivisionParameters()))
 
     # calculates a tangent vector according to original parameterization
     def getTangentAt(self, t):
+        return self.getTangentArray(np.array(t))
+
+    # calculates unit tangent vectors at each value of the array t (original parameterization)
+    def getTangentArray(self, t):
         h = 0.00001
-        tangent = np.divide(np.subtract(self.getPointAt(t + h), self.getPointAt(t)), h)
-        tangent = np.divide(tangent, np.linalg.norm(tangent))
-        return tangent
+        tangents = (self.getPointArray(t + h) - self.getPointArray(t)) / h
+        return tangents / np.linalg.norm(tangents, axis=-1, keepdims=True)
 
     # calculates a tangent vector according to arclength parameterization
     # u - percentage of total curve distance traversed, in [0,1]
@@ -95,62 +82,61 @@ class Curve:
         t = self.convert_u_to_t(u)
         return self.getTangentAt(t)
 
-    # returns { "tangents" : list, "normals" : list, "binormals" : list }
-    #  length of each list = divisions
+    # returns { "tangents" : array, "normals" : array, "binormals" : array }
+    #  one vector per row; length of each array = divisions
     def getFrames(self):
-        tangents = []
-        normals = []
-        binormals = []
-
         # calculate tangents ------------------------
-        deltaU = 1 / (self.divisions - 1)
-        for index in range(self.divisions):
-            u = index * deltaU
-            tangent = self.getTangent(u)
-            tangents.append(tangent)
+        tangents = self.getTangentArray(self.convert_u_to_t(self.getDivisionParameters()))
 
         # calculate normals ------------------------
         # reference: https://cs.indiana.edu/ftp/techreports/TR425.pdf
+        # each normal vector is the previous one, rotated by the rotation that takes
+        #  the previous tangent vector into the current tangent vector
 
         # calculate initial normal vector
         arbitraryVector = [1, 1, 1]  # if tangents[0] != c*[1,1,1] else [1,1,-1]
         normal = np.cross(tangents[0], arbitraryVector)
-        normals.append(normal)
-
-        # calculate the remaining normal vectors
-        for n in range(1, self.divisions):
-            # default normal vector equals the previous normal vector
-            # (will be used if the tangent vector has not changed direction)
-            normal = normals[n - 1]
-
-            # if two vectors are parallel,
-            #  then their cross product is the zero vector (which has magnitude zero)
-            crossProduct = np.cross(tangents[n - 1], tangents[n])
-            # therefore, if this magnitude is nonzero,
-            #  the tangent vectors have changed direction
-            #  and we need to apply the same change to the normal vector.
-            magnitude = np.linalg.norm(crossProduct)
-            if magnitude > 0.0001:
-                # normalize the cross product vector
-                crossProduct = np.divide(crossProduct, magnitude)
-
-                # calculate the angle between the previous and current tangent vector
-                theta = math.acos(np.dot(tangents[n - 1], tangents[n]))
-
-                # calculate the transformation the rotates previous tangent vector
-                #  into the current tangent vector
-                rotationMatrix = MatrixFactory.makeRotationAxisAngle(crossProduct, theta)
-
-                # apply this transformation to the normal vector
-                normal = list(rotationMatrix[0:3, 0:3] @ normal)
-
-            # assign next normal vector
-            normals.append(normal)
+
+        # rotation axes (unnormalized) and angles between consecutive tangent vectors:
+        #  the magnitude of the cross product is the sine, the dot product the cosine
+        crossProducts = np.cross(tangents[:-1], tangents[1:])
+        sines = np.linalg.norm(crossProducts, axis=1)
+        cosines = np.einsum("ij,ij->i", tangents[:-1], tangents[1:])
+        # if two vectors are (nearly) parallel, the normal vector is not rotated
+        turning = sines > 0.0001
+        axes = crossProducts / np.where(turning, sines, 1)[:, None]
+        sines = np.where(turning, sines, 0)
+        cosines = np.where(turning, cosines, 1)
+
+        # rotation matrices, by Rodrigues' formula: cI + s[axis]x + (1-c)(axis)(axis)^T
+        x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+        zero = np.zeros_like(x)
+        crossMatrices = np.stack(
+            [
+                np.stack([zero, -z, y], axis=1),
+                np.stack([z, zero, -x], axis=1),
+                np.stack([-y, x, zero], axis=1),
+            ],
+            axis=1,
+        )
+        rotations = (
+            cosines[:, None, None] * np.eye(3)
+            + sines[:, None, None] * crossMatrices
+            + (1 - cosines)[:, None, None] * axes[:, :, None] * axes[:, None, :]
+        )
+
+        # accumulated rotations from the first frame: rotations[n] becomes the product
+        #  rotations[n] @ rotations[n-1] @ ... @ rotations[0], combining products of
+        #  1, 2, 4, ... consecutive rotations at a time
+        step = 1
+        while step < len(rotations):
+            rotations[step:] = rotations[step:] @ rotations[:-step]
+            step *= 2
+
+        normals = np.concatenate([[normal], rotations @ normal])
 
         # calculate binormals ------------------------
-        for index in range(self.divisions):
-            binormal = np.cross(tangents[index], normals[index])
-            binormals.append(binormal)
+        binormals = np.cross(tangents, normals)
 
         # calculations complete ------------------------
         return {"tangents": tangents, "normals": normals, "binormals": binormals}
@@ -1,4 +1,6 @@
-from math import cos, pi, sin
+from math import pi
+
+import numpy as np
 
 from .Curve import Curve
 
@@ -19,19 +21,19 @@ class CurveFactory:
 
     @staticmethod
     def makeCircle(radius=1, divisions=64):
-        return Curve(lambda t: [radius * cos(t), radius * sin(t), 0], 0, 2 * pi, divisions)
+        return Curve(lambda t: [radius * np.cos(t), radius * np.sin(t), 0], 0, 2 * pi, divisions)
 
     @staticmethod
     def makePolygon(sides=6, radius=1):
-        return Curve(lambda t: [radius * cos(t), radius * sin(t), 0], 0, 2 * pi, sides + 1)
+        return Curve(lambda t: [radius * np.cos(t), radius * np.sin(t), 0], 0, 2 * pi, sides + 1)
 
     @staticmethod
     def makeHelix(radius=1, height=2, revolutions=3, divisions=128):
         return Curve(
             lambda t: [
-                radius * cos(t),
+                radius * np.cos(t),
                 height * t / (2 * pi * revolutions) - height / 2,
-                radius * sin(t),
+                radius * np.sin(t),
             ],
             0,
             2 * pi * revolutions,
@@ -42,9 +44,9 @@ class CurveFactory:
     def makeTorusKnot(p=2, q=3, divisions=128):
         return Curve(
             lambda t: [
-                0.5 * (2 + cos(q * t)) * cos(p * t),
-                0.5 * (2 + cos(q * t)) * sin(p * t),
-                0.5 * sin(q * t),
+                0.5 * (2 + np.cos(q * t)) * np.cos(p * t),
+                0.5 * (2 + np.cos(q * t)) * np.sin(p * t),
+                0.5 * np.sin(q * t),
             ],
             0,
             2 * pi,
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 # a multicurve consists of a list of curve objects
 
 
@@ -7,6 +10,11 @@ class Multicurve:
         self.curveList = curveList
         self.numberCurves = len(curveList)
 
+    # number of points returned by getPoints and getFrames
+    @property
+    def divisions(self):
+        return sum(curve.divisions for curve in self.curveList)
+
     # calculates a point according to arclength parameterization
     # u - percentage of total curveList distance traversed, in [0,1]
     # if curveList contains N curves, then the range [I/N, (I+1)/N] corresponds to curve I
@@ -15,13 +23,9 @@ class Multicurve:
         curveTime = u * self.numberCurves - curveIndex
         return self.curveList[curveIndex].getPoint(curveTime)
 
-    # calculates a list of equally spaced points along the curve
-    # size of list specified by divisions parameter in constructor
+    # calculates an array of the points of each curve (see Curve.getPoints), one point per row
     def getPoints(self):
-        points = []
-        for curve in self.curveList:
-            points.extend(curve.getPoints())
-        return points
+        return np.concatenate([curve.getPoints() for curve in self.curveList])
 
     # calculates a tangent vector according to arclength parameterization
     # u - percentage of total curveList distance traversed, in [0,1]
@@ -30,15 +34,11 @@ class Multicurve:
         curveTime = u - curveIndex
         return self.curveList[curveIndex].getTangent(curveTime)
 
-    # returns { "tangents" : list, "normals" : list, "binormals" : list }
-    #  length of each list = divisions
+    # returns { "tangents" : array, "normals" : array, "binormals" : array }
+    #  of the frames of each curve; length of each array = divisions
     def getFrames(self):
-        tangents = []
-        normals = []
-        binormals = []
-        for curve in self.curveList:
-            frames = curve.getFrames()
-            tangents.extend(frames["tangents"])
-            normals.extend(frames["normals"])
-            binormals.extend(frames["binormals"])
-        return {"tangents": tangents, "normals": normals, "binormals": binormals}
+        framesList = [curve.getFrames() for curve in self.curveList]
+        return {
+            name: np.concatenate([frames[name] for frames in framesList])
+            for name in ("tangents", "normals", "binormals")
+        }
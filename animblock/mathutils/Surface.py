@@ -1,65 +1,69 @@
 import numpy as np
 
+from .ArrayUtils import ArrayUtils
+
 
 # NOTE: Three.js automatically scales parameter domain to [0,1] (based on 200 subdivisions).
 # is this useful? could more easily get equally spaced points along the curve. check 3js' code.
 
 
 class Surface:
-    def __init__(self, surfaceFunction):
+    # uDerivative and vDerivative: optional functions (u, v) returning the partial derivatives
+    #   of surfaceFunction, used for exact normals; otherwise normals are approximated from
+    #   differences of nearby points.
+    # functions using numpy functions and arithmetic are evaluated for all grid points at once
+    #   (see ArrayUtils.evaluate); functions using the math module are evaluated per point.
+    def __init__(self, surfaceFunction, uDerivative=None, vDerivative=None):
         self.f = surfaceFunction
+        self.uDerivative = uDerivative
+        self.vDerivative = vDerivative
 
-    def getPoints(self, uStart, uEnd, uResolution, vStart, vEnd, vResolution):
+    @staticmethod
+    def getGrid(uStart, uEnd, uResolution, vStart, vEnd, vResolution):
+        """Return arrays u, v of shape (uResolution+1, vResolution+1) of grid parameters"""
         deltaU = (uEnd - uStart) / uResolution
         deltaV = (vEnd - vStart) / vResolution
-        points = []
-
-        for uIndex in range(uResolution + 1):
-            vArray = []
-            for vIndex in range(vResolution + 1):
-                u = uStart + uIndex * deltaU
-                v = vStart + vIndex * deltaV
-                vArray.append(self.f(u, v))
-            points.append(vArray)
+        uValues = uStart + np.arange(uResolution + 1) * deltaU
+        vValues = vStart + np.arange(vResolution + 1) * deltaV
+        return np.meshgrid(uValues, vValues, indexing="ij")
 
-        return points
+    def getPoints(self, uStart, uEnd, uResolution, vStart, vEnd, vResolution):
+        """Return the grid points, an array of shape (uResolution+1, vResolution+1, 3)"""
+        u, v = Surface.getGrid(uStart, uEnd, uResolution, vStart, vEnd, vResolution)
+        return ArrayUtils.evaluate(self.f, u, v)
 
     def getUVs(self, uResolution, vResolution):
-        UVs = []
-        for uIndex in range(uResolution + 1):
-            vArray = []
-            for vIndex in range(vResolution + 1):
-                # u = uStart + uIndex * deltaU
-                # v = vStart + vIndex * deltaV
-                vArray.append([uIndex / uResolution, vIndex / vResolution])
-            UVs.append(vArray)
-
-        return UVs
+        """Return texture coordinates from 0 to 1, shape (uResolution+1, vResolution+1, 2)"""
+        u, v = Surface.getGrid(0, 1, uResolution, 0, 1, vResolution)
+        return np.stack([u, v], axis=-1)
 
     def getNormalAt(self, u, v):
-        h = 0.0001
-        uDeriv = (np.array(self.f(u + h, v)) - np.array(self.f(u, v))) / h
-        vDeriv = (np.array(self.f(u, v + h)) - np.array(self.f(u, v))) / h
-        # calculate the normal at this point
-        normalVector = np.cross(uDeriv, vDeriv)
-        # normalize normal vectors
-        normalVector = normalVector / np.linalg.norm(normalVector)
-        return list(normalVector)
+        return list(self.getNormalArray(np.array(u), np.array(v)))
 
     def getNormals(self, uStart, uEnd, uResolution, vStart, vEnd, vResolution):
-        deltaU = (uEnd - uStart) / uResolution
-        deltaV = (vEnd - vStart) / vResolution
-        normals = []
-
-        for uIndex in range(uResolution + 1):
-            vArray = []
-            for vIndex in range(vResolution + 1):
-                u = uStart + uIndex * deltaU
-                v = vStart + vIndex * deltaV
-                vArray.append(self.getNormalAt(u, v))
-            normals.append(vArray)
-
-        return normals
+        """Return unit normals at the grid points, shape (uResolution+1, vResolution+1, 3)"""
+        u, v = Surface.getGrid(uStart, uEnd, uResolution, vStart, vEnd, vResolution)
+        return self.getNormalArray(u, v)
+
+    def getNormalArray(self, u, v, points=None):
+        """
+        Return unit normals at parameters u and v (arrays of the same shape); points
+        (the surface at u, v) may be passed to avoid evaluating it again
+        """
+        if self.uDerivative is not None and self.vDerivative is not None:
+            uDeriv = ArrayUtils.evaluate(self.uDerivative, u, v)
+            vDeriv = ArrayUtils.evaluate(self.vDerivative, u, v)
+        else:
+            h = 0.0001
+            if points is None:
+                points = ArrayUtils.evaluate(self.f, u, v)
+            uDeriv = (ArrayUtils.evaluate(self.f, u + h, v) - points) / h
+            vDeriv = (ArrayUtils.evaluate(self.f, u, v + h) - points) / h
+        # calculate the normal at each point
+        normalVectors = np.cross(uDeriv, vDeriv)
+        # normalize normal vectors
+        length = np.linalg.norm(normalVectors, axis=-1, keepdims=True)
+        return normalVectors / np.where(length > 0, length, 1)
 
     # TODO: getPoint, getTangent
     """
@@ -1,3 +1,4 @@
+from .ArrayUtils import *
 from .Curve import *
 from .CurveFactory import *
 from .Hilbert3D import *
@@ -0,0 +1,176 @@
+import datetime
+import gc
+import json
+import platform
+import statistics
+import time
+
+import moderngl
+import numpy as np
+
+from animblock.core import HeadlessBase
+
+
+# benchmarks added by BenchmarkSuite.register, in registration order
+_REGISTERED_BENCHMARKS = []
+
+
+class Benchmark:
+    """A function measured once per parameter set"""
+
+    def __init__(self, name, function, params, quickParams=None, repeat=5):
+        self.name = name
+        # function(*param) does any setup, and returns the callable to be timed
+        self.function = function
+        self.params = params
+        # smaller parameter sets used by quick runs
+        self.quickParams = quickParams if quickParams is not None else params
+        self.repeat = repeat
+
+    @staticmethod
+    def getLabel(name, param):
+        return name + "[" + ",".join(str(value) for value in param) + "]"
+
+
+# runs the registered benchmarks in an offscreen OpenGL context (software rendering works)
+#   and produces a JSON-compatible dictionary:
+#   {"metadata": {...}, "results": {label: {"min", "median", "mean", "repeat", "number"}}}
+#   with times in milliseconds per call ({"error": message} for failed benchmarks).
+# results can be compared with a saved baseline; see compare.
+class BenchmarkSuite:
+    def __init__(self, quick=False, filterText=None, backend=None, width=256, height=256):
+        # the registered benchmarks when the suite was created; suites may add or remove
+        #   entries without affecting each other
+        self.benchmarkList = list(_REGISTERED_BENCHMARKS)
+        self.quick = quick
+        # only benchmarks whose name contains filterText are run
+        self.filterText = filterText
+        self.backend = backend
+        self.width = width
+        self.height = height
+
+    @staticmethod
+    def register(name, params, quickParams=None, repeat=5):
+        """Decorator adding a benchmark; params is a list of argument tuples"""
+
+        def decorator(function):
+            _REGISTERED_BENCHMARKS.append(Benchmark(name, function, params, quickParams, repeat))
+            return function
+
+        return decorator
+
+    @staticmethod
+    def measure(run, repeat, minimumTime=0.01):
+        """
+        Time repeat samples of run, after one untimed warm-up call; milliseconds per call.
+        Fast functions are called several times per sample, so that each sample
+        takes at least minimumTime seconds.
+        """
+        startTime = time.perf_counter()
+        run()
+        warmupTime = time.perf_counter() - startTime
+        number = max(1, min(1000, int(minimumTime / max(warmupTime, 1e-9))))
+
+        times = []
+        for _ in range(repeat):
+            startTime = time.perf_counter()
+            for _ in range(number):
+                run()
+            times.append((time.perf_counter() - startTime) * 1000 / number)
+        return {
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "repeat": repeat,
+            "number": number,
+        }
+
+    def run(self, log=print):
+        # the context also sets up OpenGLUtils, as for any application
+        app = HeadlessBase(self.width, self.height, backend=self.backend)
+        # release GPU objects of geometries and meshes created by benchmarks when collected
+        app.ctx.gc_mode = "auto"
+
+        results = {}
+        try:
+            for benchmark in self.benchmarkList:
+                if self.filterText is not None and self.filterText not in benchmark.name:
+                    continue
+                params = benchmark.quickParams if self.quick else benchmark.params
+                for param in params:
+                    label = Benchmark.getLabel(benchmark.name, param)
+                    try:
+                        run = benchmark.function(*param)
+                        results[label] = BenchmarkSuite.measure(run, benchmark.repeat)
+                        log(f"{label:<48} {results[label]['median']:10.3f} ms")
+                    except Exception as e:
+                        results[label] = {"error": str(e)}
+                        log(f"{label:<48}      error: {e}")
+                    run = None
+                    gc.collect()
+            metadata = self.getMetadata(app.ctx)
+        finally:
+            app.close()
+
+        return {"metadata": metadata, "results": results}
+
+    def getMetadata(self, ctx):
+        return {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "moderngl": moderngl.__version__,
+            "renderer": ctx.info.get("GL_RENDERER", ""),
+            "quick": self.quick,
+        }
+
+    @staticmethod
+    def saveResults(results, fileName):
+        with open(fileName, "w") as file:
+            json.dump(results, file, indent=2)
+
+    @staticmethod
+    def loadResults(fileName):
+        with open(fileName) as file:
+            return json.load(file)
+
+    @staticmethod
+    def compare(results, baseline, tolerance=0.2):
+        """
+        Compare median times of results with those of baseline, for benchmarks present in both.
+        Returns a list of (label, baseline ms, current ms, ratio, status) tuples, where status is
+        "slower" when the ratio exceeds 1 + tolerance, "faster" when below 1 - tolerance,
+        "error" when the current run failed, and "same" otherwise.
+        """
+        comparison = []
+        for label, previous in baseline["results"].items():
+            current = results["results"].get(label)
+            if current is None or "median" not in previous:
+                continue
+            if "median" not in current:
+                comparison.append((label, previous["median"], None, None, "error"))
+                continue
+
+            ratio = current["median"] / previous["median"] if previous["median"] > 0 else 1
+            if ratio > 1 + tolerance:
+                status = "slower"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+            else:
+                status = "same"
+            comparison.append((label, previous["median"], current["median"], ratio, status))
+        return comparison
+
+    @staticmethod
+    def printComparison(comparison, log=print):
+        log(f"{'benchmark':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for label, previous, current, ratio, status in comparison:
+            if current is None:
+                log(f"{label:<48} {previous:10.3f} {'-':>10} {'-':>7}  {status}")
+            else:
+                log(f"{label:<48} {previous:10.3f} {current:10.3f} {ratio:7.2f}  {status}")
+
+
+# shorthand used by benchmark modules
+benchmark = BenchmarkSuite.register
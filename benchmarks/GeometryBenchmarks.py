@@ -0,0 +1,51 @@
+import math
+from pathlib import Path
+
+from animblock.geometry import (
+    BoxGeometry,
+    OBJGeometry,
+    SphereGeometry,
+    SurfaceGeometry,
+    TubeGeometry,
+)
+from animblock.mathutils import CurveFactory
+
+from .BenchmarkSuite import benchmark
+
+
+# models bundled with the package
+MODEL_DIRECTORY = Path(__file__).resolve().parent.parent / "animblock" / "models"
+
+
+@benchmark("geometry.box", params=[(1,), (16,), (64,)], quickParams=[(1,), (16,)])
+def boxGeometry(resolution):
+    return lambda: BoxGeometry(2, 2, 2, resolution, resolution, resolution)
+
+
+@benchmark("geometry.sphere", params=[(16,), (64,), (256,)], quickParams=[(16,), (64,)])
+def sphereGeometry(resolution):
+    return lambda: SphereGeometry(1, resolution, resolution // 2)
+
+
+@benchmark("geometry.surface", params=[(16,), (64,), (256,)], quickParams=[(16,), (64,)])
+def surfaceGeometry(resolution):
+    def wave(u, v):
+        return [u, v, math.sin(u) * math.cos(v)]
+
+    return lambda: SurfaceGeometry(-3, 3, resolution, -3, 3, resolution, wave)
+
+
+@benchmark("geometry.tube", params=[(128, 6), (512, 16), (2048, 32)], quickParams=[(128, 6)])
+def tubeGeometry(divisions, radiusSegments):
+    curve = CurveFactory.makeTorusKnot(3, 5, divisions)
+    return lambda: TubeGeometry(curve, 0.1, radiusSegments)
+
+
+@benchmark(
+    "geometry.obj",
+    params=[("star",), ("mushroom",), ("fireflower",)],
+    quickParams=[("star",)],
+)
+def objGeometry(modelName):
+    fileName = str(MODEL_DIRECTORY / (modelName + ".obj"))
+    return lambda: OBJGeometry(fileName, smoothNormals=True)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from animblock.cameras import PerspectiveCamera
+from animblock.core import Mesh, Object3D, OpenGLUtils, ParticleEngine, Renderer, Scene
+from animblock.geometry import BoxGeometry
+from animblock.lights import AmbientLight, DirectionalLight, PointLight
+from animblock.material import SurfaceLightMaterial
+
+from .BenchmarkSuite import benchmark
+
+
+@benchmark(
+    "particles.update",
+    params=[(1000,), (10000,), (100000,)],
+    quickParams=[(1000,), (10000,)],
+    repeat=3,
+)
+def particleUpdate(particleCount):
+    engine = ParticleEngine(
+        style="box",
+        particlesPerSecond=particleCount // 2,
+        particleDeathAge=2,
+        emitterDeathAge=1000,
+        positionSpread=[0, 0, 0],
+        velocityBase=[0, 1, 0],
+        velocitySpread=[0.4, 0.1, 0.4],
+        gravity=[0, -0.5, 0],
+    )
+    # activate every particle before timing
+    engine.update(1)
+    engine.update(1)
+    return lambda: engine.update(1 / 60)
+
+
+@benchmark(
+    "renderer.render",
+    params=[(100, 1), (1000, 1), (1000, 4), (5000, 4)],
+    quickParams=[(100, 1), (1000, 4)],
+)
+def rendererRender(meshCount, lightCount):
+    renderer = Renderer()
+    renderer.setViewportSize(256, 256)
+    camera = PerspectiveCamera()
+    camera.transform.setPosition(0, 0, 60)
+
+    scene = Scene()
+    scene.add(AmbientLight(strength=0.25))
+    for index in range(lightCount - 1):
+        if index % 2 == 0:
+            scene.add(DirectionalLight(direction=[-1, -1, -1 - index]))
+        else:
+            light = PointLight(strength=0.5)
+            light.transform.setPosition(index * 4, 0, 10)
+            scene.add(light)
+
+    # meshes on a square grid in front of the camera, sharing a few materials
+    geometry = BoxGeometry(0.5, 0.5, 0.5)
+    materials = [SurfaceLightMaterial(color=[0.25 * n, 0.5, 1 - 0.25 * n]) for n in range(4)]
+    side = int(np.ceil(np.sqrt(meshCount)))
+    for index in range(meshCount):
+        mesh = Mesh(geometry, materials[index % len(materials)])
+        x = (index % side) / side * 60 - 30
+        y = (index // side) / side * 60 - 30
+        mesh.transform.setPosition(x, y, 0)
+        scene.add(mesh)
+
+    def run():
+        renderer.render(scene, camera)
+        # include the GPU work in the measurement
+        OpenGLUtils.ctx.finish()
+
+    return run
+
+
+@benchmark("object3d.getWorldMatrix", params=[(10,), (100,), (500,)], quickParams=[(10,), (100,)])
+def worldMatrixDepth(depth):
+    # a chain of nested objects; moving the root invalidates every world matrix below it
+    root = Object3D()
+    leaf = root
+    for _ in range(depth):
+        child = Object3D()
+        child.transform.translate(0, 0.1, 0)
+        leaf.add(child)
+        leaf = child
+
+    def run():
+        root.transform.rotateY(0.01)
+        leaf.getWorldMatrix()
+
+    return run
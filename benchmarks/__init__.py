@@ -0,0 +1,5 @@
+from .BenchmarkSuite import *
+
+# modules registering benchmarks
+from .GeometryBenchmarks import *
+from .SceneBenchmarks import *
@@ -0,0 +1,43 @@
+import argparse
+import sys
+
+# importing the package registers all benchmarks
+from .BenchmarkSuite import BenchmarkSuite
+
+
+# usage: python -m benchmarks [--quick] [--filter text] [--output results.json]
+#                             [--baseline baseline.json] [--tolerance 0.2] [--backend egl]
+# with --baseline, exits with status 1 if any benchmark is slower than the baseline
+#   by more than the tolerance (or fails)
+def main(argumentList=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="animblock benchmarks"
+    )
+    parser.add_argument("--quick", action="store_true", help="use small parameter sets only")
+    parser.add_argument("--filter", default=None, help="run benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare with results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--backend", default=None, help="moderngl context backend, e.g. egl")
+    arguments = parser.parse_args(argumentList)
+
+    suite = BenchmarkSuite(
+        quick=arguments.quick, filterText=arguments.filter, backend=arguments.backend
+    )
+    results = suite.run()
+
+    if arguments.output is not None:
+        BenchmarkSuite.saveResults(results, arguments.output)
+
+    if arguments.baseline is not None:
+        baseline = BenchmarkSuite.loadResults(arguments.baseline)
+        comparison = BenchmarkSuite.compare(results, baseline, arguments.tolerance)
+        print()
+        BenchmarkSuite.printComparison(comparison)
+        if any(row[4] in ("slower", "error") for row in comparison):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
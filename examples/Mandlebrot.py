@@ -188,6 +188,10 @@ class TestMandlebrot(Base):
             uniformData["viewportSize"].value[1] *= newSize["height"] / oldSize[1]
             uniformData["screenSize"].value = [ newSize["width"], newSize["height"] ]
 
+        # center and viewportSize lists are edited in place above
+        uniformData["center"].markChanged()
+        uniformData["viewportSize"].markChanged()
+
         self.renderer.render(self.scene, self.camera)
 
 # instantiate and run the program
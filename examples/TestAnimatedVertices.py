@@ -68,10 +68,14 @@ class TestAnimatedVertices(Base):
         sphere = SphereGeometry(xResolution=16, yResolution=16)
         cone = ConeGeometry(radialSegments=16, heightSegments=16)
 
-        morphGeometry.setAttribute("vec3", "vertexPositionA", sphere.attributeData["vertexPosition"]["value"])
-        morphGeometry.setAttribute("vec3", "vertexPositionB", cone.attributeData["vertexPosition"]["value"])
-        morphGeometry.setAttribute("vec2", "vertexUV", sphere.attributeData["vertexUV"]["value"])
-        morphGeometry.vertexCount = sphere.vertexCount
+        # both are indexed grids of (16+1) x (16+1) vertices; the cone's side grid comes first,
+        #   followed by the vertices of its base, which are not morphed
+        vertexCount = sphere.vertexCount
+        morphGeometry.setAttribute("vec3", "vertexPositionA", sphere.getAttributeArray("vertexPosition"))
+        morphGeometry.setAttribute("vec3", "vertexPositionB", cone.getAttributeArray("vertexPosition")[:vertexCount])
+        morphGeometry.setAttribute("vec2", "vertexUV", sphere.getAttributeArray("vertexUV"))
+        morphGeometry.vertexCount = vertexCount
+        morphGeometry.setIndices(sphere.indices)
 
         self.shape = Mesh( morphGeometry, morphMaterial )
         self.shape.transform.translate(0, 0, 0, Matrix.LOCAL)
@@ -0,0 +1,73 @@
+from animblock.core import *
+from animblock.cameras import *
+from animblock.lights import AmbientLight, PointLight
+from animblock.geometry import *
+from animblock.material import *
+
+import math
+import random
+
+class TestClusteredLights(Base):
+
+    def initialize(self):
+
+        self.setWindowTitle('300 Point Lights (Clustered Lighting)')
+        self.setWindowSize(800,800)
+
+        self.renderer = Renderer()
+        self.renderer.setViewportSize(800,800)
+        self.renderer.setClearColor(0.1, 0.1, 0.1)
+
+        # each fragment only evaluates the point lights that reach it
+        self.renderer.clusteredLighting = True
+
+        self.scene = Scene()
+
+        self.scene.add( AmbientLight(strength=0.1) )
+
+        self.camera = PerspectiveCamera()
+        self.camera.transform.setPosition(0, 8, 20)
+        self.camera.transform.lookAt(0, 0, 0)
+        self.cameraControls = FirstPersonController(self.input, self.camera)
+
+        floor = Mesh( QuadGeometry(width=40, height=40), SurfaceLightMaterial() )
+        floor.transform.rotateX(-1.57, Matrix.LOCAL)
+        self.scene.add(floor)
+
+        sphereGeo = SphereGeometry(radius=0.5)
+        sphereMat = SurfaceLightMaterial()
+        for i in range(200):
+            sphere = Mesh(sphereGeo, sphereMat)
+            sphere.transform.setPosition( random.uniform(-18,18), 0.5, random.uniform(-18,18) )
+            self.scene.add(sphere)
+
+        # lights need a distance to be assigned to clusters;
+        #   lights without one are evaluated everywhere
+        self.lightList = []
+        for i in range(300):
+            light = PointLight( position=[random.uniform(-18,18), 1, random.uniform(-18,18)],
+                color=[random.uniform(0,1), random.uniform(0,1), random.uniform(0,1)],
+                distance=3 )
+            self.scene.add(light)
+            self.lightList.append( (light, random.uniform(0,6.28)) )
+
+        self.time = 0
+
+    def update(self):
+
+        self.cameraControls.update()
+
+        if self.input.resize():
+            size = self.input.getWindowSize()
+            self.camera.setAspectRatio( size["width"]/size["height"] )
+            self.renderer.setViewportSize(size["width"], size["height"])
+
+        self.time += self.deltaTime
+        for light, phase in self.lightList:
+            position = light.transform.getPosition()
+            light.transform.setPosition( position[0], 1 + 0.5 * math.sin(self.time + phase), position[2] )
+
+        self.renderer.render(self.scene, self.camera)
+
+# instantiate and run the program
+TestClusteredLights().run()
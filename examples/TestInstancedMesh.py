@@ -0,0 +1,57 @@
+from animblock.core import *
+from animblock.cameras import *
+from animblock.lights import AmbientLight, DirectionalLight
+from animblock.geometry import *
+from animblock.material import *
+from animblock.mathutils import *
+
+import numpy as np
+
+class TestInstancedMesh(Base):
+
+    def initialize(self):
+
+        self.setWindowTitle('100,000 Instanced Cubes')
+        self.setWindowSize(800,800)
+
+        self.renderer = Renderer()
+        self.renderer.setViewportSize(800,800)
+        self.renderer.setClearColor(0.25, 0.25, 0.25)
+
+        self.scene = Scene()
+
+        self.scene.add( AmbientLight(strength=0.25) )
+        self.scene.add( DirectionalLight(direction=[-1,-1,-1]) )
+
+        self.camera = PerspectiveCamera()
+        self.camera.transform.setPosition(0, 0, 40)
+        self.camera.transform.lookAt(0, 0, 0)
+        self.cameraControls = FirstPersonController(self.input, self.camera)
+
+        # a single draw call renders every cube
+        count = 100000
+        boxGeo = BoxGeometry(width=0.2, height=0.2, depth=0.2)
+        boxMat = SurfaceLightMaterial(useInstancing=True)
+        self.boxes = InstancedMesh(boxGeo, boxMat, count, useColors=True)
+
+        # instance transforms and colors are set for all cubes at once
+        self.boxes.setInstancePositions( np.random.uniform(-15, 15, (count,3)) )
+        self.boxes.setInstanceColors( np.random.uniform(0, 1, (count,3)) )
+        self.scene.add(self.boxes)
+
+    def update(self):
+
+        self.cameraControls.update()
+
+        if self.input.resize():
+            size = self.input.getWindowSize()
+            self.camera.setAspectRatio( size["width"]/size["height"] )
+            self.renderer.setViewportSize(size["width"], size["height"])
+
+        # rotating the InstancedMesh moves all instances together
+        self.boxes.transform.rotateY(0.005, Matrix.LOCAL)
+
+        self.renderer.render(self.scene, self.camera)
+
+# instantiate and run the program
+TestInstancedMesh().run()
@@ -0,0 +1,15 @@
+import pytest
+
+# animblock.core must be imported before animblock.geometry
+from animblock.core import HeadlessBase
+
+
+@pytest.fixture(scope="session")
+def glContext():
+    """Offscreen OpenGL context set up in OpenGLUtils, for tests creating buffers"""
+    try:
+        app = HeadlessBase(16, 16)
+    except Exception as e:
+        pytest.skip(f"no OpenGL context available: {e}")
+    yield app.ctx
+    app.close()
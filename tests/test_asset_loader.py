@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from animblock.core.AssetLoader import AssetLoader
+from animblock.core.OpenGLUtils import OpenGLUtils
+from animblock.material.SurfaceBasicMaterial import SurfaceBasicMaterial
+
+
+TRIANGLE = "v 0 0 0\nv 2 0 0\nv 0 3 0\nvt 0 0\nvt 1 0\nvt 0 1\nf 1/1 2/2 3/3\n"
+
+
+@pytest.fixture
+def assetLoader(glContext):
+    assetLoader = AssetLoader(workerCount=2)
+    yield assetLoader
+    assetLoader.shutdown()
+
+
+@pytest.fixture
+def imageFileName(tmp_path):
+    # red top row, blue bottom row
+    image = Image.new("RGBA", (4, 2), (0, 0, 255, 255))
+    for x in range(4):
+        image.putpixel((x, 0), (255, 0, 0, 255))
+    fileName = tmp_path / "image.png"
+    image.save(fileName)
+    return str(fileName)
+
+
+def test_load_texture_replaces_placeholder(assetLoader, imageFileName):
+    material = SurfaceBasicMaterial()
+    future = assetLoader.loadTexture(imageFileName, material=material)
+    placeholder = assetLoader.getPlaceholderTexture()
+    assert material.uniformList["image"].value is placeholder
+
+    assert assetLoader.wait(timeout=10)
+    texture = future.result()
+    assert material.uniformList["image"].value is texture
+    assert texture.size == (4, 2)
+    # textures start with the bottom row
+    pixels = np.frombuffer(texture.read(), dtype=np.uint8).reshape(2, 4, 4)
+    assert pixels[0, 0].tolist() == [0, 0, 255, 255]
+    assert pixels[1, 0].tolist() == [255, 0, 0, 255]
+    # the placeholder belongs to the loader, and stays available for other materials
+    assert OpenGLUtils.resourceManager.isAllocated(placeholder)
+    assert assetLoader.pendingCount == 0
+
+
+def test_load_geometry_replaces_placeholder_in_place(assetLoader, tmp_path):
+    fileName = tmp_path / "triangle.obj"
+    fileName.write_text(TRIANGLE)
+    future = assetLoader.loadGeometry(str(fileName), useCache=False)
+    geometry = future.geometry
+    assert geometry.vertexCount > 3
+
+    assert assetLoader.wait(timeout=10)
+    assert future.result() is geometry
+    assert geometry.vertexCount == 3
+    np.testing.assert_array_equal(
+        geometry.getAttributeArray("vertexPosition"), [[0, 0, 0], [2, 0, 0], [0, 3, 0]]
+    )
+    assert "vertexUV" in geometry.attributeData
+
+
+def test_worker_exceptions_reach_the_future(assetLoader, tmp_path):
+    textureFuture = assetLoader.loadTexture(str(tmp_path / "missing.png"))
+    geometryFuture = assetLoader.loadGeometry(str(tmp_path / "missing.obj"))
+    assert assetLoader.wait(timeout=10)
+    assert isinstance(textureFuture.exception(), OSError)
+    assert isinstance(geometryFuture.exception(), OSError)
+    assert assetLoader.pendingCount == 0
+
+
+def test_process_completed_runs_callbacks(assetLoader, imageFileName):
+    results = []
+    future = assetLoader.loadImage(imageFileName)
+    future.add_done_callback(lambda future: results.append(future.result()[0]))
+    deadline = time.perf_counter() + 10
+    while not future.done() and time.perf_counter() < deadline:
+        assetLoader.processCompleted(timeLimit=0.01)
+    assert results == [(4, 2)]
@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from animblock.geometry.TubeGeometry import TubeGeometry
+from animblock.mathutils import Curve, MatrixFactory
+
+
+# the same helix, written with numpy functions and with math module functions
+def helixArray(t):
+    return [np.cos(t), np.sin(t), t / 4]
+
+
+def helixMath(t):
+    return [math.cos(t), math.sin(t), t / 4]
+
+
+def createCurve(function, divisions=24):
+    return Curve(function, 0, 3 * math.pi, divisions)
+
+
+def getReferenceArcLengths(curve):
+    """Arc length table calculated one point at a time"""
+    arcLengths = [0]
+    previous = np.array(curve.f(float(curve.arcLengthTs[0])))
+    for t in curve.arcLengthTs[1:]:
+        point = np.array(curve.f(float(t)))
+        arcLengths.append(arcLengths[-1] + np.linalg.norm(point - previous))
+        previous = point
+    return np.array(arcLengths)
+
+
+def getReferenceFrames(curve):
+    """Frames calculated one point at a time, rotating each normal by the turn of the tangent"""
+    tangents = [np.array(curve.getTangent(float(u))) for u in curve.getDivisionParameters()]
+    normals = [np.cross(tangents[0], [1, 1, 1])]
+    for n in range(1, len(tangents)):
+        normal = normals[-1]
+        crossProduct = np.cross(tangents[n - 1], tangents[n])
+        magnitude = np.linalg.norm(crossProduct)
+        if magnitude > 0.0001:
+            theta = math.acos(np.dot(tangents[n - 1], tangents[n]))
+            rotation = MatrixFactory.makeRotationAxisAngle(crossProduct / magnitude, theta)
+            normal = rotation[0:3, 0:3] @ normal
+        normals.append(normal)
+    binormals = [
+        np.cross(tangent, normal) for tangent, normal in zip(tangents, normals, strict=True)
+    ]
+    return {"tangents": tangents, "normals": normals, "binormals": binormals}
+
+
+@pytest.mark.parametrize("function", [helixArray, helixMath], ids=["numpy", "math"])
+def test_arc_lengths_match_per_point_evaluation(function):
+    curve = createCurve(function)
+    np.testing.assert_allclose(curve.arcLengths, getReferenceArcLengths(curve), rtol=1e-12)
+    # the helix has length 3 pi sqrt(1 + 1/16); the table is a slightly shorter polyline
+    assert curve.totalArcLength == pytest.approx(3 * math.pi * math.sqrt(17 / 16), rel=1e-4)
+
+
+@pytest.mark.parametrize("function", [helixArray, helixMath], ids=["numpy", "math"])
+def test_points_are_equally_spaced_along_the_curve(function):
+    curve = createCurve(function)
+    points = curve.getPoints()
+    assert points.shape == (24, 3)
+    expected = [curve.f(float(curve.convert_u_to_t(u))) for u in curve.getDivisionParameters()]
+    np.testing.assert_allclose(points, expected, rtol=0, atol=1e-12)
+    spacing = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    np.testing.assert_allclose(spacing, spacing.mean(), rtol=1e-3)
+
+
+@pytest.mark.parametrize("function", [helixArray, helixMath], ids=["numpy", "math"])
+def test_frames_match_sequential_rotation(function):
+    curve = createCurve(function)
+    frames = curve.getFrames()
+    reference = getReferenceFrames(curve)
+    for name in ("tangents", "normals", "binormals"):
+        assert frames[name].shape == (24, 3)
+        np.testing.assert_allclose(frames[name], reference[name], rtol=0, atol=1e-9)
+
+
+def test_straight_curve_keeps_its_normal():
+    curve = Curve(lambda t: [t, 2 * t, 0 * t], 0, 1, 8)
+    normals = curve.getFrames()["normals"]
+    np.testing.assert_allclose(normals, np.broadcast_to(normals[0], normals.shape), atol=1e-12)
+
+
+def test_tube_geometry_is_the_same_for_both_paths(glContext):
+    arrayTube = TubeGeometry(createCurve(helixArray), tubeRadius=0.2, radiusSegments=6)
+    mathTube = TubeGeometry(createCurve(helixMath), tubeRadius=0.2, radiusSegments=6)
+    assert arrayTube.vertexCount == mathTube.vertexCount
+    np.testing.assert_array_equal(arrayTube.indices, mathTube.indices)
+    for name in ("vertexPosition", "vertexNormal", "vertexUV"):
+        np.testing.assert_allclose(
+            arrayTube.getAttributeArray(name), mathTube.getAttributeArray(name), atol=1e-6
+        )
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+from PIL import Image
+
+from animblock.core.FrameCapture import FrameCapture
+
+
+def drawFrame(framebuffer, frameIndex):
+    """Fill the bottom half (in OpenGL coordinates) and the top half with colors of frameIndex"""
+    width, height = framebuffer.size
+    framebuffer.clear(frameIndex / 255, 0, 0, 1)
+    framebuffer.clear(
+        0, frameIndex / 255, 1, 1, viewport=(0, height // 2, width, height - height // 2)
+    )
+
+
+def getExpectedRows(frameIndex):
+    # files store the top row first
+    return (0, frameIndex, 255), (frameIndex, 0, 0)
+
+
+def createFramebuffer(glContext, size):
+    return glContext.simple_framebuffer(size, components=4)
+
+
+@pytest.mark.parametrize("bufferCount", [1, 3])
+def test_frames_are_written_in_order_and_flipped(glContext, tmp_path, bufferCount):
+    framebuffer = createFramebuffer(glContext, (8, 6))
+    capture = FrameCapture(str(tmp_path), bufferCount=bufferCount)
+    frameCount = 7
+    for frameIndex in range(frameCount):
+        drawFrame(framebuffer, frameIndex)
+        capture.capture(framebuffer)
+    capture.finish()
+
+    assert sorted(os.listdir(tmp_path)) == [f"frame_{index:06d}.png" for index in range(frameCount)]
+    for frameIndex in range(frameCount):
+        image = Image.open(tmp_path / f"frame_{frameIndex:06d}.png")
+        assert image.size == (8, 6)
+        top, bottom = getExpectedRows(frameIndex)
+        assert image.getpixel((0, 0)) == top
+        assert image.getpixel((7, 5)) == bottom
+
+
+def test_resize_between_frames(glContext, tmp_path):
+    sizes = [(8, 6), (8, 6), (5, 3), (5, 3), (5, 3), (8, 6)]
+    framebuffers = {size: createFramebuffer(glContext, size) for size in set(sizes)}
+    capture = FrameCapture(str(tmp_path), fileFormat="raw", filePrefix="clip_", bufferCount=2)
+    for frameIndex, size in enumerate(sizes):
+        drawFrame(framebuffers[size], frameIndex)
+        capture.capture(framebuffers[size])
+    capture.finish()
+
+    for frameIndex, (width, height) in enumerate(sizes):
+        with open(tmp_path / f"clip_{frameIndex:06d}.rgb", "rb") as rawFile:
+            data = rawFile.read()
+        assert len(data) == width * height * 3
+        top, bottom = getExpectedRows(frameIndex)
+        assert tuple(data[0:3]) == top
+        assert tuple(data[-3:]) == bottom
+
+
+def test_capture_rejects_unknown_format(glContext, tmp_path):
+    with pytest.raises(Exception, match="Unknown capture format"):
+        FrameCapture(str(tmp_path), fileFormat="gif")
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from animblock.geometry.Geometry import Geometry
+
+
+def createGeometry(positions, uvs=None, indices=None):
+    geometry = Geometry()
+    geometry.setAttribute("vec3", "vertexPosition", positions)
+    if uvs is not None:
+        geometry.setAttribute("vec2", "vertexUV", uvs)
+    geometry.vertexCount = len(positions)
+    if indices is not None:
+        geometry.setIndices(indices)
+    return geometry
+
+
+def getTriangles(geometry):
+    positions = geometry.getAttributeArray("vertexPosition")
+    indices = geometry.indices if geometry.indices is not None else np.arange(len(positions))
+    return positions[indices].reshape(-1, 3, 3)
+
+
+# two triangles of a quad, without shared vertices
+QUAD_SOUP = [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 0, 0], [1, 1, 0], [0, 1, 0]]
+
+
+def test_weld_merges_equal_vertices(glContext):
+    geometry = createGeometry(QUAD_SOUP)
+    before = getTriangles(geometry)
+    assert geometry.weld() == 2
+    assert geometry.vertexCount == 4
+    assert geometry.indices.tolist() == [0, 1, 2, 0, 2, 3]
+    np.testing.assert_array_equal(getTriangles(geometry), before)
+
+
+def test_weld_keeps_vertices_with_different_attributes(glContext):
+    uvs = [[0, 0], [1, 0], [1, 1], [0, 0], [1, 1], [0.5, 1]]
+    geometry = createGeometry(QUAD_SOUP, uvs)
+    assert geometry.weld() == 2
+    # a vertex at the same position with other texture coordinates stays apart
+    geometry = createGeometry(QUAD_SOUP, [[0, 0], [1, 0], [1, 1], [0, 0.5], [1, 1], [0, 1]])
+    assert geometry.weld() == 1
+
+
+def test_weld_with_decimals_and_signed_zero(glContext):
+    positions = [[0, 0, 0], [1, 0, 0], [1, 1, 0], [-0.0, 1e-7, 0], [1, 1, 0], [0, 1, 0]]
+    assert createGeometry(positions).weld() == 1
+    assert createGeometry(positions).weld(decimals=4) == 2
+
+
+def test_weld_composes_existing_indices(glContext):
+    positions = [*QUAD_SOUP, [0, 1, 0]]
+    geometry = createGeometry(positions, indices=[0, 1, 2, 3, 4, 6])
+    before = getTriangles(geometry)
+    assert geometry.weld() == 3
+    assert geometry.vertexCount == 4
+    np.testing.assert_array_equal(getTriangles(geometry), before)
+
+
+def test_weld_rejects_mismatched_attributes(glContext):
+    geometry = createGeometry(QUAD_SOUP, [[0, 0]] * 5)
+    with pytest.raises(Exception, match="different numbers of vertices"):
+        geometry.weld()
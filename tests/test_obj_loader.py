@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pytest
+
+from animblock.geometry.OBJLoader import OBJLoader
+
+
+QUAD = """\
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+vt 0 0
+vt 1 0
+vt 1 1
+vt 0 1
+vn 0 0 1
+f 1/1/1 2/2/1 3/3/1 4/4/1
+"""
+
+PENTAGON = """\
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0.5 1.5 0
+v 0 1 0
+f 1 2 3 4 5
+"""
+
+
+@pytest.fixture
+def writeOBJ(tmp_path):
+    """Write OBJ text to a file and return its name"""
+
+    def write(text, name="model.obj", newline="\n"):
+        fileName = tmp_path / name
+        with open(fileName, "w", newline=newline) as objFile:
+            objFile.write(text)
+        return str(fileName)
+
+    return write
+
+
+@pytest.fixture
+def cacheDirectory(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(OBJLoader, "cacheDirectory", str(directory))
+    monkeypatch.setattr(OBJLoader, "cacheMinimumSize", 0)
+    return directory
+
+
+def assertSameData(data, expected):
+    assert data.keys() == expected.keys()
+    for name, value in expected.items():
+        if value is None or name == "objects":
+            assert data[name] == value
+        else:
+            np.testing.assert_array_equal(data[name], value)
+
+
+def test_quad_is_triangulated_as_fan(writeOBJ):
+    data = OBJLoader.parse(writeOBJ(QUAD))
+    assert data["positions"].shape == (4, 3)
+    assert data["indices"].tolist() == [0, 1, 2, 0, 2, 3]
+    np.testing.assert_array_equal(data["uvs"], [[0, 0], [1, 0], [1, 1], [0, 1]])
+    np.testing.assert_array_equal(data["normals"], [[0, 0, 1]] * 4)
+
+
+def test_pentagon_is_triangulated_as_fan(writeOBJ):
+    data = OBJLoader.parse(writeOBJ(PENTAGON))
+    triangles = data["positions"][data["indices"]].reshape(-1, 3, 3)
+    expected = data["filePositions"][[[0, 1, 2], [0, 2, 3], [0, 3, 4]]]
+    np.testing.assert_array_equal(triangles, expected)
+
+
+def test_computed_normals_face_front(writeOBJ):
+    data = OBJLoader.parse(writeOBJ(PENTAGON))
+    assert data["uvs"] is None
+    np.testing.assert_allclose(data["normals"], [[0, 0, 1]] * len(data["normals"]))
+
+
+def test_negative_indices_count_back(writeOBJ):
+    positive = OBJLoader.parse(writeOBJ(QUAD, "positive.obj"))
+    negative = OBJLoader.parse(
+        writeOBJ(
+            QUAD.replace("f 1/1/1 2/2/1 3/3/1 4/4/1", "f -4/-4/-1 -3/-3/-1 -2/-2/-1 -1/-1/-1"),
+            "negative.obj",
+        )
+    )
+    assertSameData(negative, positive)
+
+
+def test_negative_indices_are_relative_to_their_line(writeOBJ):
+    text = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\nv 0 0 1\nv 1 0 1\nv 0 1 1\nf -3 -2 -1\n"
+    data = OBJLoader.parse(writeOBJ(text))
+    triangles = data["positions"][data["indices"]].reshape(-1, 3, 3)
+    np.testing.assert_array_equal(triangles[:, :, 2], [[0, 0, 0], [1, 1, 1]])
+
+
+def test_corners_without_uvs(writeOBJ):
+    text = "v 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 0 -1\nf 1//1 2//1 3//1\n"
+    data = OBJLoader.parse(writeOBJ(text))
+    assert data["uvs"] is None
+    np.testing.assert_array_equal(data["normals"], [[0, 0, -1]] * 3)
+
+
+def test_tabs_and_crlf(writeOBJ):
+    expected = OBJLoader.parse(writeOBJ(QUAD, "plain.obj"))
+    indented = "".join("\t" + line.replace(" ", "\t ") + "\n" for line in QUAD.splitlines())
+    data = OBJLoader.parse(writeOBJ(indented, "indented.obj", newline="\r\n"))
+    assertSameData(data, expected)
+
+
+def test_comments_and_object_names(writeOBJ):
+    text = "# model\no first\n" + PENTAGON + "o second part\n"
+    data = OBJLoader.parse(writeOBJ(text))
+    assert data["objects"] == ["first", "second part"]
+    assert len(data["indices"]) == 9
+
+
+def test_smooth_normals_average_shared_positions(writeOBJ):
+    # two triangles folded along the edge from (0, 0, 0) to (0, 1, 0)
+    text = "v 0 0 0\nv 0 1 0\nv 1 0 0\nv -1 0 1\nf 1 3 2\nf 1 2 4\n"
+    flat = OBJLoader.parse(writeOBJ(text, "flat.obj"))
+    smooth = OBJLoader.parse(writeOBJ(text, "smooth.obj"), smoothNormals=True)
+    assert len(flat["positions"]) == 6
+    assert len(smooth["positions"]) == 4
+    np.testing.assert_allclose(np.linalg.norm(smooth["normals"], axis=1), 1, rtol=1e-6)
+    shared = smooth["normals"][(smooth["positions"][:, 0] == 0)]
+    np.testing.assert_allclose(shared[0], shared[1])
+    # the mean of the unit face normals (0, 0, 1) and (1, 0, 1) / sqrt(2)
+    expected = np.array([0, 0, 1]) + np.array([1, 0, 1]) / np.sqrt(2)
+    np.testing.assert_allclose(shared[0], expected / np.linalg.norm(expected), rtol=1e-6)
+
+
+def test_cache_round_trip(writeOBJ, cacheDirectory):
+    fileName = writeOBJ("o quad\n" + QUAD)
+    data = OBJLoader.load(fileName)
+    cacheFileName = OBJLoader.getCacheFileName(fileName)
+    assert os.path.exists(cacheFileName)
+    assert os.listdir(cacheDirectory) == [os.path.basename(cacheFileName)]
+    assertSameData(OBJLoader.load(fileName), data)
+
+    # parsed arrays without texture coordinates are cached too
+    fileName = writeOBJ(PENTAGON, "pentagon.obj")
+    data = OBJLoader.load(fileName)
+    assertSameData(OBJLoader.load(fileName), data)
+
+
+def test_cache_key_changes_with_file_and_options(writeOBJ, cacheDirectory):
+    fileName = writeOBJ(QUAD)
+    cacheFileName = OBJLoader.getCacheFileName(fileName)
+    assert OBJLoader.getCacheFileName(fileName, smoothNormals=True) != cacheFileName
+    writeOBJ(PENTAGON)
+    assert OBJLoader.getCacheFileName(fileName) != cacheFileName
+    assert len(OBJLoader.load(fileName)["indices"]) == 9
+
+
+def test_small_files_are_not_cached(writeOBJ, cacheDirectory, monkeypatch):
+    monkeypatch.setattr(OBJLoader, "cacheMinimumSize", 1 << 16)
+    OBJLoader.load(writeOBJ(QUAD))
+    assert not cacheDirectory.exists()
@@ -0,0 +1,106 @@
+import gc
+
+import numpy as np
+
+from animblock.core.Mesh import Mesh
+from animblock.core.RenderQueue import _GEOMETRY_BITS, RenderQueue
+from animblock.geometry.Geometry import Geometry
+from animblock.material.SurfaceBasicMaterial import SurfaceBasicMaterial
+
+
+IDENTITY = np.identity(4)
+
+
+def test_keys_are_kept_with_more_geometries_than_the_key_field(glContext):
+    material = SurfaceBasicMaterial()
+    meshList = [Mesh(Geometry(), material) for _ in range((1 << _GEOMETRY_BITS) + 100)]
+    queue = RenderQueue()
+    queue.sort(meshList, IDENTITY)
+    entries = [queue.meshKeys[mesh] for mesh in meshList]
+    materialKey = queue.materialKeys[material]
+
+    queue.sort(meshList, IDENTITY)
+    assert all(queue.meshKeys[mesh] is entry for mesh, entry in zip(meshList, entries, strict=True))
+    assert queue.materialKeys[material] is materialKey
+
+
+def test_overflowing_index_is_renumbered_alone(glContext):
+    material = SurfaceBasicMaterial()
+    queue = RenderQueue()
+    for _ in range(3):
+        # released geometries leave their ordinals unused
+        queue.sort([Mesh(Geometry(), material) for _ in range(500)], IDENTITY)
+    assert queue.ordinalCounts[id(queue.geometryIndex)] >= 1 << _GEOMETRY_BITS
+    gc.collect()
+    materialKey = queue.materialKeys[material]
+
+    meshList = [Mesh(Geometry(), material) for _ in range(2)]
+    queue.sort(meshList, IDENTITY)
+    assert sorted(queue.geometryIndex.values()) == [0, 1]
+    assert queue.materialKeys[material] is materialKey
+
+
+def createMeshes(material, depths, geometry=None):
+    # meshes of one geometry and material are only ordered by depth
+    if geometry is None:
+        geometry = Geometry()
+    meshList = []
+    for depth in depths:
+        mesh = Mesh(geometry, material)
+        # the camera looks down -z from the origin
+        mesh.transform.translate(0, 0, -depth)
+        meshList.append(mesh)
+    return meshList
+
+
+def test_opaque_front_to_back_and_transparent_back_to_front(glContext):
+    opaque = createMeshes(SurfaceBasicMaterial(), [5, 1, 3])
+    transparent = createMeshes(SurfaceBasicMaterial(alpha=0.5), [2, 6, 4])
+    queue = RenderQueue()
+    order = queue.sort(transparent[:2] + opaque + transparent[2:], IDENTITY)
+    assert order == [
+        opaque[1],
+        opaque[2],
+        opaque[0],
+        transparent[1],
+        transparent[2],
+        transparent[0],
+    ]
+    assert (queue.opaqueCount, queue.transparentCount) == (3, 3)
+
+
+def test_opaque_meshes_are_grouped_by_material(glContext):
+    materialA = SurfaceBasicMaterial()
+    materialB = SurfaceBasicMaterial(color=[1, 0, 0])
+    meshList = createMeshes(materialA, [1, 3]) + createMeshes(materialB, [2, 4])
+    order = RenderQueue().sort(meshList, IDENTITY)
+    assert [mesh.material for mesh in order] == [materialA, materialA, materialB, materialB]
+    assert order[0] is meshList[0]
+    assert order[2] is meshList[2]
+
+
+def test_keys_are_reused_for_unchanged_meshes(glContext):
+    material = SurfaceBasicMaterial()
+    meshList = createMeshes(material, [1, 2, 3])
+    queue = RenderQueue()
+    queue.sort(meshList, IDENTITY)
+    entries = [queue.meshKeys[mesh] for mesh in meshList]
+
+    # moving meshes changes the order, not the keys
+    meshList[0].transform.translate(0, 0, -5)
+    assert queue.sort(meshList, IDENTITY) == [meshList[1], meshList[2], meshList[0]]
+    assert [queue.meshKeys[mesh] for mesh in meshList] == entries
+    assert all(queue.meshKeys[mesh] is entry for mesh, entry in zip(meshList, entries, strict=True))
+
+    # replacing the material of one mesh only recalculates its key
+    meshList[1].material = SurfaceBasicMaterial(alpha=0.5)
+    queue.sort(meshList, IDENTITY)
+    assert queue.meshKeys[meshList[0]] is entries[0]
+    assert queue.meshKeys[meshList[1]] is not entries[1]
+    assert queue.meshKeys[meshList[1]][2] == 1
+
+    # a change of the material's state replaces the keys of all its meshes
+    material.transparent = True
+    queue.sort(meshList, IDENTITY)
+    assert queue.meshKeys[meshList[0]] is not entries[0]
+    assert queue.transparentCount == 3
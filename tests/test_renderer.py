@@ -0,0 +1,50 @@
+import pytest
+
+from animblock.cameras.PerspectiveCamera import PerspectiveCamera
+from animblock.core.Mesh import Mesh
+from animblock.core.Renderer import Renderer
+from animblock.core.Scene import Scene
+from animblock.geometry.BoxGeometry import BoxGeometry
+from animblock.lights.DirectionalLight import DirectionalLight
+from animblock.material.SurfaceLightMaterial import SurfaceLightMaterial
+
+
+def createScene(lightCount):
+    scene = Scene()
+    material = SurfaceLightMaterial()
+    # at the origin, in front of the camera behind it, and behind the camera;
+    #   the shadow cameras only cover a small region around the origin
+    for z in (0, -50, 50):
+        mesh = Mesh(BoxGeometry(1, 1, 1), material)
+        mesh.transform.setPosition(0, 0, z)
+        mesh.castShadow = True
+        scene.add(mesh)
+    for _ in range(lightCount):
+        light = DirectionalLight(direction=[0, -1, 0])
+        light.enableShadows()
+        scene.add(light)
+    return scene
+
+
+@pytest.mark.parametrize("lightCount", [1, 2])
+def test_culled_shadow_casters_are_reported_separately(glContext, lightCount):
+    renderer = Renderer(16, 16)
+    renderer.shadowMapEnabled = True
+    camera = PerspectiveCamera()
+    camera.transform.setPosition(0, 0, 10)
+    scene = createScene(lightCount)
+
+    renderer.render(scene, camera)
+    assert renderer.stats["culledObjects"] == 1
+    assert renderer.stats["culledShadowCasters"] == 2 * lightCount
+    assert renderer.stats["shadowMapUpdates"] == lightCount
+
+    # counted again by each render, whether or not the shadow maps are rendered
+    renderer.render(scene, camera)
+    assert renderer.stats["culledObjects"] == 1
+    assert renderer.stats["culledShadowCasters"] == 2 * lightCount
+    assert renderer.stats["shadowMapUpdates"] == 0
+
+    renderer.shadowMapEnabled = False
+    renderer.render(scene, camera)
+    assert renderer.stats["culledShadowCasters"] == 0
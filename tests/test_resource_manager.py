@@ -0,0 +1,192 @@
+import gc
+
+import pytest
+from PIL import Image
+
+from animblock.core.Mesh import Mesh
+from animblock.core.OpenGLUtils import OpenGLUtils
+from animblock.core.ResourceManager import ResourceManager
+from animblock.core.Scene import Scene
+from animblock.geometry.BoxGeometry import BoxGeometry
+from animblock.material.SurfaceBasicMaterial import SurfaceBasicMaterial
+
+
+class FakeBuffer:
+    """Stands in for a moderngl object; records its release"""
+
+    def __init__(self, size=0):
+        self.size = size
+        self.releaseCount = 0
+
+    def release(self):
+        self.releaseCount += 1
+
+
+class Owner:
+    pass
+
+
+def test_add_and_release_track_memory():
+    manager = ResourceManager()
+    buffer = manager.add(FakeBuffer(64), "buffer")
+    program = manager.add(FakeBuffer(), "program")
+    assert manager.getMemoryUsage()["buffer"] == 64
+    assert manager.getMemoryUsage()["total"] == 64
+    assert manager.getResourceCounts()["program"] == 1
+
+    manager.updateSize(buffer, 128)
+    assert manager.getMemoryUsage()["buffer"] == 128
+
+    manager.release(buffer)
+    manager.release(program)
+    assert manager.getMemoryUsage()["total"] == 0
+    assert manager.getResourceCounts() == dict.fromkeys(ResourceManager.categories, 0)
+    assert (manager.addCount, manager.releaseCount) == (2, 2)
+
+
+def test_release_twice_has_no_effect_on_totals():
+    manager = ResourceManager()
+    buffer = manager.add(FakeBuffer(16), "buffer")
+    manager.release(buffer)
+    manager.release(buffer)
+    assert manager.releaseCount == 1
+    assert manager.getMemoryUsage()["buffer"] == 0
+    assert not manager.isAllocated(buffer)
+
+
+def test_add_rejects_unknown_category_and_duplicates():
+    manager = ResourceManager()
+    buffer = manager.add(FakeBuffer(), "buffer")
+    with pytest.raises(Exception, match="Unknown resource category"):
+        manager.add(FakeBuffer(), "shader")
+    with pytest.raises(Exception, match="already registered"):
+        manager.add(buffer, "buffer")
+
+
+def test_release_owner():
+    manager = ResourceManager()
+    owner = Owner()
+    buffers = [manager.add(FakeBuffer(8), "buffer", owner=owner) for _ in range(3)]
+    kept = manager.add(FakeBuffer(8), "buffer", owner=owner)
+    manager.disown(owner, kept)
+
+    manager.releaseOwner(owner)
+    assert [buffer.releaseCount for buffer in buffers] == [1, 1, 1]
+    assert kept.releaseCount == 0
+    assert manager.isAllocated(kept)
+    assert manager.getMemoryUsage()["buffer"] == 8
+
+
+def test_custom_release_function():
+    manager = ResourceManager()
+    owner = Owner()
+    shared = FakeBuffer()
+    givenUp = []
+    manager.own(owner, shared, givenUp.append)
+    manager.releaseOwner(owner)
+    assert givenUp == [shared]
+    assert shared.releaseCount == 0
+
+
+def test_collected_owner_is_released_by_collect():
+    manager = ResourceManager()
+    owner = Owner()
+    buffer = manager.add(FakeBuffer(32), "buffer", owner=owner)
+    del owner
+    gc.collect()
+
+    # nothing is released until collect, called with the context current
+    assert buffer.releaseCount == 0
+    assert manager.isAllocated(buffer)
+    assert manager.collect() == 1
+    assert buffer.releaseCount == 1
+    assert manager.getMemoryUsage()["total"] == 0
+    assert manager.collect() == 0
+
+
+def test_release_vertex_arrays_of_released_programs():
+    manager = ResourceManager()
+    programA = manager.add(FakeBuffer(), "program")
+    programB = manager.add(FakeBuffer(), "program")
+    vaoData = {
+        programA: manager.add(FakeBuffer(), "vertexArray"),
+        programB: manager.add(FakeBuffer(), "vertexArray"),
+    }
+    vertexArrayA = vaoData[programA]
+    manager.release(programA)
+    manager.releaseVertexArrays(vaoData)
+    assert list(vaoData) == [programB]
+    assert vertexArrayA.releaseCount == 1
+    assert manager.getResourceCounts()["vertexArray"] == 1
+
+
+def test_shared_object_is_released_by_its_last_user():
+    manager = ResourceManager()
+    texture = manager.add(FakeBuffer(), "texture", size=16)
+    userA, userB = Owner(), Owner()
+    manager.addReference(userA, texture)
+    manager.addReference(userA, texture)
+    manager.addReference(userB, texture)
+
+    manager.releaseOwner(userA)
+    assert manager.isAllocated(texture)
+    manager.removeReference(userB, texture)
+    assert texture.releaseCount == 1
+    assert manager.getMemoryUsage()["texture"] == 0
+
+
+def test_collected_user_gives_up_its_reference():
+    manager = ResourceManager()
+    texture = manager.add(FakeBuffer(), "texture", size=16)
+    user = Owner()
+    manager.addReference(user, texture)
+    del user
+    gc.collect()
+    manager.collect()
+    assert not manager.isAllocated(texture)
+
+
+def test_references_leave_owned_objects_to_their_owner():
+    manager = ResourceManager()
+    owner, user = Owner(), Owner()
+    texture = manager.add(FakeBuffer(), "texture", owner=owner, size=16)
+    manager.addReference(user, texture)
+    manager.releaseOwner(user)
+    assert manager.isAllocated(texture)
+
+    # an object owned by its user stays owned when the reference is given up
+    manager.addReference(owner, texture)
+    manager.removeReference(owner, texture)
+    assert manager.isAllocated(texture)
+    manager.releaseOwner(owner)
+    assert texture.releaseCount == 1
+
+
+def createTexture():
+    return OpenGLUtils.initializeSurface(Image.new("RGBA", (8, 8), (255, 0, 0, 255)))
+
+
+def test_material_releases_replaced_textures(glContext):
+    manager = OpenGLUtils.resourceManager
+    textureA, textureB = createTexture(), createTexture()
+    material = SurfaceBasicMaterial(texture=textureA)
+    material.setUniform("sampler2D", "image", textureB)
+    assert not manager.isAllocated(textureA)
+    material.release()
+    assert not manager.isAllocated(textureB)
+
+
+def test_scene_swap_releases_textures(glContext):
+    manager = OpenGLUtils.resourceManager
+    manager.collect()
+    textureMemory = manager.getMemoryUsage()["texture"]
+
+    scene = Scene()
+    texture = createTexture()
+    for _ in range(3):
+        scene.add(Mesh(BoxGeometry(), SurfaceBasicMaterial(texture=texture)))
+    scene.add(Mesh(BoxGeometry(), SurfaceBasicMaterial(texture=createTexture())))
+    assert manager.getMemoryUsage()["texture"] == textureMemory + 2 * 8 * 8 * 4
+
+    scene.release()
+    assert manager.getMemoryUsage()["texture"] == textureMemory
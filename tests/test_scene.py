@@ -0,0 +1,138 @@
+import pytest
+
+from animblock.core.Mesh import Mesh
+from animblock.core.Object3D import Object3D
+from animblock.core.Scene import Scene
+from animblock.geometry.Geometry import Geometry
+from animblock.lights.Light import Light
+from animblock.lights.PointLight import PointLight
+from animblock.material.SurfaceBasicMaterial import SurfaceBasicMaterial
+
+
+def createMesh(name="", castShadow=False):
+    mesh = Mesh(Geometry(), SurfaceBasicMaterial())
+    mesh.name = name
+    mesh.castShadow = castShadow
+    return mesh
+
+
+def assertRegistriesMatchGraph(scene):
+    """The registries hold the objects found by traversing the scene graph"""
+    objects = scene.getDepthFirstList()
+    meshes = [item for item in objects if isinstance(item, Mesh)]
+    assert set(scene.getMeshList()) == set(meshes)
+    assert set(scene.getLightList()) == {item for item in objects if isinstance(item, Light)}
+    assert set(scene.getShadowCasterList()) == {mesh for mesh in meshes if mesh.castShadow}
+    assert set(scene.getRenderList()) == set(meshes)
+
+    names = {}
+    tags = {}
+    for item in objects:
+        names.setdefault(item.name, set()).add(item)
+        for tag in item.tags:
+            tags.setdefault(tag, set()).add(item)
+    assert {name: set(items) for name, items in scene.nameIndex.items()} == names
+    assert {tag: set(items) for tag, items in scene.tagIndex.items()} == tags
+    for item in objects:
+        assert item._scene is scene
+
+
+@pytest.fixture
+def scene():
+    scene = Scene()
+    group = Object3D()
+    group.name = "group"
+    group.add(createMesh("box", castShadow=True))
+    group.add(createMesh("sphere"))
+    scene.add(group)
+    scene.add(PointLight())
+    return scene
+
+
+def test_add_registers_subtree(scene):
+    assert len(scene.getMeshList()) == 2
+    assert len(scene.getLightList()) == 1
+    assertRegistriesMatchGraph(scene)
+
+    # objects added below a group already in the scene are registered too
+    group = scene.getObjectByName("group")
+    group.add(createMesh("cone"))
+    assert scene.getObjectByName("cone") in scene.getMeshList()
+    assertRegistriesMatchGraph(scene)
+
+
+def test_remove_unregisters_subtree(scene):
+    group = scene.getObjectByName("group")
+    box = scene.getObjectByName("box")
+    scene.remove(group)
+    assert scene.getMeshList() == []
+    assert scene.getShadowCasterList() == []
+    assert box._scene is None
+    with pytest.raises(IndexError):
+        scene.getObjectByName("box")
+    assertRegistriesMatchGraph(scene)
+
+    # changes to detached objects do not reach the scene
+    box.name = "detached"
+    box.castShadow = False
+    assert "detached" not in scene.nameIndex
+    box.castShadow = True
+    assert scene.getShadowCasterList() == []
+
+
+def test_reparent(scene):
+    group = scene.getObjectByName("group")
+    sphere = scene.getObjectByName("sphere")
+    other = Object3D()
+    scene.add(other)
+    group.remove(sphere)
+    other.add(sphere)
+    assert scene.getMeshList().count(sphere) == 1
+    assertRegistriesMatchGraph(scene)
+
+
+def test_move_to_another_scene(scene):
+    group = scene.getObjectByName("group")
+    otherScene = Scene()
+    otherScene.add(group)
+    assert scene.getMeshList() == []
+    assert "box" not in scene.nameIndex
+    assert otherScene.getObjectByName("box")._scene is otherScene
+    assertRegistriesMatchGraph(otherScene)
+
+
+def test_rename_and_retag(scene):
+    box = scene.getObjectByName("box")
+    box.name = "crate"
+    with pytest.raises(IndexError):
+        scene.getObjectByName("box")
+    assert scene.getObjectByName("crate") is box
+
+    box.addTag("static")
+    scene.getObjectByName("sphere").addTag("static")
+    assert len(scene.getObjectsByTag("static")) == 2
+    box.removeTag("static")
+    assert scene.getObjectsByTag("static") == [scene.getObjectByName("sphere")]
+    assertRegistriesMatchGraph(scene)
+
+
+def test_duplicate_names_return_first_in_depth_first_order(scene):
+    group = scene.getObjectByName("group")
+    first = createMesh("twin")
+    second = createMesh("twin")
+    scene.add(second)
+    group.add(first)
+    assert scene.getObjectByName("twin") is first
+    assert scene.getObjectsByName("twin") == [second, first]
+
+
+def test_cast_shadow_toggle_updates_shadow_casters(scene):
+    box = scene.getObjectByName("box")
+    sphere = scene.getObjectByName("sphere")
+    assert scene.getShadowCasterRenderList() == [box]
+
+    sphere.castShadow = True
+    assert set(scene.getShadowCasterRenderList()) == {box, sphere}
+    box.castShadow = False
+    assert scene.getShadowCasterRenderList() == [sphere]
+    assertRegistriesMatchGraph(scene)
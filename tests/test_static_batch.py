@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from animblock.core.Mesh import Mesh
+from animblock.core.Object3D import Object3D
+from animblock.core.Scene import Scene
+from animblock.geometry.BoxGeometry import BoxGeometry
+from animblock.material.SurfaceBasicMaterial import SurfaceBasicMaterial
+
+
+@pytest.fixture
+def scene(glContext):
+    scene = Scene()
+    material = SurfaceBasicMaterial()
+    group = Object3D()
+    group.name = "group"
+    scene.add(group)
+    for x in range(3):
+        mesh = Mesh(BoxGeometry(1, 1, 1), material)
+        mesh.transform.translate(2 * x, 0, 0)
+        mesh.name = f"box{x}"
+        group.add(mesh)
+    return scene
+
+
+def getBatch(scene):
+    (batch,) = scene.staticBatches
+    scene.updateStaticBatches()
+    return batch
+
+
+def getBatchBounds(batch):
+    positions = batch.geometry.getAttributeArray("vertexPosition")
+    return positions.min(axis=0).tolist(), positions.max(axis=0).tolist()
+
+
+def test_freeze_draws_members_with_one_batch(scene):
+    meshList = scene.getMeshList()
+    (batch,) = scene.freezeStatic()
+    scene.updateStaticBatches()
+    assert scene.getRenderList() == [batch]
+    assert batch.members == meshList
+    assert batch.geometry.getDrawCount() == sum(mesh.geometry.getDrawCount() for mesh in meshList)
+    assert getBatchBounds(batch) == ([-0.5, -0.5, -0.5], [4.5, 0.5, 0.5])
+
+    # unchanged members are not merged again
+    geometry = batch.geometry
+    scene.updateStaticBatches()
+    assert batch.geometry is geometry
+
+
+def test_transform_changes_rebuild(scene):
+    scene.freezeStatic()
+    batch = getBatch(scene)
+    scene.getObjectByName("box2").transform.translate(0, 3, 0)
+    assert batch.needsRebuild
+    assert getBatchBounds(getBatch(scene)) == ([-0.5, -0.5, -0.5], [4.5, 3.5, 0.5])
+
+    # moving an ancestor moves all members
+    scene.getObjectByName("group").transform.translate(0, 0, -1)
+    assert getBatchBounds(getBatch(scene)) == ([-0.5, -0.5, -1.5], [4.5, 3.5, -0.5])
+
+
+def test_visibility_changes_rebuild(scene):
+    scene.freezeStatic()
+    batch = getBatch(scene)
+    scene.getObjectByName("box0").visible = False
+    assert getBatchBounds(getBatch(scene)) == ([1.5, -0.5, -0.5], [4.5, 0.5, 0.5])
+    scene.getObjectByName("box0").visible = True
+    assert getBatchBounds(getBatch(scene))[0] == [-0.5, -0.5, -0.5]
+    assert batch.members == scene.getMeshList()
+
+
+def test_material_change_removes_member(scene):
+    scene.freezeStatic()
+    batch = getBatch(scene)
+    box = scene.getObjectByName("box1")
+    box.material = SurfaceBasicMaterial(color=[1, 0, 0])
+    batch = getBatch(scene)
+    assert box not in batch.members
+    assert box.staticBatch is None
+    assert scene.getRenderList() == [box, batch]
+    assert len(batch.geometry.getAttributeArray("vertexPosition")) == 2 * len(
+        box.geometry.getAttributeArray("vertexPosition")
+    )
+
+
+def test_removed_member_leaves_batch(scene):
+    scene.freezeStatic()
+    batch = getBatch(scene)
+    box = scene.getObjectByName("box2")
+    scene.getObjectByName("group").remove(box)
+    assert box.staticBatch is None
+    assert getBatchBounds(getBatch(scene))[1] == [2.5, 0.5, 0.5]
+    assert box not in batch.members
+
+
+def test_unfreeze_restores_members(scene):
+    meshList = scene.getMeshList()
+    scene.freezeStatic()
+    batch = getBatch(scene)
+    scene.unfreezeStatic()
+    assert scene.staticBatches == []
+    assert scene.getRenderList() == meshList
+    assert all(mesh.staticBatch is None for mesh in meshList)
+    assert batch.members == []
+
+    # members can be moved again without a batch
+    meshList[0].transform.translate(1, 0, 0)
+    np.testing.assert_array_equal(meshList[0].getWorldMatrix()[0:3, 3], [1, 0, 0])
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+
+from animblock.geometry.SurfaceGeometry import SurfaceGeometry
+from animblock.mathutils import ArrayUtils, Surface
+
+
+# the same wave surface, written with numpy functions and with math module functions
+def waveArray(u, v):
+    return [u, v, np.sin(3 * u) * np.cos(2 * v)]
+
+
+def waveMath(u, v):
+    return [u, v, math.sin(3 * u) * math.cos(2 * v)]
+
+
+def evaluatePerPoint(function, u, v):
+    points = [function(float(a), float(b)) for a, b in zip(u.flat, v.flat, strict=True)]
+    return np.array(points).reshape(*u.shape, 3)
+
+
+@pytest.fixture
+def grid():
+    return Surface.getGrid(-1, 2, 7, 0, 1.5, 5)
+
+
+def test_numpy_function_is_evaluated_at_once(grid):
+    u, v = grid
+    calls = []
+
+    def wave(u, v):
+        calls.append(np.shape(u))
+        return waveArray(u, v)
+
+    points = ArrayUtils.evaluate(wave, u, v)
+    assert calls == [(8, 6)]
+    np.testing.assert_allclose(points, evaluatePerPoint(waveArray, u, v), rtol=0, atol=1e-15)
+
+
+def test_math_function_is_evaluated_per_point(grid):
+    u, v = grid
+    points = ArrayUtils.evaluate(waveMath, u, v)
+    assert points.shape == (8, 6, 3)
+    np.testing.assert_array_equal(points, evaluatePerPoint(waveMath, u, v))
+    np.testing.assert_allclose(points, ArrayUtils.evaluate(waveArray, u, v), rtol=0, atol=1e-15)
+
+
+@pytest.mark.parametrize(
+    "function",
+    [
+        lambda u, v: [u, v, max(u, v)],
+        lambda u, v: [u, v, 1 if u < v else 0],
+    ],
+    ids=["max", "conditional"],
+)
+def test_functions_of_numbers_only(grid, function):
+    u, v = grid
+    np.testing.assert_array_equal(
+        ArrayUtils.evaluate(function, u, v), evaluatePerPoint(function, u, v)
+    )
+
+
+def test_constant_coordinates_are_broadcast(grid):
+    u, v = grid
+    points = ArrayUtils.evaluate(lambda u, v: [u, 2, 0], u, v)
+    assert points.shape == (8, 6, 3)
+    np.testing.assert_array_equal(points[..., 1], 2)
+
+
+def test_normals_from_differences_match_derivatives(grid):
+    u, v = grid
+    surface = Surface(
+        waveArray,
+        lambda u, v: [1, 0, 3 * np.cos(3 * u) * np.cos(2 * v)],
+        lambda u, v: [0, 1, -2 * np.sin(3 * u) * np.sin(2 * v)],
+    )
+    exact = surface.getNormalArray(u, v)
+    approximate = Surface(waveMath).getNormalArray(u, v)
+    np.testing.assert_allclose(np.linalg.norm(exact, axis=-1), 1)
+    np.testing.assert_allclose(approximate, exact, atol=1e-3)
+
+
+def test_surface_geometry_matches_per_point_evaluation(glContext, grid):
+    u, v = grid
+    arrayGeometry = SurfaceGeometry(-1, 2, 7, 0, 1.5, 5, waveArray)
+    mathGeometry = SurfaceGeometry(-1, 2, 7, 0, 1.5, 5, waveMath)
+    expected = evaluatePerPoint(waveMath, u, v).reshape(-1, 3).astype(np.float32)
+    for geometry in (arrayGeometry, mathGeometry):
+        assert geometry.vertexCount == 48
+        assert len(geometry.indices) == 7 * 5 * 6
+        np.testing.assert_allclose(
+            geometry.getAttributeArray("vertexPosition"), expected, rtol=0, atol=1e-6
+        )
+    np.testing.assert_allclose(
+        arrayGeometry.getAttributeArray("vertexNormal"),
+        mathGeometry.getAttributeArray("vertexNormal"),
+        atol=1e-6,
+    )
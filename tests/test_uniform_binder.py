@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from animblock.core.OpenGLUtils import OpenGLUtils
+from animblock.core.RenderState import RenderState
+from animblock.core.Uniform import Uniform, UniformList
+from animblock.core.UniformBinder import UniformBinder
+
+
+VERTEX_SHADER = """
+#version 330
+uniform mat4 modelMatrix;
+in vec3 vertexPosition;
+void main() { gl_Position = modelMatrix * vec4(vertexPosition, 1.0); }
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+uniform vec3 color;
+uniform float alpha;
+uniform sampler2D image;
+out vec4 fragColor;
+void main() { fragColor = vec4(color, alpha) * texture(image, vec2(0.5)); }
+"""
+
+
+@pytest.fixture
+def binder(glContext):
+    return UniformBinder(RenderState(glContext))
+
+
+def createProgram(glContext):
+    return glContext.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+
+
+def createUniformList(color=(1, 0, 0), texture=None):
+    uniformList = UniformList()
+    uniformList.addUniform(Uniform("mat4", "modelMatrix", np.identity(4)))
+    uniformList.addUniform(Uniform("vec3", "color", list(color)))
+    uniformList.addUniform(Uniform("float", "alpha", 1.0))
+    uniformList.addUniform(Uniform("sampler2D", "image", texture))
+    # used by other shaders only
+    uniformList.addUniform(Uniform("float", "unused", 0.0))
+    return uniformList
+
+
+def getColors(*programs):
+    return tuple(program["color"].value for program in programs)
+
+
+def createTexture():
+    return OpenGLUtils.initializeSurface(Image.new("RGBA", (2, 2)))
+
+
+def test_unchanged_values_are_skipped(glContext, binder):
+    program = createProgram(glContext)
+    uniformList = createUniformList()
+    binder.update(program, uniformList)
+    assert (binder.uploadCount, binder.skipCount) == (3, 0)
+
+    binder.update(program, uniformList)
+    assert (binder.uploadCount, binder.skipCount) == (3, 3)
+
+    # a new value equal to the uploaded one is compared, and not written either
+    uniformList.setUniformValue("alpha", 1.0)
+    uniformList.setUniformValue("color", [0, 1, 0])
+    binder.update(program, uniformList)
+    assert (binder.uploadCount, binder.skipCount) == (4, 5)
+    assert program["color"].value == (0, 1, 0)
+
+
+def test_values_edited_in_place_need_mark_changed(glContext, binder):
+    program = createProgram(glContext)
+    uniformList = createUniformList()
+    binder.update(program, uniformList)
+
+    color = uniformList["color"]
+    color.value[1] = 1
+    binder.update(program, uniformList)
+    assert program["color"].value == (1, 0, 0)
+
+    color.markChanged()
+    binder.update(program, uniformList)
+    assert program["color"].value == (1, 1, 0)
+
+
+def test_program_switch(glContext, binder):
+    programA = createProgram(glContext)
+    programB = createProgram(glContext)
+    red = createUniformList((1, 0, 0))
+    green = createUniformList((0, 1, 0))
+
+    binder.update(programA, red)
+    binder.update(programB, green)
+    binder.update(programA, green)
+    assert getColors(programA, programB) == ((0, 1, 0), (0, 1, 0))
+
+    # each program keeps its own record of the values it holds
+    uploadCount = binder.uploadCount
+    binder.update(programB, green)
+    assert binder.uploadCount == uploadCount
+    binder.update(programB, red)
+    assert getColors(programA, programB) == ((0, 1, 0), (1, 0, 0))
+
+
+def test_textures_are_bound_again_after_switching(glContext, binder):
+    program = createProgram(glContext)
+    textureA, textureB = createTexture(), createTexture()
+    materialA = createUniformList(texture=textureA)
+    materialB = createUniformList(texture=textureB)
+    renderState = binder.renderState
+
+    binder.update(program, materialA)
+    unit = program["image"].value
+    assert unit != 0
+    assert renderState.textures[unit] is textureA
+    binder.update(program, materialB)
+    assert renderState.textures[unit] is textureB
+    binder.update(program, materialA)
+    assert renderState.textures[unit] is textureA
+    assert renderState.textureBindCount == 3
+
+
+def test_values_not_fitting_the_shader_variable(glContext, binder):
+    program = createProgram(glContext)
+    uniformList = createUniformList()
+    uniformList.setUniformValue("color", [1, 0])
+    with pytest.raises(Exception, match="color"):
+        binder.update(program, uniformList)